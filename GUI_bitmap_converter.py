@@ -22,14 +22,17 @@ Optional format backends for broader support (install on demand):
 - pip install rawpy
 
 This GUI wraps functions from bitmap_svg_converter.py:
-- open_image
-- generate_svg_per_pixel
+- iter_frames
+- convert_all_frames / convert_frame (per-pixel, merged-rect or path output; optional process pool)
+- FrameDeduper (hard-links repeated frames of animated inputs)
+- generate_svg_animated (one SMIL-animated SVG per animated input)
 
 Files viewer resize changes:
 - Replace ttk.Sizegrip in the files viewer with a custom vertical-only grip that resizes just the list area.
 - Use a mirrored corner glyph “◣” so the icon faces the opposite way.
 """
 
+import multiprocessing
 import os
 import threading
 import socket
@@ -41,12 +44,26 @@ import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from PIL import Image
-
 try:
     from bitmap_svg_converter import (
-        open_image,
-        generate_svg_per_pixel,
+        ANIMATED_SUFFIXES,
+        DEFAULT_BAND_ROWS,
+        DEFAULT_SVGZ_LEVEL,
+        MAX_PALETTE_COLORS,
+        PREFETCH_DEPTH,
+        PREFETCH_MAX_BYTES,
+        ConvertOptions,
+        FileJob,
+        FrameDeduper,
+        content_crop,
+        convert_all_frames,
+        convert_file,
+        count_frames,
+        decode_single_frame,
+        find_bitmaps_in_folder,
+        generate_svg_animated,
+        is_bitmap_file,
+        prefetch,
     )
 except Exception as e:
     raise RuntimeError(f"Failed to import bitmap_svg_converter. Make sure it is in PYTHONPATH. Error: {e}")
@@ -143,40 +160,13 @@ def style_scrollbar(sb: tk.Scrollbar):
             pass
 
 
-# Expanded suffix list. Lower-case comparison is used.
-BITMAP_SUFFIXES = {
-    ".png", ".jpg", ".jpeg", ".gif", ".bmp",
-    ".tif", ".tiff", ".webp",
-    ".avif", ".heif", ".heic", ".jxl",
-    ".fits", ".fit", ".fts", ".dcm", ".exr", ".hdr", ".rgbe", ".pfm", ".sgi", ".rgb",
-    ".dds", ".ktx", ".ktx2", ".astc", ".pvr",
-    ".cr2", ".nef", ".arw", ".rw2", ".dng", ".orf", ".raf", ".sr2", ".pef", ".srw", ".rwl", ".nrw",
-    ".3fr", ".fff", ".mef"
-}
-
-ANIMATED_SUFFIXES = {".gif", ".tif", ".tiff", ".webp", ".avif", ".heif", ".heic", ".jxl"}
-
-def is_bitmap_file(p: Path) -> bool:
-    return p.suffix.lower() in BITMAP_SUFFIXES
-
-
-def find_bitmaps_in_folder(folder: Path, recursive: bool) -> list[Path]:
-    it = folder.rglob("*") if recursive else folder.glob("*")
-    out: list[Path] = []
-    for p in it:
-        if not p.is_file():
-            continue
-        if is_bitmap_file(p):
-            out.append(p)
-    return sorted(out)
-
-
 @dataclass
 class JobResult:
     input_path: Path
     output_svg: Path
     ok: bool
     message: str
+    deduped: bool = False
 
 
 class ScrollableFrame(ttk.Frame):
@@ -277,6 +267,23 @@ class App:
         self.use_custom_stem = tk.BooleanVar(value=False)
         self.custom_stem = tk.StringVar(value="")
 
+        # "per_pixel", "merge_h", "merge_hv" or "paths"
+        self.output_mode = tk.StringVar(value="per_pixel")
+        self.minify = tk.BooleanVar(value=False)
+        self.compact = tk.BooleanVar(value=False)
+        self.dedupe_frames = tk.BooleanVar(value=False)
+        self.animate = tk.BooleanVar(value=False)
+        self.jobs = tk.IntVar(value=1)
+        self.threads = tk.IntVar(value=1)
+        self.svgz = tk.BooleanVar(value=False)
+        self.crop_to_content = tk.BooleanVar(value=False)
+        self.resume = tk.BooleanVar(value=False)
+        self.colors = tk.IntVar(value=0)
+        self.alpha_threshold = tk.IntVar(value=0)
+        self.max_size = tk.IntVar(value=0)
+        self.prefetch_mb = tk.IntVar(value=PREFETCH_MAX_BYTES >> 20)
+        self.svgz_level = tk.IntVar(value=DEFAULT_SVGZ_LEVEL)
+
         # Status / progress
         self.status = tk.StringVar(value="Ready.")
         self.progress = tk.DoubleVar(value=0.0)
@@ -533,6 +540,49 @@ class App:
         opt_wrap.pack(fill="x", pady=(0, 10))
         ttk.Label(opt_wrap, text="Output options").pack(anchor="w")
 
+        mode_wrap = ttk.Frame(opt_wrap)
+        mode_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Radiobutton(mode_wrap, text="Per-pixel rects", value="per_pixel", variable=self.output_mode, style=self._radio_style).pack(side="left")
+        ttk.Radiobutton(mode_wrap, text="Merged rects (horizontal)", value="merge_h", variable=self.output_mode, style=self._radio_style).pack(side="left", padx=(8, 0))
+        ttk.Radiobutton(mode_wrap, text="Merged rects (horizontal + vertical)", value="merge_hv", variable=self.output_mode, style=self._radio_style).pack(side="left", padx=(8, 0))
+        ttk.Radiobutton(mode_wrap, text="Connected paths", value="paths", variable=self.output_mode, style=self._radio_style).pack(side="left", padx=(8, 0))
+        ttk.Checkbutton(opt_wrap, text="Minify merged/path output", variable=self.minify, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(opt_wrap, text="Compact per-pixel output (CSS color classes, <use> of one unit rect)", variable=self.compact, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(opt_wrap, text="Link repeated frames instead of converting them again", variable=self.dedupe_frames, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(opt_wrap, text="Write animated inputs as one animated SVG", variable=self.animate, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(opt_wrap, text="Crop to visible content (drop transparent margins)", variable=self.crop_to_content, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(opt_wrap, text="Resume interrupted per-pixel conversions (.ckpt sidecar, plain .svg only)", variable=self.resume, style=self._tog_style).pack(anchor="w", pady=(TOGGLE_ROW_SPACING, 0))
+
+        jobs_wrap = ttk.Frame(opt_wrap)
+        jobs_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Label(jobs_wrap, text="Parallel frame jobs:").pack(side="left")
+        ttk.Spinbox(jobs_wrap, from_=1, to=max(1, os.cpu_count() or 1), textvariable=self.jobs, width=5).pack(side="left", padx=(8, 0))
+        ttk.Label(jobs_wrap, text="Threads per frame:").pack(side="left", padx=(8, 0))
+        ttk.Spinbox(jobs_wrap, from_=1, to=max(1, os.cpu_count() or 1), textvariable=self.threads, width=5).pack(side="left", padx=(8, 0))
+
+        quant_wrap = ttk.Frame(opt_wrap)
+        quant_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Label(quant_wrap, text="Reduce to colors (0 = off):").pack(side="left")
+        ttk.Spinbox(quant_wrap, from_=0, to=MAX_PALETTE_COLORS, textvariable=self.colors, width=5).pack(side="left", padx=(8, 0))
+        ttk.Label(quant_wrap, text="Alpha threshold:").pack(side="left", padx=(8, 0))
+        ttk.Spinbox(quant_wrap, from_=0, to=255, textvariable=self.alpha_threshold, width=5).pack(side="left", padx=(8, 0))
+
+        size_wrap = ttk.Frame(opt_wrap)
+        size_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Label(size_wrap, text="Max size in pixels (0 = full size):").pack(side="left")
+        ttk.Spinbox(size_wrap, from_=0, to=65535, increment=64, textvariable=self.max_size, width=7).pack(side="left", padx=(8, 0))
+
+        prefetch_wrap = ttk.Frame(opt_wrap)
+        prefetch_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Label(prefetch_wrap, text="Decode next file ahead, memory cap in MB (0 = off):").pack(side="left")
+        ttk.Spinbox(prefetch_wrap, from_=0, to=65536, increment=128, textvariable=self.prefetch_mb, width=7).pack(side="left", padx=(8, 0))
+
+        svgz_wrap = ttk.Frame(opt_wrap)
+        svgz_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
+        ttk.Checkbutton(svgz_wrap, text="Write compressed .svgz", variable=self.svgz, style=self._tog_style).pack(side="left")
+        ttk.Label(svgz_wrap, text="Level:").pack(side="left", padx=(8, 0))
+        ttk.Spinbox(svgz_wrap, from_=1, to=9, textvariable=self.svgz_level, width=5).pack(side="left", padx=(8, 0))
+
         preserve_wrap = ttk.Frame(opt_wrap)
         preserve_wrap.pack(fill="x", pady=(TOGGLE_ROW_SPACING, 0))
         ttk.Checkbutton(preserve_wrap, text="Preserve folder structure", variable=self.preserve_tree, style=self._tog_style).pack(side="left")
@@ -892,27 +942,29 @@ class App:
             lines.append("Preview: No files queued.")
         else:
             to_show = min(3, len(self.files))
+            sfx = self._output_suffix()
             for i in range(to_show):
                 p = self.files[i]
                 stem = self._compute_output_stem(p, i)
                 ext = p.suffix.lower()
                 try:
-                    frames = 1
-                    with Image.open(str(p)) as im_info:
-                        frames = max(1, getattr(im_info, "n_frames", 1))
-                    if frames > 1 or ext in ANIMATED_SUFFIXES:
-                        lines.append(f"Preview: {p.name} -> {stem}_frame_00000.svg, {stem}_frame_00001.svg, …")
+                    # A FITS or DICOM file with one plane, like a one-frame GIF, gets no frame suffix.
+                    frames = count_frames(str(p))
+                    if frames > 1 and self.animate.get():
+                        lines.append(f"Preview: {p.name} -> {stem}{sfx} (animated)")
+                    elif frames > 1:
+                        lines.append(f"Preview: {p.name} -> {stem}_frame_00000{sfx}, {stem}_frame_00001{sfx}, …")
                     else:
-                        lines.append(f"Preview: {p.name} -> {stem}.svg")
+                        lines.append(f"Preview: {p.name} -> {stem}{sfx}")
                 except Exception:
                     if ext in ANIMATED_SUFFIXES:
-                        lines.append(f"Preview: {p.name} -> {stem}_frame_00000.svg, {stem}_frame_00001.svg, …")
+                        lines.append(f"Preview: {p.name} -> {stem}_frame_00000{sfx}, {stem}_frame_00001{sfx}, …")
                     else:
-                        lines.append(f"Preview: {p.name} -> {stem}.svg")
+                        lines.append(f"Preview: {p.name} -> {stem}{sfx}")
         self.naming_preview.configure(text="\n".join(lines))
 
     def _wire_preview_updates(self):
-        for var in (self.rename_all, self.rename_base, self.use_custom_stem, self.custom_stem, self.preserve_tree):
+        for var in (self.rename_all, self.rename_base, self.use_custom_stem, self.custom_stem, self.preserve_tree, self.animate, self.svgz):
             try:
                 var.trace_add("write", lambda *_: self._update_naming_preview())
             except Exception:
@@ -955,8 +1007,61 @@ class App:
 
         threading.Thread(target=self._run_worker, args=(out_dir,), daemon=True).start()
 
+    def _output_suffix(self) -> str:
+        return ".svgz" if self.svgz.get() else ".svg"
+
+    @staticmethod
+    def _output_svg_path(out_dir: Path, inp: Path, stem: str, common_root: Path | None, suffix: str = ".svg") -> Path:
+        out_svg = out_dir / (stem + suffix)
+        if common_root is not None:
+            try:
+                rel_parent = inp.parent.relative_to(common_root)
+                out_svg = out_dir / rel_parent / out_svg.name
+            except Exception:
+                pass
+        return out_svg
+
     def _run_worker(self, out_dir: Path):
         preserve_tree = self.preserve_tree.get()
+        mode = self.output_mode.get()
+        options = ConvertOptions(
+            merge={"merge_h": "h", "merge_hv": "hv"}.get(mode),
+            paths=(mode == "paths"),
+            minify=self.minify.get(),
+            profile="compact" if self.compact.get() else "full",
+            resume=self.resume.get() and not self.svgz.get(),
+        )
+        try:
+            options.threads = max(1, int(self.threads.get()))
+        except Exception:
+            options.threads = 1
+        suffix = self._output_suffix()
+        try:
+            colors = int(self.colors.get())
+            options.colors = max(2, min(MAX_PALETTE_COLORS, colors)) if colors else 0
+            options.alpha_threshold = max(0, min(255, int(self.alpha_threshold.get())))
+        except Exception:
+            options.colors, options.alpha_threshold = 0, 0
+        if self.svgz.get():
+            try:
+                options.svgz_level = max(1, min(9, int(self.svgz_level.get())))
+            except Exception:
+                options.svgz_level = DEFAULT_SVGZ_LEVEL
+        dedupe_frames = self.dedupe_frames.get()
+        animate = self.animate.get()
+        crop_to_content = self.crop_to_content.get()
+        try:
+            max_size = max(0, int(self.max_size.get()))
+        except Exception:
+            max_size = 0
+        try:
+            prefetch_mb = max(0, int(self.prefetch_mb.get()))
+        except Exception:
+            prefetch_mb = PREFETCH_MAX_BYTES >> 20
+        try:
+            jobs = max(1, int(self.jobs.get()))
+        except Exception:
+            jobs = 1
 
         common_root = None
         if preserve_tree:
@@ -968,7 +1073,21 @@ class App:
         results: list[JobResult] = []
         total_files = len(self.files)
 
-        for idx1, inp in enumerate(self.files, start=1):
+        per_pixel = not (options.merge or options.paths)
+
+        # The next file is decoded on a background thread while the current one is written.
+        # Per-pixel output of a single frame is not: convert_file streams it band by band.
+        # Its frame count is read here once and reused by the conversion below.
+        def _decode(inp: Path):
+            crop = content_crop(str(inp)) if crop_to_content else None
+            frames = count_frames(str(inp))
+            if (animate and frames > 1) or (per_pixel and frames == 1):
+                return (crop, frames), None
+            return (crop, frames), decode_single_frame(str(inp), crop=crop, max_size=max_size, max_bytes=prefetch_mb << 20)
+
+        decoded = prefetch(self.files, _decode, PREFETCH_DEPTH if prefetch_mb and total_files > 1 else 0, prefetch_mb << 20)
+        for idx1, (inp, info, image, decode_error) in enumerate(decoded, start=1):
+            crop, frame_total = info or (None, 0)
             # Update current file index for overlay
             self._current_file_idx = idx1
             self.root.after(0, self._update_pct_label)
@@ -976,48 +1095,66 @@ class App:
             file_index = idx1 - 1
             stem_base = self._compute_output_stem(inp, file_index)
 
-            frames = 1
-            try:
-                with Image.open(str(inp)) as im_info:
-                    frames = max(1, getattr(im_info, "n_frames", 1))
-            except Exception:
-                frames = 1
-
             # Base and span for this file within overall progress
             base_pct_for_prev_files = (file_index / max(1, total_files)) * 100.0
             per_file_span = 100.0 / max(1, total_files)
 
+            deduper = FrameDeduper("link") if dedupe_frames else None
             try:
-                for frame_idx in range(frames):
-                    stem = stem_base + (f"_frame_{frame_idx:05d}" if frames > 1 else "")
-                    out_svg = out_dir / (stem + ".svg")
-                    if preserve_tree and common_root is not None:
-                        try:
-                            rel_parent = inp.parent.relative_to(common_root)
-                            out_svg = out_dir / rel_parent / out_svg.name
-                        except Exception:
-                            pass
-
+                if decode_error is not None:
+                    raise decode_error
+                if animate and frame_total > 1:
+                    out_svg = self._output_svg_path(out_dir, inp, stem_base, common_root if preserve_tree else None, suffix)
                     out_svg.parent.mkdir(parents=True, exist_ok=True)
-                    im = open_image(str(inp), frame_index=frame_idx)
-                    svg_id = stem  # use final stem as SVG id
 
-                    # Per-row callback to advance progress smoothly and update percent label
-                    def _row_cb(rows_done: int, total_rows: int) -> None:
+                    def _frame_cb(frames_done: int, frame_count: int) -> None:
                         try:
-                            inner = (frame_idx + (rows_done / max(1, total_rows))) / max(1, frames)
-                            pct = base_pct_for_prev_files + inner * per_file_span
+                            pct = base_pct_for_prev_files + (frames_done / max(1, frame_count)) * per_file_span
                             self.root.after(0, self.progress.set, pct)
                             self.root.after(0, self._update_pct_label, pct)
                         except Exception:
                             pass
 
-                    generate_svg_per_pixel(im, str(out_svg), svg_id, scale=1, progress_cb=_row_cb)
-                    msg = "OK | mode=per-pixel"
-                    results.append(JobResult(inp, out_svg, True, msg))
+                    frame_count, n_rects = generate_svg_animated(str(inp), str(out_svg), stem_base, scale=1, progress_cb=_frame_cb, crop=crop, svgz_level=options.svgz_level, max_size=max_size)
+                    results.append(JobResult(inp, out_svg, True, f"OK | mode=animated | frames={frame_count} | rects={n_rects}"))
+                else:
+                    def _out_for(frame_idx: int, frames: int) -> tuple[str, str]:
+                        stem = stem_base + (f"_frame_{frame_idx:05d}" if frames > 1 else "")
+                        out_svg = self._output_svg_path(out_dir, inp, stem, common_root if preserve_tree else None, suffix)
+                        out_svg.parent.mkdir(parents=True, exist_ok=True)
+                        return str(out_svg), stem  # use final stem as SVG id
+
+                    # Per-row callback to advance progress smoothly and update percent label
+                    def _row_progress(frame_idx: int, frames: int):
+                        def _row_cb(rows_done: int, total_rows: int) -> None:
+                            try:
+                                inner = (frame_idx + (rows_done / max(1, total_rows))) / max(1, frames)
+                                pct = base_pct_for_prev_files + inner * per_file_span
+                                self.root.after(0, self.progress.set, pct)
+                                self.root.after(0, self._update_pct_label, pct)
+                            except Exception:
+                                pass
+                        return _row_cb
+
+                    frames_done = 0
+
+                    def _on_done(frame_idx: int, frames: int, out_svg: str, summary: str, duplicate: bool) -> None:
+                        nonlocal frames_done
+                        frames_done += 1
+                        results.append(JobResult(inp, Path(out_svg), True, f"OK | {summary}", deduped=duplicate))
+                        pct = base_pct_for_prev_files + (frames_done / max(1, frames)) * per_file_span
+                        self.root.after(0, self.progress.set, pct)
+                        self.root.after(0, self._update_pct_label, pct)
+
+                    if per_pixel and frame_total == 1:
+                        out_svg, stem = _out_for(0, 1)
+                        job = FileJob(str(inp), out_svg, stem, frame=0, crop=crop, band_rows=DEFAULT_BAND_ROWS, max_size=max_size)
+                        convert_file(job, options, on_done=_on_done, row_progress=_row_progress)
+                    else:
+                        convert_all_frames(str(inp), _out_for, options, jobs=jobs, deduper=deduper, on_done=_on_done, row_progress=_row_progress, crop=crop, max_size=max_size, frames=[(0, 1, image)] if image is not None else None)
 
             except Exception as e:
-                out_svg_fail = out_dir / (stem_base + ".svg")
+                out_svg_fail = out_dir / (stem_base + suffix)
                 results.append(JobResult(inp, out_svg_fail, False, str(e)))
                 self.root.after(0, self._set_progress_style, False)
 
@@ -1039,6 +1176,7 @@ class App:
     def _finish(self, results: list[JobResult], out_dir: Path):
         ok = sum(1 for r in results if r.ok)
         fail = len(results) - ok
+        deduped = sum(1 for r in results if r.deduped)
 
         log_path = out_dir / "bitmap_to_svg_log.txt"
         lines = []
@@ -1053,7 +1191,8 @@ class App:
         self.run_btn.configure(state="normal")
         self.progress.set(100.0)
         self._set_progress_style(success=(fail == 0))
-        self.status.set(f"Done. OK: {ok}, Failed: {fail}. Log: {log_path}")
+        dedupe_note = f", Deduplicated frames: {deduped}" if deduped else ""
+        self.status.set(f"Done. OK: {ok}, Failed: {fail}{dedupe_note}. Log: {log_path}")
         # Reset overlay to final counts
         self._current_file_idx = len(self.files)
         self._update_pct_label(100.0)
@@ -1091,7 +1230,9 @@ class App:
 
         ok = sum(1 for r in results if r.ok)
         fail = len(results) - ok
-        hdr = ttk.Label(main, text=f"Completed | OK: {ok} | Failed: {fail}", font=("TkDefaultFont", 11, "bold"))
+        deduped = sum(1 for r in results if r.deduped)
+        hdr_text = f"Completed | OK: {ok} | Failed: {fail}" + (f" | Deduplicated frames: {deduped}" if deduped else "")
+        hdr = ttk.Label(main, text=hdr_text, font=("TkDefaultFont", 11, "bold"))
         hdr.grid(row=0, column=0, columnspan=3, sticky="w")
 
         ttk.Label(main, text="Output folder:").grid(row=1, column=0, sticky="w", pady=(8, 0))
@@ -1162,4 +1303,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
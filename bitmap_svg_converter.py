@@ -14,11 +14,22 @@ Optional fallbacks (used if Pillow can't open a file):
 - Pillow plugins: pillow-heif, pillow-avif-plugin, pillow-jxl-plugin (registering decoders for HEIF/HEIC, AVIF, JXL)
 
 If a format isn't readable due to missing dependencies, a clear error explains what to install.
+Optional backends are imported only when a file needs them (--profile-startup shows their cost).
 
 Examples:
 - python bitmap_svg_converter.py input.png -o output.svg
 - python bitmap_svg_converter.py input.gif -o output.svg --frame 0
+- python bitmap_svg_converter.py input.gif -o output.svg --all-frames
+- python bitmap_svg_converter.py input.gif -o output.svg --all-frames --dedupe link
+- python bitmap_svg_converter.py input.tif -o output.svg --all-frames --jobs 8
+- python bitmap_svg_converter.py scan.tif -o roi.svg --crop 1024,2048,512,512
+- python bitmap_svg_converter.py sheet.png -o sprites/hero.svg --grid 32x32 --jobs 8
+- python bitmap_svg_converter.py sprites/ more.png --recursive --output-dir out --preserve-tree --workers 8
+- python bitmap_svg_converter.py --profile-startup
+- python bitmap_svg_converter.py input.gif -o output.svg --animate
 - python bitmap_svg_converter.py input.jpg -o output.svg --scale 2
+- python bitmap_svg_converter.py input.png -o output.svg --merge hv --minify
+- python bitmap_svg_converter.py input.png -o output.svg --paths --minify
 - python bitmap_svg_converter.py input.tif -o output.svg --frame 0
 - python bitmap_svg_converter.py input.webp -o output.svg
 - python bitmap_svg_converter.py image.avif -o output.svg
@@ -26,64 +37,194 @@ Examples:
 - python bitmap_svg_converter.py image.jxl -o output.svg
 - python bitmap_svg_converter.py image.dcm -o output.svg
 - python bitmap_svg_converter.py image.fits -o output.svg
+- python bitmap_svg_converter.py cube.fits -o plane.svg --all-frames --jobs 8
 - python bitmap_svg_converter.py image.exr -o output.svg
 - python bitmap_svg_converter.py image.hdr -o output.svg
 - python bitmap_svg_converter.py image.cr2 -o output.svg
 """
 
 import argparse
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import multiprocessing
 import os
+import shutil
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, replace
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 from PIL import Image, UnidentifiedImageError
 
-# Try to register Pillow plugins for HEIF/AVIF/JXL if available
-try:
-    from pillow_heif import register_heif_opener  # type: ignore
-    register_heif_opener()
-except Exception:
-    pass
-try:
-    from pillow_avif_plugin import register_avif_opener  # type: ignore
-    register_avif_opener()
-except Exception:
-    pass
-try:
-    from pillow_jxl_plugin import register_jxl_opener  # type: ignore
-    register_jxl_opener()
-except Exception:
-    pass
-
-# Optional backends
-try:
-    import numpy as np  # type: ignore
-except Exception:
-    np = None  # type: ignore
-
-# imageio v3 preferred
-try:
-    import imageio.v3 as iio  # type: ignore
-except Exception:
-    iio = None  # type: ignore
-
-# pydicom
-try:
-    import pydicom  # type: ignore
-except Exception:
-    pydicom = None  # type: ignore
-
-# astropy FITS
-try:
-    from astropy.io import fits  # type: ignore
-except Exception:
-    fits = None  # type: ignore
-
-# rawpy
-try:
-    import rawpy  # type: ignore
-except Exception:
-    rawpy = None  # type: ignore
+# Optional backends are imported on first use (see _backend), so converting a PNG never pays
+# for astropy, imageio, pydicom or rawpy. np stays None until _numpy() loads it.
+np = None  # type: ignore
+
+# Backend name -> (module to import, Pillow opener registration function or None).
+_BACKEND_SPECS = {
+    "numpy": ("numpy", None),
+    "imageio": ("imageio.v3", None),
+    "pydicom": ("pydicom", None),
+    "astropy": ("astropy.io.fits", None),
+    "rawpy": ("rawpy", None),
+    "pillow-heif": ("pillow_heif", "register_heif_opener"),
+    "pillow-avif": ("pillow_avif_plugin", "register_avif_opener"),
+    "pillow-jxl": ("pillow_jxl_plugin", "register_jxl_opener"),
+}
+
+# Pillow plugins to register before opening files with these suffixes.
+_PLUGIN_SUFFIXES = {
+    ".heif": ("pillow-heif",),
+    ".heic": ("pillow-heif",),
+    ".hif": ("pillow-heif",),
+    ".avif": ("pillow-avif", "pillow-heif"),
+    ".jxl": ("pillow-jxl",),
+}
+
+_backends: dict = {}
+# Backend name -> seconds spent importing it (and registering its Pillow opener).
+BACKEND_IMPORT_SECONDS: dict[str, float] = {}
+
+
+# Bitmap suffixes picked up when scanning folders. Lower-case comparison is used.
+BITMAP_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp",
+    ".tif", ".tiff", ".webp",
+    ".avif", ".heif", ".heic", ".jxl",
+    ".fits", ".fit", ".fts", ".dcm", ".exr", ".hdr", ".rgbe", ".pfm", ".sgi", ".rgb",
+    ".dds", ".ktx", ".ktx2", ".astc", ".pvr",
+    ".cr2", ".nef", ".arw", ".rw2", ".dng", ".orf", ".raf", ".sr2", ".pef", ".srw", ".rwl", ".nrw",
+    ".3fr", ".fff", ".mef"
+}
+
+# Suffixes of formats that may hold several frames (FITS cube planes and DICOM slices count as frames).
+ANIMATED_SUFFIXES = {".gif", ".tif", ".tiff", ".webp", ".avif", ".heif", ".heic", ".jxl", ".fits", ".fit", ".fts", ".dcm"}
+
+# Loaders that read a file as a Volume of planes.
+_VOLUME_LOADERS = ("fits", "dicom")
+
+# DICOM elements longer than this are not read by dcmread, so the pixel data of a slice stack
+# can be memmapped from its file offset instead.
+DICOM_DEFER_BYTES = 1 << 10
+
+# Photometric interpretations whose uncompressed samples are used as stored (as pixel_array does).
+_DICOM_PLAIN_PHOTOMETRIC = ("MONOCHROME1", "MONOCHROME2", "RGB")
+
+# Above this many values, the normalization window of high-bit-depth data is measured on a strided sample.
+WINDOW_SAMPLE_VALUES = 1 << 22
+
+# High-bit-depth arrays are histogrammed and scaled to uint8 this many values at a time, so the
+# float32 temporaries stay small however large the image is.
+NORMALIZE_CHUNK_VALUES = 1 << 20
+
+# Rows decoded, converted and written at a time by the banded per-pixel path (bounds peak memory).
+DEFAULT_BAND_ROWS = 256
+
+# With --threads, per-pixel output is formatted this many rows per task on a thread pool.
+PARALLEL_BAND_ROWS = 64
+
+# Resumable per-pixel output saves its checkpoint sidecar at most this often (after a band is written).
+CHECKPOINT_SECONDS = 5.0
+
+# Once the alpha bounding box of a band holds TILE_MAP_MIN_PIXELS pixels, the NumPy emitter
+# maps which TILE_SIZE x TILE_SIZE tiles hold visible pixels and visits only those.
+TILE_SIZE = 64
+TILE_MAP_MIN_PIXELS = 1 << 20
+
+# Color quantization (--colors) builds its median-cut palette from at most this many visible
+# pixels, sampled evenly; nearest-color search runs over this many distinct colors at a time.
+QUANTIZE_SAMPLE_PIXELS = 1 << 20
+NEAREST_CHUNK_COLORS = 1 << 14
+MAX_PALETTE_COLORS = 256
+
+# Batch conversion decodes this many files ahead on a background thread while the current one
+# is written, as long as the decoded images waiting hold less than PREFETCH_MAX_BYTES.
+PREFETCH_DEPTH = 1
+PREFETCH_MAX_BYTES = 512 << 20
+
+# Formats handled by dedicated single-frame loaders when Pillow can't open them.
+_DICOM_SUFFIXES = {".dcm"}
+_FITS_SUFFIXES = {".fits", ".fit", ".fts"}
+_RAW_SUFFIXES = {
+    ".cr2", ".nef", ".arw", ".rw2", ".dng", ".orf", ".raf", ".sr2", ".pef", ".srw", ".rwl", ".nrw",
+    ".3fr", ".fff", ".mef",
+}
+
+# Leading-byte signatures (offset, magic, loader) of formats that should skip Pillow and go
+# straight to a dedicated loader. RAW files are mostly TIFF containers, so they route by suffix.
+_MAGIC_LOADERS = (
+    (0, b"SIMPLE  =", "fits"),
+    (128, b"DICM", "dicom"),
+    (0, b"FUJIFILMCCD-RAW", "raw"),
+    (0, b"\x76\x2f\x31\x01", "imageio"),  # OpenEXR
+    (0, b"#?RADIANCE", "imageio"),
+    (0, b"#?RGBE", "imageio"),
+    (0, b"PF\n", "imageio"),  # PFM, color
+    (0, b"Pf\n", "imageio"),  # PFM, grayscale
+    (0, b"\xabKTX 11\xbb", "imageio"),
+    (0, b"\xabKTX 20\xbb", "imageio"),
+)
+_MAGIC_BYTES = max(offset + len(magic) for offset, magic, _ in _MAGIC_LOADERS)
+
+_LOADER_ERRORS = {
+    "dicom": "Failed to read DICOM (.dcm). Please install: pip install pydicom numpy",
+    "fits": "Failed to read FITS. Please install: pip install astropy numpy",
+    "raw": "Failed to read RAW file. Please install: pip install rawpy numpy",
+}
+
+# Frame duration assumed for --animate when the source frame has none (GIF/WebP often store 0).
+DEFAULT_FRAME_MS = 100
+
+# How a repeated frame stands in for its earlier twin: hard link (falling back to a symlink,
+# then a copy), symlink, or only a manifest entry.
+DEDUPE_MODES = ("link", "symlink", "manifest")
+
+# gzip level used for .svgz output unless one is given: favors throughput over the last few percent.
+DEFAULT_SVGZ_LEVEL = 6
+
+# Emission engines for generate_svg_per_pixel. "auto" uses NumPy when available.
+ENGINES = ("auto", "numpy", "python")
+
+# Per-pixel output profiles: "full" writes a self-contained <rect> (id, size, inline style) per
+# pixel; "compact" writes <use> of one unit rect per pixel, filled through CSS classes.
+PROFILES = ("full", "compact")
+
+# The NumPy engine formats whole rows at a time, grouping rows until a batch holds about this many pixels.
+NUMPY_BATCH_PIXELS = 1 << 16
+
+# Merge modes for generate_svg_merged: horizontal runs only, or runs stacked vertically too.
+MERGE_MODES = ("h", "hv")
+
+# Layout of a per-pixel <rect> for the NumPy engine: byte constants interleaved with column names.
+_PIXEL_RECT_PARTS = (
+    b'<rect id="', "x", b"-", "y", b'" x="', "x", b'" y="', "y",
+    b'" width="1" height="1" shape-rendering="crispEdges" style="fill:#', "r", "g", "b",
+    b";opacity:", "a", b';"></rect>',
+)
+
+# Same element with the color written from one per-palette-entry "rrggbb" column.
+_PALETTE_RECT_PARTS = (
+    b'<rect id="', "x", b"-", "y", b'" x="', "x", b'" y="', "y",
+    b'" width="1" height="1" shape-rendering="crispEdges" style="fill:#', "c",
+    b";opacity:", "a", b';"></rect>',
+)
+
+_NP_TABLES: dict = {}
+
+# Modes whose pixels are palette indices or gray levels (plus alpha). Decoded frames in these
+# modes are kept as they are, so styles are formatted once per entry rather than per pixel.
+_PALETTE_MODES = ("1", "L", "LA", "P", "PA")
+
+# The Python emitter caches the style of at most this many distinct colors per band.
+STYLE_CACHE_SIZE = 4096
 
 
 def rgba_to_hex(r: int, g: int, b: int) -> str:
@@ -91,37 +232,181 @@ def rgba_to_hex(r: int, g: int, b: int) -> str:
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
-def _require_numpy_for(msg_format: str):
+def _backend(name: str):
+    """Import backend name on first use and cache it; returns the module, or None when unavailable."""
+    if name in _backends:
+        return _backends[name]
+    module_name, register = _BACKEND_SPECS[name]
+    t0 = time.perf_counter()
+    try:
+        mod = importlib.import_module(module_name)
+        if register:
+            getattr(mod, register)()
+    except Exception:
+        mod = None
+    BACKEND_IMPORT_SECONDS[name] = time.perf_counter() - t0
+    _backends[name] = mod
+    return mod
+
+
+def _numpy():
+    """Load numpy into the module-level np on first use; returns it, or None when not installed."""
+    global np
     if np is None:
+        np = _backend("numpy")
+    return np
+
+
+def _sniff_plugins(head: bytes) -> tuple[str, ...]:
+    """Pillow plugins suggested by a file's leading bytes (ISO-BMFF brands, JPEG XL signatures)."""
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"avif", b"avis"):
+            return ("pillow-avif", "pillow-heif")
+        if brand in (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"):
+            return ("pillow-heif",)
+    if head.startswith(b"\xff\x0a") or head.startswith(b"\x00\x00\x00\x0cJXL \r\n\x87\n"):
+        return ("pillow-jxl",)
+    return ()
+
+
+def ensure_pillow_plugins(path: str) -> None:
+    """Register the HEIF/AVIF/JXL Pillow openers a file needs, by extension and magic bytes."""
+    names = _PLUGIN_SUFFIXES.get(Path(path).suffix.lower(), ())
+    if not names:
+        try:
+            with open(path, "rb") as f:
+                names = _sniff_plugins(f.read(16))
+        except OSError:
+            return
+    for name in names:
+        _backend(name)
+
+
+def profile_backends() -> list[tuple[str, float, str]]:
+    """
+    Return (name, import seconds, status) for every backend. Backends already loaded report
+    "used"; the rest are imported now to measure them and report "available" or "not installed".
+    """
+    used = {name for name, mod in _backends.items() if mod is not None}
+    report = []
+    for name in _BACKEND_SPECS:
+        available = _backend(name) is not None
+        status = "used" if name in used else ("available" if available else "not installed")
+        report.append((name, BACKEND_IMPORT_SECONDS[name], status))
+    return report
+
+
+def print_backend_profile() -> None:
+    print("Backend import cost (imported only when a file needs it):")
+    for name, seconds, status in profile_backends():
+        print(f"  {name:<12} {seconds * 1000:8.1f} ms  {status}")
+
+
+def _require_numpy_for(msg_format: str):
+    if _numpy() is None:
         raise RuntimeError(
             f"{msg_format} requires numpy. Please install: pip install numpy"
         )
 
 
-def _normalize_to_uint8(arr):
-    """Normalize numpy array of dtype float or >8-bit integers to uint8 [0,255]."""
-    _require_numpy_for("Image conversion")
-    if arr.dtype == np.uint8:
-        return arr
-    a = arr.astype(np.float32)
-    lo = float(np.nanpercentile(a, 1.0))
-    hi = float(np.nanpercentile(a, 99.0))
+def _row_chunks(arr) -> Iterator[tuple[int, int]]:
+    """(start, stop) row ranges of arr holding about NORMALIZE_CHUNK_VALUES values each."""
+    rows = arr.shape[0] if arr.ndim else 1
+    step = max(1, NORMALIZE_CHUNK_VALUES // max(1, arr.size // max(1, rows)))
+    for y0 in range(0, rows, step):
+        yield y0, min(rows, y0 + step)
+
+
+def _histogram_window(arr, chunks=None) -> tuple[float, float]:
+    """
+    Exact 1st/99th percentiles (linear interpolation, as np.percentile) of an 8/16-bit integer
+    array from a value histogram accumulated chunk by chunk, without sorting or a float copy.
+    chunks, when given, are the arrays (of arr's dtype) to histogram instead of arr's rows.
+    """
+    offset = int(np.iinfo(arr.dtype).min)
+    counts = np.zeros(1 << (8 * arr.dtype.itemsize), dtype=np.int64)
+    if chunks is None:
+        chunks = (arr[y0:y1] for y0, y1 in _row_chunks(arr))
+    for chunk in chunks:
+        chunk = np.asarray(chunk).ravel()
+        if offset:
+            chunk = chunk.astype(np.int32) - offset
+        counts += np.bincount(chunk, minlength=counts.size)
+    cum = np.cumsum(counts)
+    n = int(cum[-1])
+
+    def value_at(rank: int) -> int:
+        return int(np.searchsorted(cum, rank, side="right")) + offset
+
+    def percentile(q: float) -> float:
+        pos = q / 100.0 * (n - 1)
+        k = int(np.floor(pos))
+        v0 = value_at(k)
+        v1 = value_at(min(k + 1, n - 1))
+        return v0 + (v1 - v0) * (pos - k)
+
+    lo, hi = percentile(1.0), percentile(99.0)
     if hi <= lo:
-        lo = float(np.nanmin(a))
-        hi = float(np.nanmax(a))
+        nonzero = np.flatnonzero(counts)
+        lo, hi = float(nonzero[0] + offset), float(nonzero[-1] + offset)
+    return lo, hi
+
+
+def _normalization_window(arr, chunks=None) -> tuple[float, float]:
+    """
+    Return the (lo, hi) input range mapped to 0..255: the 1st..99th percentile, widened to
+    min..max for flat data. 8/16-bit integer data is measured exactly from a histogram (of
+    chunks, if given; see _histogram_window); other arrays above WINDOW_SAMPLE_VALUES are
+    measured on an evenly strided subset of rows and columns, so a memmapped array is only
+    partly read.
+    """
+    if arr.dtype.kind in "iu" and arr.dtype.itemsize <= 2 and arr.size:
+        lo, hi = _histogram_window(arr, chunks)
+    else:
+        if arr.size > WINDOW_SAMPLE_VALUES and arr.ndim >= 2:
+            step = int(np.ceil(np.sqrt(arr.size / WINDOW_SAMPLE_VALUES)))
+            arr = arr[::step, ::step]
+        a = np.asarray(arr, dtype=np.float32)
+        lo, hi = (float(v) for v in np.nanpercentile(a, [1.0, 99.0]))
+        if hi <= lo:
+            lo = float(np.nanmin(a))
+            hi = float(np.nanmax(a))
     if hi <= lo:
         hi = lo + 1.0
-    a = (a - lo) / (hi - lo)
-    a = np.clip(a, 0.0, 1.0)
-    a = (a * 255.0).astype(np.uint8)
-    return a
+    return lo, hi
+
+
+def _normalize_to_uint8(arr, window: Optional[tuple[float, float]] = None):
+    """
+    Normalize numpy array of dtype float or >8-bit integers to uint8 [0,255].
+    window fixes the (lo, hi) range, so bands of one image share a scale.
+
+    Rows are scaled and clipped in place a chunk at a time into a preallocated uint8 array,
+    so only one chunk-sized float32 temporary exists at once.
+    """
+    _require_numpy_for("Image conversion")
+    if arr.dtype == np.uint8:
+        return arr
+    lo, hi = window if window is not None else _normalization_window(arr)
+    gain = 255.0 / (hi - lo)
+    out = np.empty(arr.shape, dtype=np.uint8)
+    for y0, y1 in _row_chunks(arr):
+        a = np.asarray(arr[y0:y1], dtype=np.float32)
+        if np.may_share_memory(a, arr):
+            a = a.copy()
+        a -= lo
+        a *= gain
+        np.clip(a, 0.0, 255.0, out=a)
+        out[y0:y1] = a
+    return out
 
 
-def _numpy_to_pil_rgba(arr) -> Image.Image:
-    """Convert numpy array (H,W) or (H,W,C) to PIL RGBA."""
+def _numpy_to_pil_rgba(arr, window: Optional[tuple[float, float]] = None) -> Image.Image:
+    """Convert numpy array (H,W) or (H,W,C) to PIL RGBA. window applies to (H,W), (H,W,1) and (H,W,3) arrays."""
     _require_numpy_for("Image conversion")
     if arr.ndim == 2:
-        a8 = _normalize_to_uint8(arr)
+        a8 = _normalize_to_uint8(arr, window)
         im = Image.fromarray(a8, mode="L").convert("RGBA")
         return im
     elif arr.ndim == 3:
@@ -131,7 +416,7 @@ def _numpy_to_pil_rgba(arr) -> Image.Image:
             im = Image.fromarray(a8, mode="RGBA")
             return im
         elif c == 3:
-            a8 = _normalize_to_uint8(arr)
+            a8 = _normalize_to_uint8(arr, window)
             im = Image.fromarray(a8, mode="RGB").convert("RGBA")
             return im
         elif c == 2:
@@ -141,7 +426,7 @@ def _numpy_to_pil_rgba(arr) -> Image.Image:
             im = Image.fromarray(rgb, mode="RGBA")
             return im
         elif c == 1:
-            a8 = _normalize_to_uint8(arr[:, :, 0])
+            a8 = _normalize_to_uint8(arr[:, :, 0], window)
             im = Image.fromarray(a8, mode="L").convert("RGBA")
             return im
         else:
@@ -150,125 +435,453 @@ def _numpy_to_pil_rgba(arr) -> Image.Image:
         raise RuntimeError(f"Unsupported array shape: {arr.shape}")
 
 
+def is_bitmap_file(p: Path) -> bool:
+    return p.suffix.lower() in BITMAP_SUFFIXES
+
+
+def find_bitmaps_in_folder(folder: Path, recursive: bool) -> list[Path]:
+    it = folder.rglob("*") if recursive else folder.glob("*")
+    out: list[Path] = []
+    for p in it:
+        if not p.is_file():
+            continue
+        if is_bitmap_file(p):
+            out.append(p)
+    return sorted(out)
+
+
+def collect_bitmap_inputs(inputs: list[str], recursive: bool) -> list[Path]:
+    """Expand files and folders into a list of bitmap files (explicit files are kept as given)."""
+    out: list[Path] = []
+    seen: set[Path] = set()
+    for raw in inputs:
+        p = Path(raw).expanduser()
+        found = find_bitmaps_in_folder(p, recursive) if p.is_dir() else [p]
+        for f in found:
+            key = f.resolve()
+            if key not in seen:
+                seen.add(key)
+                out.append(f)
+    return out
+
+
 def _read_with_imageio(path: str, frame_index: int) -> Optional[Image.Image]:
     """Try reading with imageio; returns PIL Image or None if not possible."""
-    if iio is None:
+    iio = _backend("imageio")
+    if iio is None or _numpy() is None:
         return None
     try:
         arr = iio.imread(path, index=frame_index)
-        return _numpy_to_pil_rgba(arr)
-    except Exception:
+    except TypeError:
+        # Plugin without an index argument: read once without it.
         try:
             arr = iio.imread(path)
-            return _numpy_to_pil_rgba(arr)
         except Exception:
             return None
+    except Exception:
+        return None
+    try:
+        return _numpy_to_pil_rgba(arr)
+    except Exception:
+        return None
 
 
-def _read_dicom(path: str) -> Optional[Image.Image]:
-    if pydicom is None:
+class Volume:
+    """
+    The image planes of a FITS cube or the frames of a multi-frame DICOM as one (N, H, W) or
+    (N, H, W, C) array, memmapped where the file allows, so a plane is only read when it is
+    converted. All planes are normalized with one window, measured once for the volume
+    (see window), so they share a scale.
+    """
+
+    def __init__(self, planes, close: Optional[Callable[[], None]] = None):
+        self.planes = planes
+        self._close = close
+
+    @property
+    def count(self) -> int:
+        return self.planes.shape[0]
+
+    def box(self, crop: Optional[tuple[int, int, int, int]] = None) -> tuple[int, int, int, int]:
+        height, width = self.planes.shape[1:3]
+        return _clamp_crop(crop, width, height) if crop is not None else (0, 0, width, height)
+
+    def region(self, index: int, box: tuple[int, int, int, int], factor: int = 1):
+        """Plane index (plane 0 when out of range, as for Pillow frames) cropped to box and reduced by factor."""
+        return _reduced_plane(self.planes[index if 0 <= index < self.count else 0], box, factor)
+
+    def window(self, box: tuple[int, int, int, int], factor: int = 1) -> Optional[tuple[float, float]]:
+        """
+        The (lo, hi) normalization window of every plane cropped to box and reduced by
+        factor, or None for 8-bit data. A single plane is measured as _normalization_window
+        does; 8/16-bit integer volumes are histogrammed exactly, plane by plane; others are
+        measured on an evenly strided subset of planes, rows and columns of about
+        WINDOW_SAMPLE_VALUES values.
+        """
+        if self.planes.dtype == np.uint8:
+            return None
+        if self.count == 1:
+            return _normalization_window(self.region(0, box, factor))
+        if self.planes.dtype.kind in "iu" and self.planes.dtype.itemsize <= 2:
+            return _normalization_window(self.planes, (self.region(i, box, factor) for i in range(self.count)))
+        values = self.count * -(-(box[2] - box[0]) // factor) * -(-(box[3] - box[1]) // factor)
+        step = max(1, int(np.ceil(np.cbrt(values / WINDOW_SAMPLE_VALUES))))
+        return _normalization_window(np.stack([np.asarray(self.region(i, box, factor)[::step, ::step]) for i in range(0, self.count, step)]))
+
+    def image(self, index: int, box: tuple[int, int, int, int], factor: int = 1, window: Optional[tuple[float, float]] = None) -> Image.Image:
+        """Plane index as an RGBA image (see region), normalized with window."""
+        return _numpy_to_pil_rgba(np.asarray(self.region(index, box, factor)), window)
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self) -> "Volume":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _fits_volume(path: str) -> Optional[Volume]:
+    """The first image HDU of a FITS file; axes before the last two (cube planes, Stokes, ...) are flattened into planes."""
+    fits = _backend("astropy")
+    if fits is None:
         return None
+    hdul = fits.open(path, memmap=True)
     try:
-        ds = pydicom.dcmread(path)
-        if not hasattr(ds, "pixel_array"):
-            return None
-        arr = ds.pixel_array
-        if np is None:
-            return None
-        if arr.ndim == 3 and arr.shape[-1] in (3, 4):
-            return _numpy_to_pil_rgba(arr)
+        data = None
+        if hdul and hdul[0].data is not None:
+            data = hdul[0].data
         else:
-            return _numpy_to_pil_rgba(arr)
+            for hdu in hdul:
+                if hasattr(hdu, "data") and hdu.data is not None:
+                    data = hdu.data
+                    break
+        if data is not None and data.ndim >= 2:
+            return Volume(data.reshape((-1,) + data.shape[-2:]), hdul.close)
     except Exception:
+        hdul.close()
+        raise
+    hdul.close()
+    return None
+
+
+def _dicom_volume(path: str) -> Optional[Volume]:
+    """
+    The slices of a DICOM file. Uncompressed little-endian pixel data is memmapped at its file
+    offset (dcmread defers it); compressed pixel data is decoded by pydicom, every frame at once.
+    """
+    pydicom = _backend("pydicom")
+    if pydicom is None:
         return None
+    ds = pydicom.dcmread(path, defer_size=DICOM_DEFER_BYTES)
+    if "PixelData" not in ds:
+        return None
+    count = int(ds.get("NumberOfFrames", 1) or 1)
+    rows, cols, samples = int(ds.Rows), int(ds.Columns), int(ds.get("SamplesPerPixel", 1) or 1)
+    bits, signed = int(ds.BitsAllocated), bool(ds.get("PixelRepresentation", 0))
+    syntax = ds.file_meta.TransferSyntaxUID
+    offset = getattr(ds.get_item(0x7FE00010), "value_tell", None)
+    if (
+        offset is not None
+        and bits in (8, 16, 32)
+        and syntax.is_little_endian
+        and not syntax.is_compressed
+        and not getattr(syntax, "is_deflated", False)
+        and (not signed or int(ds.get("BitsStored", bits)) == bits)
+        and ds.get("PhotometricInterpretation", "") in _DICOM_PLAIN_PHOTOMETRIC
+    ):
+        planar = samples > 1 and int(ds.get("PlanarConfiguration", 0) or 0) == 1
+        if samples == 1:
+            shape = (count, rows, cols)
+        else:
+            shape = (count, samples, rows, cols) if planar else (count, rows, cols, samples)
+        planes = np.memmap(path, dtype=np.dtype(f"<{'i' if signed else 'u'}{bits // 8}"), mode="r", offset=offset, shape=shape)
+        return Volume(planes.transpose(0, 2, 3, 1) if planar else planes)
+    planes = ds.pixel_array
+    return Volume(planes if count > 1 else planes[np.newaxis])
 
 
-def _read_fits(path: str) -> Optional[Image.Image]:
-    if fits is None or np is None:
+def open_volume(path: str, loader: str) -> Optional[Volume]:
+    """
+    The Volume of a FITS ("fits") or DICOM ("dicom") file, or None when numpy or the loader's
+    backend is missing or the file has no image data it reads. Close it when done.
+    """
+    if _numpy() is None:
         return None
     try:
-        with fits.open(path, memmap=True) as hdul:
-            data = None
-            if hdul and hdul[0].data is not None:
-                data = hdul[0].data
-            else:
-                for hdu in hdul:
-                    if hasattr(hdu, "data") and hdu.data is not None:
-                        data = hdu.data
-                        break
-            if data is None:
-                return None
-            arr = np.asarray(data)
-            if arr.ndim == 3:
-                arr = arr[0]
-            return _numpy_to_pil_rgba(arr)
+        return _fits_volume(path) if loader == "fits" else _dicom_volume(path)
     except Exception:
         return None
 
 
-def _read_raw(path: str) -> Optional[Image.Image]:
-    if rawpy is None or np is None:
+def _read_volume(path: str, loader: str, frame_index: int = 0, crop: Optional[tuple[int, int, int, int]] = None, reduce: int = 1, max_size: int = 0) -> Optional[Image.Image]:
+    """Plane frame_index of a FITS or DICOM file, cropped, reduced and normalized with its volume's window."""
+    volume = open_volume(path, loader)
+    if volume is None:
+        return None
+    with volume:
+        try:
+            box = volume.box(crop)
+            factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+            return volume.image(frame_index, box, factor, volume.window(box, factor))
+        except Exception:
+            return None
+
+
+def _read_raw(path: str, crop: Optional[tuple[int, int, int, int]] = None, reduce: int = 1, max_size: int = 0) -> Optional[Image.Image]:
+    """
+    Develop a camera RAW file, cropped and reduced as for _crop_reduce. From a factor of 2,
+    LibRaw develops at half size (one pixel per Bayer quad), skipping demosaicing.
+    """
+    rawpy = _backend("rawpy")
+    if rawpy is None or _numpy() is None:
         return None
     try:
         with rawpy.imread(path) as raw:
+            width, height = raw.sizes.width, raw.sizes.height
+            box = _clamp_crop(crop, width, height) if crop is not None else (0, 0, width, height)
+            factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
             rgb = raw.postprocess(
                 output_bps=8,
                 no_auto_bright=True,
                 use_camera_wb=True,
                 gamma=(1, 1),
+                half_size=factor >= 2,
             )
-            return _numpy_to_pil_rgba(rgb)
+            im = _numpy_to_pil_rgba(rgb)
     except Exception:
         return None
+    if factor < 2:
+        return _crop_rgba(im, crop)
+    full = (im.width * 2, im.height * 2)
+    box = _clamp_crop(crop, *full) if crop is not None else (0, 0) + full
+    return _reduced(im, box, factor, 2)
+
+
+def parse_crop(spec: str) -> tuple[int, int, int, int]:
+    """Parse an "x,y,w,h" region of interest."""
+    try:
+        x, y, w, h = (int(v) for v in spec.split(","))
+    except ValueError:
+        raise ValueError(f"Invalid crop '{spec}'. Expected x,y,w,h") from None
+    if x < 0 or y < 0 or w <= 0 or h <= 0:
+        raise ValueError(f"Invalid crop '{spec}'. Expected x,y >= 0 and w,h > 0")
+    return x, y, w, h
+
+
+def parse_grid(spec: str) -> tuple[int, int]:
+    """Parse a "WxH" sprite-sheet cell size."""
+    try:
+        w, h = (int(v) for v in spec.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid grid '{spec}'. Expected WxH, e.g. 32x32") from None
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Invalid grid '{spec}'. Expected w,h > 0")
+    return w, h
+
+
+def _clamp_crop(crop: tuple[int, int, int, int], width: int, height: int) -> tuple[int, int, int, int]:
+    """Turn an (x, y, w, h) crop into a (left, top, right, bottom) box inside the image."""
+    x, y, w, h = crop
+    box = (min(x, width), min(y, height), min(x + w, width), min(y + h, height))
+    if box[2] <= box[0] or box[3] <= box[1]:
+        raise RuntimeError(f"Crop {x},{y},{w},{h} lies outside the {width}x{height} image")
+    return box
+
+
+def _crop_rgba(im: Image.Image, crop: Optional[tuple[int, int, int, int]]) -> Image.Image:
+    if crop is None:
+        return im
+    return im.crop(_clamp_crop(crop, *im.size))
+
+
+def reduction_factor(width: int, height: int, reduce: int = 1, max_size: int = 0) -> int:
+    """Integer downscale factor for a width x height (cropped) image: at least reduce, and enough that neither side exceeds max_size (0 = no limit)."""
+    factor = max(1, reduce)
+    if max_size > 0:
+        factor = max(factor, -(-max(width, height) // max_size))
+    return factor
+
+
+def _reduced(im: Image.Image, box: tuple[int, int, int, int], factor: int, scale: float = 1) -> Image.Image:
+    """
+    Nearest-neighbor downscale by factor of box (left, top, right, bottom in full-size
+    coordinates) from im, which was decoded at 1/scale of full size. Each output pixel is
+    the source pixel at the center of its factor x factor box, so no new colors appear.
+    """
+    size = (-(-(box[2] - box[0]) // factor), -(-(box[3] - box[1]) // factor))
+    return im.resize(size, Image.Resampling.NEAREST, box=tuple(v / scale for v in box))
+
+
+def _reduce_pillow(im: Image.Image, box: tuple[int, int, int, int], factor: int) -> Image.Image:
+    """
+    _reduced for a Pillow frame; JPEG frames are first decoded at 1/2, 1/4 or 1/8 scale
+    (draft) when that stays at or above the target size. A draft pixel is the average of its
+    DCT block, not a sample, so a reduced JPEG can hold colors its full decode lacks. JPEG is
+    lossy, so samples would be no truer to the source; lossless formats are sampled exactly.
+    """
+    full_width = im.width
+    if im.format == "JPEG" and factor >= 2:
+        im.draft(im.mode, (-(-im.width // factor), -(-im.height // factor)))
+    return _reduced(im, box, factor, full_width / im.width)
+
+
+def _nearest_indices(start: int, stop: int, factor: int):
+    """Source indices _reduced samples along one axis of [start, stop)."""
+    count = -(-(stop - start) // factor)
+    step = np.full(count, (stop - start) / count)
+    step[0] = start + step[0] * 0.5
+    # Accumulated step by step, as Pillow's nearest-neighbor transform does, so the indices match.
+    return np.floor(np.add.accumulate(step)).astype(np.intp)
+
+
+def _reduced_plane(data, box: tuple[int, int, int, int], factor: int):
+    """A 2-D array cropped to box and reduced as _reduced would; a memmap is only read at the sampled rows."""
+    left, top, right, bottom = box
+    if factor == 1:
+        return data[top:bottom, left:right]
+    return data[_nearest_indices(top, bottom, factor)][:, _nearest_indices(left, right, factor)]
+
+
+def _crop_reduce(im: Image.Image, crop: Optional[tuple[int, int, int, int]], reduce: int = 1, max_size: int = 0) -> Image.Image:
+    """_crop_rgba, then the nearest-neighbor reduction reduce and max_size ask for (see reduction_factor)."""
+    box = _clamp_crop(crop, *im.size) if crop is not None else (0, 0) + im.size
+    factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+    if factor > 1:
+        return _reduced(im, box, factor)
+    return _crop_rgba(im, crop)
+
+
+def _open_pillow_frame(path: str, frame_index: int) -> Image.Image:
+    ensure_pillow_plugins(path)
+    im = Image.open(path)
+    try:
+        if getattr(im, "is_animated", False):
+            im.seek(frame_index)
+    except EOFError:
+        im.seek(0)
+    return im
+
+
+# Loader that last decoded each extension in this process, tried first when sniffing is inconclusive.
+# Only kept for extensions Pillow has no plugin for: files Pillow registers always try it first, so
+# one file rescued by a fallback does not change how the rest of a batch is decoded.
+_loader_by_suffix: dict[str, str] = {}
+
+
+def sniff_loader(path: str) -> Optional[str]:
+    """Loader ("fits", "dicom", "raw", "imageio") a file's leading bytes or RAW suffix call for, else None."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_MAGIC_BYTES)
+    except OSError:
+        return None
+    for offset, magic, loader in _MAGIC_LOADERS:
+        if head.startswith(magic, offset):
+            return loader
+    if Path(path).suffix.lower() in _RAW_SUFFIXES:
+        return "raw"
+    return None
+
 
+def _suffix_loader(ext: str) -> str:
+    if ext in _DICOM_SUFFIXES:
+        return "dicom"
+    if ext in _FITS_SUFFIXES:
+        return "fits"
+    if ext in _RAW_SUFFIXES:
+        return "raw"
+    return "imageio"
 
-def open_image(path: str, frame_index: int = 0) -> Image.Image:
+
+def _loader_order(path: str) -> list[str]:
+    """
+    Loaders to try for path, most likely first: the sniffed loader, else the one that last
+    worked for this extension (if Pillow has no plugin for it), then Pillow and the
+    extension's usual fallback.
+    """
+    ext = Path(path).suffix.lower()
+    first = sniff_loader(path) or _loader_by_suffix.get(ext)
+    order = [first] if first else []
+    for loader in ("pillow", _suffix_loader(ext)):
+        if loader not in order:
+            order.append(loader)
+    return order
+
+
+def _remember_loader(path: str, loader: str) -> None:
+    ext = Path(path).suffix.lower()
+    if ext not in Image.registered_extensions():
+        _loader_by_suffix[ext] = loader
+
+
+def _frame_image(im: Image.Image, palette: bool = False) -> Image.Image:
+    """A detached RGBA copy of a Pillow frame, or (palette) a plain copy if it is in a _PALETTE_MODES mode."""
+    if palette and im.mode in _PALETTE_MODES:
+        return im.copy()
+    return im.convert("RGBA")
+
+
+def _load_with(loader: str, path: str, frame_index: int, crop: Optional[tuple[int, int, int, int]], palette: bool = False, reduce: int = 1, max_size: int = 0) -> Optional[Image.Image]:
+    if loader == "pillow":
+        try:
+            im = _open_pillow_frame(path, frame_index)
+            box = _clamp_crop(crop, *im.size) if crop is not None else (0, 0) + im.size
+            factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+            if factor > 1:
+                im = _reduce_pillow(im, box, factor)
+            elif crop is not None:
+                im = im.crop(box)
+            return _frame_image(im, palette)
+        except (UnidentifiedImageError, OSError):
+            return None
+    if loader in _VOLUME_LOADERS:
+        return _read_volume(path, loader, frame_index, crop, reduce, max_size)
+    if loader == "raw":
+        return _read_raw(path, crop, reduce, max_size)
+    im = _read_with_imageio(path, frame_index)
+    return _crop_reduce(im, crop, reduce, max_size) if im is not None else None
+
+
+def open_image(path: str, frame_index: int = 0, crop: Optional[tuple[int, int, int, int]] = None, palette: bool = False, reduce: int = 1, max_size: int = 0) -> Image.Image:
     """
     Open an image and return the RGBA frame specified.
 
     Strategy:
-    1) Try Pillow (plus registered plugins). If multi-frame, seek frame_index.
-    2) If Pillow fails, try specialized loaders based on file extension.
+    1) Sniff the leading bytes: FITS, DICOM, RAW, EXR, HDR, PFM and KTX files go straight to
+       their loader; otherwise the loader that last worked for an extension Pillow does not
+       register goes first.
+    2) Then try Pillow (plus registered plugins, seeking frame_index if multi-frame) and the
+       specialized loader for the file extension.
     3) If all fail, raise a helpful error indicating which package to install.
-    """
-    try:
-        im = Image.open(path)
-        try:
-            if getattr(im, "is_animated", False):
-                im.seek(frame_index)
-        except EOFError:
-            im.seek(0)
-        return im.convert("RGBA")
-    except (UnidentifiedImageError, OSError):
-        pass
 
-    ext = Path(path).suffix.lower()
+    crop is an optional (x, y, w, h) region of interest; only it is converted to RGBA
+    (and, for FITS and DICOM, only it is normalized). frame_index picks the plane of a FITS
+    cube or the slice of a multi-frame DICOM, normalized with a window shared by all of them. With palette, Pillow frames in a palette or
+    grayscale mode (_PALETTE_MODES) are returned unconverted.
 
-    if ext == ".dcm":
-        im = _read_dicom(path)
-        if im is not None:
-            return im
-        raise RuntimeError("Failed to read DICOM (.dcm). Please install: pip install pydicom numpy")
+    reduce and max_size shrink the (cropped) frame by an integer factor (reduction_factor),
+    sampling nearest neighbors, and use cheaper reduced decodes where a loader has one:
+    JPEG draft decoding, LibRaw half-size development, strided reads of FITS memmaps. The
+    first two average source pixels (DCT blocks, Bayer quads) instead of sampling them.
+    """
+    return _open_in_order(path, frame_index, crop, _loader_order(path), palette, reduce, max_size)
 
-    if ext in {".fits", ".fit", ".fts"}:
-        im = _read_fits(path)
-        if im is not None:
-            return im
-        raise RuntimeError("Failed to read FITS. Please install: pip install astropy numpy")
 
-    raw_exts = {
-        ".cr2", ".nef", ".arw", ".rw2", ".dng", ".orf", ".raf", ".sr2", ".pef", ".srw", ".rwl", ".nrw",
-        ".3fr", ".fff", ".mef",
-    }
-    if ext in raw_exts:
-        im = _read_raw(path)
+def _open_in_order(path: str, frame_index: int, crop: Optional[tuple[int, int, int, int]], order: list[str], palette: bool = False, reduce: int = 1, max_size: int = 0) -> Image.Image:
+    for loader in order:
+        im = _load_with(loader, path, frame_index, crop, palette, reduce, max_size)
         if im is not None:
+            _remember_loader(path, loader)
             return im
-        raise RuntimeError("Failed to read RAW file. Please install: pip install rawpy numpy")
 
-    im = _read_with_imageio(path, frame_index)
-    if im is not None:
-        return im
+    ext = Path(path).suffix.lower()
+    sniffed = sniff_loader(path) or _suffix_loader(ext)
+    if sniffed in _LOADER_ERRORS:
+        raise RuntimeError(_LOADER_ERRORS[sniffed])
 
     hints = {
         ".exr": "OpenEXR may require imageio with appropriate plugins. Try: pip install imageio numpy",
@@ -291,93 +904,2089 @@ def open_image(path: str, frame_index: int = 0) -> Image.Image:
     raise RuntimeError(f"Could not open '{path}' with Pillow or fallbacks. Hint: {msg_hint}")
 
 
-def emit_svg_header(f, svg_id: str, width: int, height: int, scale: int):
+def open_image_bands(path: str, frame_index: int = 0, crop: Optional[tuple[int, int, int, int]] = None, band_rows: int = DEFAULT_BAND_ROWS, palette: bool = False, start_row: int = 0, reduce: int = 1, max_size: int = 0) -> tuple[tuple[int, int], Iterator[tuple[int, Image.Image]]]:
     """
-    Write the SVG header with the requested id, dimensions, and viewBox.
-    We keep 1 unit per pixel in the viewBox and scale rendered size via width/height.
+    Like open_image, but return ((width, height), bands) where bands yields (y, RGBA band)
+    of at most band_rows rows, with y relative to the (cropped) image.
+
+    Only one band is held as RGBA at a time. Pillow decodes the frame once in its native
+    mode (1-4 bytes per pixel) and bands are cropped and converted from that; FITS and
+    DICOM planes are sliced from the memmap and normalized with their volume's window
+    (Volume.window), measured once; other loaders
+    decode fully and are then split into bands. palette, reduce and max_size are as for
+    open_image; a reduced Pillow frame is decoded whole (it is factor**2 smaller) and split.
+    Bands start at start_row (used to resume from a checkpoint).
     """
-    write = f.write
-    write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
-    write(
-        f'<svg xmlns="http://www.w3.org/2000/svg" id="{svg_id}" '
-        f'width="{width * scale}" height="{height * scale}" '
-        f'viewBox="0 0 {width} {height}" preserveAspectRatio="xMidYMid meet">'
-    )
+    band_rows = max(1, band_rows)
+    order = _loader_order(path)
+    im = None
+    if order[0] == "pillow":
+        order.remove("pillow")
+        try:
+            im = _open_pillow_frame(path, frame_index)
+            box = _clamp_crop(crop, *im.size) if crop is not None else (0, 0) + im.size
+            factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+            if factor > 1:
+                with im:
+                    full = _frame_image(_reduce_pillow(im, box, factor), palette)
+                _remember_loader(path, "pillow")
+                return full.size, _split_bands(full, band_rows, start_row)
+            # Decode now, so a damaged file falls back (or raises) before any output is opened;
+            # the first band's crop would load the whole frame anyway.
+            im.load()
+        except (UnidentifiedImageError, OSError):
+            if im is not None:
+                im.close()
+            im = None
+    if im is not None:
+        _remember_loader(path, "pillow")
+        def pillow_bands():
+            with im:
+                left, top, right, bottom = box
+                for y0 in range(top + start_row, bottom, band_rows):
+                    band = im.crop((left, y0, right, min(bottom, y0 + band_rows)))
+                    yield y0 - top, band if palette and band.mode in _PALETTE_MODES else band.convert("RGBA")
+        return (box[2] - box[0], box[3] - box[1]), pillow_bands()
 
+    volume = open_volume(path, order[0]) if order[0] in _VOLUME_LOADERS else None
+    if volume is not None:
+        _remember_loader(path, order[0])
+        box = volume.box(crop)
+        factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+        region = volume.region(frame_index, box, factor)
+        window = volume.window(box, factor)
 
-def emit_svg_footer(f):
-    f.write('</svg>')
+        def volume_bands():
+            with volume:
+                for y0 in range(start_row, region.shape[0], band_rows):
+                    yield y0, _numpy_to_pil_rgba(np.asarray(region[y0:y0 + band_rows]), window)
+        return (region.shape[1], region.shape[0]), volume_bands()
 
+    full = _open_in_order(path, frame_index, crop, order, palette, reduce, max_size)
+    return full.size, _split_bands(full, band_rows, start_row)
 
-def write_rect(f, x: int, y: int, w: int, h: int, fill_hex: str, alpha: int):
+
+def _split_bands(im: Image.Image, band_rows: int, start_row: int = 0) -> Iterator[tuple[int, Image.Image]]:
+    for y0 in range(start_row, im.height, band_rows):
+        yield y0, im.crop((0, y0, im.width, min(im.height, y0 + band_rows)))
+
+
+def _imageio_frame_count(iio, path: str) -> int:
+    try:
+        return max(1, int(getattr(iio.improps(path), "n_images", None) or 1))
+    except Exception:
+        return 1
+
+
+def count_frames(path: str) -> int:
     """
-    Emit a single <rect> to the file.
-    id uses '{x}-{y}' for single pixels.
-    Opacity is kept as 0..255 to match your sample style exactly.
+    The frame_count iter_frames gives path, read without decoding any frame: Pillow's
+    n_frames, imageio's properties, or the plane count of a FITS or DICOM volume. Files no
+    loader reads count as 1.
     """
-    f.write(
-        f'<rect id="{x}-{y}" x="{x}" y="{y}" width="{w}" height="{h}" '
-        f'shape-rendering="crispEdges" style="fill:{fill_hex};opacity:{alpha};"></rect>'
-    )
-
+    for loader in _loader_order(path):
+        if loader == "pillow":
+            ensure_pillow_plugins(path)
+            try:
+                with Image.open(path) as im:
+                    return max(1, getattr(im, "n_frames", 1))
+            except (UnidentifiedImageError, OSError):
+                continue
+        if loader == "imageio":
+            iio = _backend("imageio")
+            if iio is not None and _numpy() is not None:
+                return _imageio_frame_count(iio, path)
+        elif loader in _VOLUME_LOADERS:
+            volume = open_volume(path, loader)
+            if volume is not None:
+                with volume:
+                    return volume.count
+    return 1
 
-def _rect_str(x: int, y: int, w: int, h: int, fill_hex: str, alpha: int) -> str:
-    """Return the <rect> element string."""
-    return (
-        f'<rect id="{x}-{y}" x="{x}" y="{y}" width="{w}" height="{h}" '
-        f'shape-rendering="crispEdges" style="fill:{fill_hex};opacity:{alpha};"></rect>'
-    )
 
+def iter_frames(path: str, crop: Optional[tuple[int, int, int, int]] = None, palette: bool = False, reduce: int = 1, max_size: int = 0) -> Iterator[tuple[int, int, Image.Image]]:
+    """
+    Yield (frame_index, frame_count, RGBA image) for every frame, decoding each once in order.
+    crop is an optional (x, y, w, h) region of interest applied to every frame; palette,
+    reduce and max_size are as for open_image.
 
-def generate_svg_per_pixel(im: Image.Image, out_path: str, svg_id: str, scale: int, progress_cb: Optional[callable] = None):
+    Unlike calling open_image per frame (where seeking to frame k in GIF/APNG/WebP re-decodes
+    frames 0..k-1), Pillow frames are reached by sequential seeks on one open file and the
+    imageio fallback streams frames with imiter. The planes of a FITS cube and the slices of a
+    multi-frame DICOM are frames too, read one at a time from the memmapped volume and
+    normalized with one window measured for the whole volume. Files are routed by sniffing
+    as in open_image.
+    Single-frame formats yield one frame, and files no loader can read raise the same errors
+    as open_image.
     """
-    Generate one rect per visible pixel with batched row writes to reduce I/O overhead.
+    order = _loader_order(path)
+    im = None
+    if order[0] == "pillow":
+        order.remove("pillow")
+        ensure_pillow_plugins(path)
+        try:
+            im = Image.open(path)
+        except (UnidentifiedImageError, OSError):
+            im = None
+    if im is not None:
+        with im:
+            count = max(1, getattr(im, "n_frames", 1))
+            box = _clamp_crop(crop, *im.size) if crop is not None else None
+            full_box = box or (0, 0) + im.size
+            factor = reduction_factor(full_box[2] - full_box[0], full_box[3] - full_box[1], reduce, max_size)
 
-    If progress_cb is provided, it will be called as progress_cb(rows_done, total_rows)
-    once per row, allowing callers (e.g., GUI) to update a progress indicator.
+            def frame():
+                if factor > 1:
+                    return _frame_image(_reduce_pillow(im, full_box, factor), palette)
+                return _frame_image(im.crop(box) if box else im, palette)
+            try:
+                first = frame()
+            except OSError:
+                first = None
+            if first is not None:
+                _remember_loader(path, "pillow")
+                yield 0, count, first
+                for i in range(1, count):
+                    im.seek(i)
+                    yield i, count, frame()
+                return
+
+    iio = _backend("imageio") if order[0] == "imageio" else None
+    if iio is not None and _numpy() is not None:
+        order.remove("imageio")
+        count = _imageio_frame_count(iio, path)
+        i = -1
+        try:
+            for i, arr in enumerate(iio.imiter(path)):
+                count = max(count, i + 1)
+                if i == 0:
+                    _remember_loader(path, "imageio")
+                yield i, count, _crop_reduce(_numpy_to_pil_rgba(arr), crop, reduce, max_size)
+        except Exception:
+            if i >= 0:
+                raise
+        if i >= 0:
+            return
+
+    volume = open_volume(path, order[0]) if order[0] in _VOLUME_LOADERS else None
+    if volume is not None:
+        with volume:
+            _remember_loader(path, order[0])
+            box = volume.box(crop)
+            factor = reduction_factor(box[2] - box[0], box[3] - box[1], reduce, max_size)
+            window = volume.window(box, factor)
+            for i in range(volume.count):
+                yield i, volume.count, volume.image(i, box, factor, window)
+        return
+
+    yield 0, 1, _open_in_order(path, 0, crop, order, palette, reduce, max_size)
+
+
+def content_crop(path: str, frame_index: Optional[int] = None, crop: Optional[tuple[int, int, int, int]] = None, band_rows: int = DEFAULT_BAND_ROWS) -> Optional[tuple[int, int, int, int]]:
     """
-    width, height = im.size
-    pixels = im.load()
-    with open(out_path, "w", encoding="utf-8") as f:
-        write = f.write
-        emit_svg_header(f, svg_id, width, height, scale)
-        for y in range(height):
-            row_parts: list[str] = []
-            for x in range(width):
-                r, g, b, a = pixels[x, y]
-                if a == 0:
-                    continue
-                fill_hex = rgba_to_hex(r, g, b)
-                row_parts.append(_rect_str(x, y, 1, 1, fill_hex, a))
-            if row_parts:
-                write("".join(row_parts))
-            if progress_cb:
-                try:
-                    progress_cb(y + 1, height)
-                except Exception:
-                    pass
-        emit_svg_footer(f)
+    Return the (x, y, w, h) crop, in input coordinates, that keeps every pixel that is not
+    fully transparent: in frame frame_index (read band by band), or across every frame when
+    frame_index is None. crop limits the search to a region of interest. Returns None when
+    nothing is visible. The input is decoded once more for this.
+    """
+    boxes = []
+    if frame_index is None:
+        for _i, _count, im in iter_frames(path, crop=crop, palette=True):
+            boxes.append(alpha_bbox(im))
+    else:
+        _size, bands = open_image_bands(path, frame_index=frame_index, crop=crop, band_rows=band_rows or DEFAULT_BAND_ROWS, palette=True)
+        for y0, band in bands:
+            b = alpha_bbox(band)
+            boxes.append(b and (b[0], b[1] + y0, b[2], b[3] + y0))
+    boxes = [b for b in boxes if b]
+    if not boxes:
+        return None
+    left, top = min(b[0] for b in boxes), min(b[1] for b in boxes)
+    right, bottom = max(b[2] for b in boxes), max(b[3] for b in boxes)
+    x, y = crop[:2] if crop is not None else (0, 0)
+    return x + left, y + top, right - left, bottom - top
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert a bitmap to pixel-accurate SVG (per-pixel <rect>).")
-    parser.add_argument("input", help="Path to input image")
-    parser.add_argument("-o", "--output", help="Path to output SVG (default: input name with .svg)")
-    parser.add_argument("--frame", type=int, default=0, help="Frame index to convert for multi-frame formats (default: 0)")
-    parser.add_argument("--id", default=None, help='SVG root id (default: stem of input, e.g., "clocktower")')
-    parser.add_argument("--scale", type=int, default=1, help="Output size multiplier (default: 1). Rects remain 1x1 in viewBox; width/height scaled.")
-    args = parser.parse_args()
+def _decoded_bytes(im: Image.Image, crop: Optional[tuple[int, int, int, int]], reduce: int = 1, max_size: int = 0) -> int:
+    """Bytes the frame of an opened (not yet decoded) image takes once cropped, reduced and decoded as open_image with palette would."""
+    box = _clamp_crop(crop, *im.size) if crop is not None else (0, 0) + im.size
+    width, height = box[2] - box[0], box[3] - box[1]
+    factor = reduction_factor(width, height, reduce, max_size)
+    bands = len(im.getbands()) if im.mode in _PALETTE_MODES else 4
+    return -(-width // factor) * -(-height // factor) * bands
+
 
-    in_path = args.input
-    out_path = args.output or (os.path.splitext(in_path)[0] + ".svg")
-    svg_id = args.id or os.path.splitext(os.path.basename(in_path))[0]
+def decode_single_frame(path: str, frame_index: Optional[int] = None, crop: Optional[tuple[int, int, int, int]] = None, reduce: int = 1, max_size: int = 0, max_bytes: int = 0) -> Optional[Image.Image]:
+    """
+    Frame frame_index of path decoded as the converters would (open_image with palette), or
+    with frame_index None its only frame. Returns None for files with several frames (when
+    frame_index is None), for files Pillow does not read and (max_bytes > 0) for frames the
+    header says would take more than max_bytes decoded: those are decoded as they are
+    converted, frame by frame or (FITS) band by band.
+    """
+    if _loader_order(path)[0] != "pillow":
+        return None
+    if frame_index is None or max_bytes > 0:
+        ensure_pillow_plugins(path)
+        try:
+            with Image.open(path) as im:
+                if frame_index is None and getattr(im, "is_animated", False):
+                    return None
+                if max_bytes > 0 and _decoded_bytes(im, crop, reduce, max_size) > max_bytes:
+                    return None
+        except (UnidentifiedImageError, OSError):
+            return None
+    return open_image(path, frame_index or 0, crop, palette=True, reduce=reduce, max_size=max_size)
+
+
+def prefetch(items, decode: Callable, depth: int = PREFETCH_DEPTH, max_bytes: int = PREFETCH_MAX_BYTES) -> Iterator[tuple]:
+    """
+    Yield (item, info, image, None) for each item in order, where decode(item) returns
+    (info, image or None), or (item, None, None, error) when decode raised.
+
+    Up to depth items are decoded ahead on a background thread while the caller works on
+    the current one. Another is only started while the images waiting hold less than
+    max_bytes, but one is always allowed, however large. depth 0 decodes in the caller.
+    """
+    if depth <= 0:
+        for item in items:
+            try:
+                info, image = decode(item)
+            except Exception as e:
+                yield item, None, None, e
+                continue
+            yield item, info, image, None
+        return
+
+    cond = threading.Condition()
+    ready: deque = deque()
+    state = {"ahead": 0, "bytes": 0, "stop": False}
+
+    def worker():
+        for item in items:
+            with cond:
+                cond.wait_for(lambda: state["stop"] or (state["ahead"] < depth and (state["ahead"] == 0 or state["bytes"] < max_bytes)))
+                if state["stop"]:
+                    return
+                state["ahead"] += 1
+            try:
+                info, image = decode(item)
+                entry = (item, info, image, None)
+            except Exception as e:
+                entry, image = (item, None, None, e), None
+            size = image.width * image.height * len(image.getbands()) if image is not None else 0
+            with cond:
+                state["bytes"] += size
+                ready.append((entry, size))
+                cond.notify_all()
+        with cond:
+            ready.append((None, 0))
+            cond.notify_all()
+
+    threading.Thread(target=worker, name="prefetch", daemon=True).start()
+    try:
+        while True:
+            with cond:
+                cond.wait_for(lambda: ready)
+                entry, size = ready.popleft()
+                if entry is None:
+                    return
+                state["ahead"] -= 1
+                state["bytes"] -= size
+                cond.notify_all()
+            yield entry
+    finally:
+        with cond:
+            state["stop"] = True
+            cond.notify_all()
+
+
+def frame_output_path(out_path: str, frame_index: int, frame_count: int) -> str:
+    """Per-frame output path: out.svg -> out_frame_00000.svg, ... (unchanged for single frames)."""
+    if frame_count <= 1:
+        return out_path
+    root, ext = os.path.splitext(out_path)
+    return f"{root}_frame_{frame_index:05d}{ext}"
+
+
+def frame_digest(im: Image.Image) -> bytes:
+    """Digest of a decoded frame's size and RGBA pixels; equal digests mean identical frames."""
+    rgba = im if im.mode == "RGBA" else im.convert("RGBA")
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{rgba.width}x{rgba.height}".encode("ascii"))
+    h.update(rgba.tobytes())
+    return h.digest()
+
+
+class FrameDeduper:
+    """
+    Track frame digests across one multi-frame input so repeated frames reuse the SVG
+    already written for their first occurrence instead of being converted again.
+
+    A reused frame carries the original's bytes, including its root id.
+    """
+
+    def __init__(self, mode: str = "link"):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"Unknown dedupe mode '{mode}'. Expected one of: {', '.join(DEDUPE_MODES)}")
+        self.mode = mode
+        self.skipped = 0
+        self._outputs: dict[bytes, str] = {}
+        self._frames: list[tuple[str, str]] = []
+
+    def match(self, im: Image.Image, out_path: str) -> Optional[str]:
+        """Return the earlier output identical to this frame, or None (and remember out_path)."""
+        original = self._outputs.setdefault(frame_digest(im), out_path)
+        self._frames.append((out_path, original))
+        if original == out_path:
+            return None
+        self.skipped += 1
+        return original
+
+    def reuse(self, original: str, out_path: str) -> str:
+        """Make out_path stand in for original; returns the method used."""
+        if self.mode == "manifest":
+            return "manifest"
+        if os.path.lexists(out_path):
+            os.remove(out_path)
+        if self.mode == "link":
+            try:
+                os.link(original, out_path)
+                return "hardlink"
+            except OSError:
+                pass
+        try:
+            os.symlink(os.path.relpath(original, os.path.dirname(os.path.abspath(out_path))), out_path)
+            return "symlink"
+        except OSError:
+            if self.mode == "symlink":
+                raise
+        shutil.copyfile(original, out_path)
+        return "copy"
+
+    def write_manifest(self, manifest_path: str) -> None:
+        """Write a JSON list mapping each frame's output name to the file holding its SVG."""
+        base = os.path.dirname(os.path.abspath(manifest_path))
+        frames = [
+            {"frame": i, "output": os.path.relpath(out, base), "svg": os.path.relpath(src, base)}
+            for i, (out, src) in enumerate(self._frames)
+        ]
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"frames": frames, "deduplicated": self.skipped}, f, indent=2)
+
+
+def manifest_path_for(out_path: str) -> str:
+    """Manifest written next to the frame outputs: out.svg -> out_frames.json."""
+    return os.path.splitext(out_path)[0] + "_frames.json"
+
+
+def _tile_name(name) -> str:
+    """File- and id-safe form of a tile name: extension dropped, other characters than letters, digits, "-" and "_" replaced by "_"."""
+    text = os.path.splitext(str(name))[0]
+    return "".join(c if c.isascii() and (c.isalnum() or c in "-_") else "_" for c in text) or "tile"
+
+
+# A sprite-sheet tile: (name, (x, y, w, h) box on the sheet, rotated). A rotated tile is stored
+# turned 90 degrees clockwise on the sheet (TexturePacker "rotated") and is turned back when cut.
+Tile = tuple[str, tuple[int, int, int, int], bool]
+
+
+def load_tiles(path: str) -> list[Tile]:
+    """
+    Named tiles (see Tile) from a JSON spec: a list of {"name", "x", "y", "w", "h"} objects,
+    or an object mapping names to [x, y, w, h] or {"x", "y", "w", "h"}. TexturePacker and
+    Aseprite exports also work: their "frames" section is read, with each entry's "frame"
+    box and ("filename") name; a "rotated" entry's frame gives the sprite's upright size,
+    so it takes h x w pixels on the sheet. Names are made file- and id-safe (see _tile_name).
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    if isinstance(spec, dict) and "frames" in spec:
+        spec = spec["frames"]
+    if not isinstance(spec, (dict, list)):
+        raise ValueError(f"{path}: expected a list or an object of tiles")
+    entries = spec.items() if isinstance(spec, dict) else enumerate(spec)
+    tiles: list[tuple[str, tuple[int, int, int, int]]] = []
+    seen: set[str] = set()
+    for key, entry in entries:
+        name, rotated = key, False
+        if isinstance(entry, dict):
+            name = entry.get("name", entry.get("filename", key))
+            rotated = entry.get("rotated") is True
+            entry = entry.get("frame", entry)
+        try:
+            x, y, w, h = (int(entry[k]) for k in "xywh") if isinstance(entry, dict) else (int(v) for v in entry)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path}: tile '{name}' needs x, y, w, h") from None
+        if x < 0 or y < 0 or w <= 0 or h <= 0:
+            raise ValueError(f"{path}: tile '{name}' needs x,y >= 0 and w,h > 0")
+        name = _tile_name(name)
+        if name in seen:
+            raise ValueError(f"{path}: more than one tile is named '{name}'")
+        seen.add(name)
+        tiles.append((name, (x, y, h, w) if rotated else (x, y, w, h), rotated))
+    if not tiles:
+        raise ValueError(f"{path}: no tiles")
+    return tiles
+
+
+def grid_tiles(width: int, height: int, cell: tuple[int, int]) -> list[Tile]:
+    """
+    Named cells (see Tile) of a grid of cell = (w, h) over a width x height sheet, row by
+    row and named r000_c000, r000_c001, ...; partial cells at the right and bottom edges are
+    left out.
+    """
+    cw, ch = cell
+    return [(f"r{r:03d}_c{c:03d}", (c * cw, r * ch, cw, ch), False) for r in range(height // ch) for c in range(width // cw)]
+
+
+def tile_output_path(out_path: str, name: str) -> str:
+    """Per-tile output path: out.svg -> out_r000_c000.svg, ... (or out_<tile name>.svg)."""
+    root, ext = os.path.splitext(out_path)
+    return f"{root}_{name}{ext}"
+
+
+def check_tiles(tiles: list[Tile], width: int, height: int) -> None:
+    """Raise ValueError naming the tiles that do not lie within a width x height sheet."""
+    outside = [f"'{name}' ({x},{y},{w},{h})" for name, (x, y, w, h), _rotated in tiles if x + w > width or y + h > height]
+    if outside:
+        more = f" and {len(outside) - 5} more" if len(outside) > 5 else ""
+        raise ValueError(f"Tiles outside the {width}x{height} sheet: {', '.join(outside[:5])}{more}")
+
+
+def iter_tiles(sheet: Image.Image, tiles: list[Tile], trim: bool = False) -> Iterator[tuple[int, int, Image.Image]]:
+    """
+    Yield (tile_index, tile_count, image) for the tiles of a decoded sheet, in order, like
+    iter_frames. Tiles with no pixel that is not fully transparent are skipped; the test reads
+    the sheet's alpha plane, made once, so empty cells are never cropped. Each tile is cropped
+    as it is consumed, and rotated tiles are turned upright. With trim, tiles are cut down to
+    their visible pixels. Tiles must lie within the sheet (see check_tiles).
+    """
+    mask = _alpha_mask(sheet)
+    for i, (_name, (x, y, w, h), rotated) in enumerate(tiles):
+        box = (x, y, x + w, y + h)
+        if mask is not None:
+            bbox = mask.crop(box).getbbox()
+            if bbox is None:
+                continue
+            if trim:
+                box = (x + bbox[0], y + bbox[1], x + bbox[2], y + bbox[3])
+        tile = sheet.crop(box)
+        yield i, len(tiles), tile.transpose(Image.Transpose.ROTATE_90) if rotated else tile
+
+
+def _ascii_table(values):
+    """
+    Return a (len(values), width) uint8 table holding the ASCII form of each value.
+    Shorter entries are right-padded with NUL bytes; slicing a row to its digit count
+    yields the exact text.
+    """
+    encoded = [str(v).encode("ascii") for v in values]
+    width = max(1, max((len(e) for e in encoded), default=1))
+    buf = b"".join(e.ljust(width, b"\0") for e in encoded)
+    return np.frombuffer(buf, dtype=np.uint8).reshape(len(encoded), width)
+
+
+def _digit_counts(n: int, base: int = 10):
+    """Digit count (decimal, or in base) of every integer in range(n), as uint8."""
+    counts = np.ones(max(1, n), dtype=np.uint8)
+    p = base
+    while p < n:
+        counts[p:] += 1
+        p *= base
+    return counts[:n]
+
+
+def _hex_names_table(prefix: str, n: int):
+    """
+    (table, lengths) of the names prefix + lowercase hex of range(n), laid out as
+    _ascii_table does, formatted without building a string per name.
+    """
+    values = np.arange(max(1, n), dtype=np.int64)
+    digits = _digit_counts(values.size, 16).astype(np.int64)
+    head = np.frombuffer(prefix.encode("ascii"), dtype=np.uint8)
+    table = np.zeros((values.size, head.size + int(digits[-1])), dtype=np.uint8)
+    table[:, :head.size] = head
+    hex_digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    for j in range(int(digits[-1])):
+        shift = 4 * (digits - 1 - j)
+        on = shift >= 0
+        table[on, head.size + j] = hex_digits[(values[on] >> shift[on]) & 0xF]
+    return table[:n], (digits[:n] + head.size).astype(np.uint8)
+
+
+def _numpy_tables() -> dict:
+    """Build (once) the 256-entry hex and alpha lookup tables used by the NumPy engine."""
+    if not _NP_TABLES:
+        _NP_TABLES["hex"] = _ascii_table([f"{i:02x}" for i in range(256)])
+        _NP_TABLES["alpha"] = _ascii_table(range(256))
+        _NP_TABLES["alpha_digits"] = _digit_counts(256)
+    return _NP_TABLES
+
+
+def _layout_rows(parts, columns: dict, n: int):
+    """
+    Lay out n elements, one per row. parts mixes byte constants with column names; each
+    column is an (n,) array of fixed-size void items. Constants are stamped from a
+    template row in one pass, then each column is copied into its slot.
+    """
+    widths = [len(p) if isinstance(p, bytes) else columns[p].itemsize for p in parts]
+    template = np.zeros(sum(widths), dtype=np.uint8)
+    slots = []
+    pos = 0
+    for part, w in zip(parts, widths):
+        if isinstance(part, bytes):
+            template[pos:pos + w] = np.frombuffer(part, dtype=np.uint8)
+        else:
+            slots.append((part, pos, w))
+        pos += w
+    buf = np.empty((n, pos), dtype=np.uint8)
+    buf[:] = template
+    for name, pos, w in slots:
+        buf[:, pos:pos + w].view(f"V{w}")[:, 0] = columns[name]
+    return buf
+
+
+def _gather_exact(table, w: int, index):
+    """Look up index in table, keeping the first w bytes of each entry as one void item."""
+    return np.ascontiguousarray(table[:, :w]).view(f"V{w}").reshape(-1)[index]
+
+
+def _format_rects_numpy(parts, columns: dict, widths: dict, classes):
+    """
+    Format one element per lookup and return the bytes in order.
+
+    columns maps each name to (table, index): a NUL-padded ASCII table and the row to
+    take for every element. widths gives the per-element byte count for variable-width
+    columns; classes numbers each distinct combination of those widths. Elements of one
+    class share a fixed layout, so each class is formatted without padding and runs of
+    consecutive elements are copied out as whole blocks. When classes alternate too
+    often for that to pay off, everything is laid out padded and the NUL bytes are
+    dropped in one pass instead.
+    """
+    n = len(classes)
+    starts = np.flatnonzero(classes[1:] != classes[:-1]) + 1
+    if starts.size * 32 > n:
+        padded = {k: _gather_exact(t, t.shape[1], i) for k, (t, i) in columns.items()}
+        flat = _layout_rows(parts, padded, n).reshape(-1)
+        return flat[flat != 0]
+
+    starts = np.concatenate(([0], starts))
+    run_class = classes[starts]
+    if starts.size == 1:
+        exact = {}
+        for k, (t, i) in columns.items():
+            w = widths.get(k)
+            exact[k] = _gather_exact(t, t.shape[1] if w is None else int(w[0]), i)
+        return _layout_rows(parts, exact, n).reshape(-1)
+
+    rank = np.empty(n, dtype=np.intp)
+    blocks = {}
+    for c in np.unique(run_class):
+        sel = np.flatnonzero(classes == c)
+        rank[sel] = np.arange(sel.size)
+        first = sel[0]
+        exact = {}
+        for k, (t, i) in columns.items():
+            w = widths.get(k)
+            exact[k] = _gather_exact(t, t.shape[1] if w is None else int(w[first]), i[sel])
+        blocks[int(c)] = _layout_rows(parts, exact, sel.size)
+    ends = np.concatenate((starts[1:], [n]))
+    out = []
+    for s, e, c in zip(starts.tolist(), ends.tolist(), run_class.tolist()):
+        r = int(rank[s])
+        out.append(blocks[c][r:r + (e - s)])
+    return b"".join(out)
+
+
+def _resolve_engine(engine: str) -> str:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose one of: {', '.join(ENGINES)}")
+    if engine == "auto":
+        return "numpy" if _numpy() is not None else "python"
+    if engine == "numpy":
+        _require_numpy_for("The numpy engine")
+    return engine
+
+
+def emit_svg_header(f, svg_id: str, width: int, height: int, scale: int, root_attrs: str = ""):
+    """
+    Write the SVG header with the requested id, dimensions, and viewBox.
+    We keep 1 unit per pixel in the viewBox and scale rendered size via width/height.
+    root_attrs (e.g. ' shape-rendering="crispEdges"') is appended to the <svg> tag.
+    """
+    write = f.write
+    write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
+    write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" id="{svg_id}" '
+        f'width="{width * scale}" height="{height * scale}" '
+        f'viewBox="0 0 {width} {height}" preserveAspectRatio="xMidYMid meet"{root_attrs}>'
+    )
+
+
+def emit_svg_footer(f):
+    f.write('</svg>')
+
+
+def write_rect(f, x: int, y: int, w: int, h: int, fill_hex: str, alpha: int):
+    """
+    Emit a single <rect> to the file.
+    id uses '{x}-{y}' for single pixels.
+    Opacity is kept as 0..255 to match your sample style exactly.
+    """
+    f.write(
+        f'<rect id="{x}-{y}" x="{x}" y="{y}" width="{w}" height="{h}" '
+        f'shape-rendering="crispEdges" style="fill:{fill_hex};opacity:{alpha};"></rect>'
+    )
+
+
+def _rect_str(x: int, y: int, w: int, h: int, fill_hex: str, alpha: int) -> str:
+    """Return the <rect> element string."""
+    return (
+        f'<rect id="{x}-{y}" x="{x}" y="{y}" width="{w}" height="{h}" '
+        f'shape-rendering="crispEdges" style="fill:{fill_hex};opacity:{alpha};"></rect>'
+    )
+
+
+def _report_rows(progress_cb: Optional[callable], y0: int, y1: int, total_rows: int) -> None:
+    if not progress_cb:
+        return
+    for y in range(y0, y1):
+        try:
+            progress_cb(y + 1, total_rows)
+        except Exception:
+            pass
+
+
+def _report_skip(progress_cb: Optional[callable], rows_done: int, total_rows: int) -> None:
+    """Report a run of rows with nothing to emit with a single progress_cb(rows_done, total_rows)."""
+    if progress_cb and rows_done > 0:
+        try:
+            progress_cb(rows_done, total_rows)
+        except Exception:
+            pass
+
+
+def _alpha_mask(im: Image.Image) -> Optional[Image.Image]:
+    """The alpha plane of im as an "L" image, or None when im has no transparency."""
+    if im.mode in ("RGBA", "LA", "PA"):
+        return im.getchannel("A")
+    if "transparency" in im.info or (im.mode == "P" and im.palette is not None and "A" in im.palette.mode):
+        return im.convert("RGBA").getchannel("A")
+    return None
+
+
+def alpha_bbox(im: Image.Image) -> Optional[tuple[int, int, int, int]]:
+    """(left, top, right, bottom) of the pixels that are not fully transparent, or None if there are none."""
+    mask = _alpha_mask(im)
+    if mask is not None:
+        return mask.getbbox()
+    return (0, 0) + im.size if im.width and im.height else None
+
+
+def _alpha_regions(alpha) -> list[tuple[int, int, list[tuple[int, int]]]]:
+    """
+    Parts of an (H, W) alpha array worth visiting, in row order: (y0, y1, [(x0, x1), ...])
+    row ranges with the column spans that can hold visible pixels. That is the alpha
+    bounding box, refined to the occupied TILE_SIZE tiles when the box holds at least
+    TILE_MAP_MIN_PIXELS pixels (consecutive tile rows with equal spans are joined).
+    """
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not rows.size:
+        return []
+    cols = np.flatnonzero(alpha.any(axis=0))
+    top, bottom, left, right = int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+    if (bottom - top) * (right - left) < TILE_MAP_MIN_PIXELS:
+        return [(top, bottom, [(left, right)])]
+    visible = alpha[top:bottom, left:right] != 0
+    occupied = np.logical_or.reduceat(visible, np.arange(0, bottom - top, TILE_SIZE), axis=0)
+    occupied = np.logical_or.reduceat(occupied, np.arange(0, right - left, TILE_SIZE), axis=1)
+    regions: list[tuple[int, int, list[tuple[int, int]]]] = []
+    for ty, tiles in enumerate(occupied):
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], tiles.view(np.int8), [0]))))
+        spans = [(left + a * TILE_SIZE, min(right, left + b * TILE_SIZE)) for a, b in edges.reshape(-1, 2).tolist()]
+        if not spans:
+            continue
+        y0, y1 = top + ty * TILE_SIZE, min(bottom, top + (ty + 1) * TILE_SIZE)
+        if regions and regions[-1][1] == y0 and regions[-1][2] == spans:
+            regions[-1] = (regions[-1][0], y1, spans)
+        else:
+            regions.append((y0, y1, spans))
+    return regions
+
+
+class CompactFills:
+    """
+    Fill classes of a compact-profile document: one CSS class per distinct color and alpha
+    (keyed by packed RGBA, R in the low byte), numbered in order of first use so both
+    engines name them alike. Pixels are <use> elements of the unit rect unit_id, linked with
+    both href (SVG 2) and xlink:href (SVG 1.1, declared by ROOT_ATTRS on the root).
+    """
+
+    ROOT_ATTRS = ' xmlns:xlink="http://www.w3.org/1999/xlink" shape-rendering="crispEdges"'
+
+    def __init__(self, unit_id: str = "p"):
+        self.unit_id = unit_id
+        self.href = f'href="#{unit_id}" xlink:href="#{unit_id}"'
+        self.ids: dict[int, int] = {}
+        self._table = None
+
+    @staticmethod
+    def name(i: int) -> str:
+        return f"c{i:x}"
+
+    def name_for(self, packed: int) -> str:
+        return self.name(self.ids.setdefault(packed, len(self.ids)))
+
+    def lookup(self, packed):
+        """For an array of packed colors in pixel order: (name table, name lengths, class id per pixel)."""
+        colors, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind="stable")
+        ids = np.empty(colors.size, dtype=np.intp)
+        for k, c in zip(order.tolist(), colors[order].tolist()):
+            ids[k] = self.ids.setdefault(c, len(self.ids))
+        names, lengths = self._names_table()
+        return names, lengths, ids[inverse.reshape(-1)]
+
+    def register(self, packed) -> None:
+        """
+        Number the new colors of packed (in pixel order) by first use, as lookup would. Once
+        every color is registered, lookup only reads, so bands can be looked up on threads.
+        """
+        colors, first = np.unique(packed, return_index=True)
+        for c in colors[np.argsort(first, kind="stable")].tolist():
+            self.ids.setdefault(c, len(self.ids))
+        self._names_table()
+
+    def _names_table(self):
+        table = self._table
+        if table is None or table[0].shape[0] < len(self.ids):
+            table = self._table = _hex_names_table("c", max(256, 2 * len(self.ids)))  # as name() spells them
+        return table
+
+    def defs(self) -> str:
+        return f'<defs><rect id="{self.unit_id}" width="1" height="1"/></defs>'
+
+    def style(self) -> str:
+        """The <style> block: fill (and CSS opacity, alpha/255, unless opaque) of each class."""
+        rules = []
+        for packed, i in self.ids.items():
+            a = packed >> 24
+            opacity = "" if a == 255 else f";opacity:{a / 255:.3g}"
+            rules.append(f".{self.name(i)}{{fill:#{packed & 0xFF:02x}{(packed >> 8) & 0xFF:02x}{(packed >> 16) & 0xFF:02x}{opacity}}}")
+        return f"<style>{''.join(rules)}</style>"
+
+
+def _emit_pixels_python(write, im: Image.Image, progress_cb: Optional[callable] = None, y_offset: int = 0, total_rows: Optional[int] = None, fills: Optional[CompactFills] = None) -> None:
+    """
+    Reference emitter: walk PixelAccess row by row. Used when NumPy is unavailable.
+    im may be a band starting at row y_offset of an image total_rows tall. The style of
+    each distinct color is formatted once (up to STYLE_CACHE_SIZE colors). Only the alpha
+    bounding box is visited, or the regions from _alpha_regions when NumPy is already
+    loaded; skipped rows are reported as one progress step. With fills, pixels are written
+    in the compact profile (see CompactFills).
+    """
+    if im.mode != "RGBA":
+        im = im.convert("RGBA")
+    width, height = im.size
+    total_rows = total_rows or height
+    if np is not None:
+        regions = _alpha_regions(np.asarray(im.getchannel("A")))
+    else:
+        bbox = alpha_bbox(im)
+        regions = [(bbox[1], bbox[3], [(bbox[0], bbox[2])])] if bbox else []
+    pixels = im.load()
+    styles: dict[tuple, str] = {}
+    rows_done = 0
+    for r0, r1, spans in regions:
+        if r0 > rows_done:
+            _report_skip(progress_cb, r0 + y_offset, total_rows)
+        for y in range(r0, r1):
+            row_parts: list[str] = []
+            yy = y + y_offset
+            for x0, x1 in spans:
+                for x in range(x0, x1):
+                    px = pixels[x, y]
+                    if px[3] == 0:
+                        continue
+                    if fills is not None:
+                        name = styles.get(px)
+                        if name is None:
+                            name = styles[px] = fills.name_for(px[0] | px[1] << 8 | px[2] << 16 | px[3] << 24)
+                        row_parts.append(f'<use {fills.href} x="{x}" y="{yy}" class="{name}"/>')
+                        continue
+                    style = styles.get(px)
+                    if style is None:
+                        style = f"fill:{rgba_to_hex(*px[:3])};opacity:{px[3]};"
+                        if len(styles) < STYLE_CACHE_SIZE:
+                            styles[px] = style
+                    row_parts.append(
+                        f'<rect id="{x}-{yy}" x="{x}" y="{yy}" width="1" height="1" '
+                        f'shape-rendering="crispEdges" style="{style}"></rect>'
+                    )
+            if row_parts:
+                write("".join(row_parts))
+            _report_rows(progress_cb, yy, yy + 1, total_rows)
+        rows_done = r1
+    if rows_done < height:
+        _report_skip(progress_cb, height + y_offset, total_rows)
+
+
+def _emit_pixels_numpy(write_bytes, im: Image.Image, progress_cb: Optional[callable] = None, y_offset: int = 0, total_rows: Optional[int] = None, fills: Optional[CompactFills] = None) -> None:
+    """
+    Vectorized emitter: decode to an RGBA array once, mask out transparent pixels and
+    format each batch of rows with table lookups. Output is byte-identical to
+    _emit_pixels_python, including for bands (y_offset, total_rows).
+
+    Images in a _PALETTE_MODES mode are not expanded to RGBA: the "rrggbb" text of each
+    palette entry (or gray level) is formatted once and looked up by index. Only the
+    regions from _alpha_regions are scanned; skipped rows are reported as one progress step.
+    With fills, pixels are written in the compact profile (see CompactFills).
+    """
+    tables = _numpy_tables()
+    hex_tab = tables["hex"]
+    alpha_tab = tables["alpha"]
+    if im.mode in _PALETTE_MODES:
+        index, rgb_lut, alpha_plane = _palette_planes(im)
+        color_tab = _ascii_table([f"{r:02x}{g:02x}{b:02x}" for r, g, b in rgb_lut.tolist()])
+        parts = _PALETTE_RECT_PARTS
+
+        def pixels_at(ys, xs):
+            return {"c": (color_tab, index[ys, xs])}, alpha_plane[ys, xs]
+
+        packed_lut = rgb_lut.astype(np.uint32) @ np.array([1, 1 << 8, 1 << 16], dtype=np.uint32)
+
+        def packed_at(ys, xs):
+            return packed_lut[index[ys, xs]] | (alpha_plane[ys, xs].astype(np.uint32) << 24)
+    else:
+        arr = np.asarray(im if im.mode == "RGBA" else im.convert("RGBA"))
+        alpha_plane = arr[:, :, 3]
+        parts = _PIXEL_RECT_PARTS
+
+        def pixels_at(ys, xs):
+            px = arr[ys, xs]
+            return {"r": (hex_tab, px[:, 0]), "g": (hex_tab, px[:, 1]), "b": (hex_tab, px[:, 2])}, px[:, 3]
+
+        def packed_at(ys, xs):
+            return np.ascontiguousarray(arr[ys, xs]).view("<u4")[:, 0]
+
+    if fills is not None:
+        parts = (f'<use {fills.href} x="'.encode("ascii"), "x", b'" y="', "y", b'" class="', "k", b'"/>')
+
+    band_height, width = alpha_plane.shape
+    height = total_rows or band_height
+    alpha_digits = tables["alpha_digits"]
+    x_tab, x_digits = _ascii_table(range(width)), _digit_counts(width)
+    # Row tables cover only this band; ys stay band-relative.
+    y_tab, y_digits = _ascii_table(range(y_offset, y_offset + band_height)), _digit_counts(height)[y_offset:y_offset + band_height]
+    rows_done = 0
+
+    for r0, r1, spans in _alpha_regions(alpha_plane):
+        if r0 > rows_done:
+            _report_skip(progress_cb, r0 + y_offset, height)
+        if len(spans) == 1:
+            x0, x1 = spans[0]
+            cols = None
+        else:
+            x0, x1 = 0, width
+            cols = np.concatenate([np.arange(a, b) for a, b in spans])
+        rows_per_batch = max(1, NUMPY_BATCH_PIXELS // (x1 - x0 if cols is None else cols.size))
+        for b0 in range(r0, r1, rows_per_batch):
+            b1 = min(r1, b0 + rows_per_batch)
+            ys, xs = np.nonzero(alpha_plane[b0:b1, x0:x1] if cols is None else alpha_plane[b0:b1, cols])
+            if xs.size and fills is not None:
+                ys += b0
+                xs = xs + x0 if cols is None else cols[xs]
+                names, name_len, ids = fills.lookup(packed_at(ys, xs))
+                xd = x_digits[xs]
+                yd = y_digits[ys]
+                kd = name_len[ids]
+                columns = {"x": (x_tab, xs), "y": (y_tab, ys), "k": (names, ids)}
+                widths = {"x": xd, "y": yd, "k": kd}
+                classes = (xd.astype(np.uint16) << 6) | (yd.astype(np.uint16) << 3) | kd
+                write_bytes(_format_rects_numpy(parts, columns, widths, classes))
+            elif xs.size:
+                ys += b0
+                xs = xs + x0 if cols is None else cols[xs]
+                columns, a = pixels_at(ys, xs)
+                xd = x_digits[xs]
+                yd = y_digits[ys]
+                ad = alpha_digits[a]
+                columns.update(x=(x_tab, xs), y=(y_tab, ys), a=(alpha_tab, a))
+                widths = {"x": xd, "y": yd, "a": ad}
+                classes = (xd.astype(np.uint16) << 6) | (yd.astype(np.uint16) << 3) | ad
+                write_bytes(_format_rects_numpy(parts, columns, widths, classes))
+            _report_rows(progress_cb, b0 + y_offset, b1 + y_offset, height)
+        rows_done = r1
+    if rows_done < band_height:
+        _report_skip(progress_cb, band_height + y_offset, height)
+
+
+def _visible_packed(im: Image.Image):
+    """Packed RGBA (R in the low byte) of the pixels of im that are not fully transparent, in row-major order."""
+    if im.mode in _PALETTE_MODES:
+        index, rgb_lut, alpha = _palette_planes(im)
+        packed_lut = rgb_lut.astype(np.uint32) @ np.array([1, 1 << 8, 1 << 16], dtype=np.uint32)
+        visible = alpha != 0
+        return packed_lut[index[visible]] | (alpha[visible].astype(np.uint32) << 24)
+    arr = np.asarray(im if im.mode == "RGBA" else im.convert("RGBA"))
+    return np.ascontiguousarray(arr).view("<u4")[..., 0][arr[:, :, 3] != 0]
+
+
+def _emit_bands_parallel(write_bytes, bands, threads: int, progress_cb: Optional[callable] = None, total_rows: int = 0, fills: Optional[CompactFills] = None, on_band: Optional[Callable[[int], None]] = None) -> None:
+    """
+    _emit_pixels_numpy for (y, band) pairs on a pool of threads, PARALLEL_BAND_ROWS rows per
+    task, writing the results in row order so the output is byte-identical to a single
+    thread; most of the work is NumPy array code, which runs without the GIL. At most two
+    tasks per thread are in flight. With fills, each task's colors are registered here, in
+    order, before it is submitted, so classes are still numbered by first use.
+    on_band(rows_done) is called once each input band has been written.
+    """
+    _numpy_tables()
+
+    def task(y0: int, part: Image.Image) -> bytes:
+        chunks: list[bytes] = []
+        _emit_pixels_numpy(chunks.append, part, None, y_offset=y0, total_rows=total_rows, fills=fills)
+        return b"".join(chunks)
+
+    pending: deque = deque()
+
+    def write_next() -> None:
+        fut, y0, rows, band_end = pending.popleft()
+        write_bytes(fut.result())
+        _report_rows(progress_cb, y0, y0 + rows, total_rows)
+        if band_end is not None and on_band:
+            on_band(band_end)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for y0, band in bands:
+            for dy, part in _split_bands(band, PARALLEL_BAND_ROWS):
+                if fills is not None:
+                    fills.register(_visible_packed(part))
+                band_end = y0 + band.height if dy + part.height >= band.height else None
+                pending.append((pool.submit(task, y0 + dy, part), y0 + dy, part.height, band_end))
+                while len(pending) > 2 * threads:
+                    write_next()
+        while pending:
+            write_next()
+
+
+def generate_svg_per_pixel(im: Image.Image, out_path: str, svg_id: str, scale: int, progress_cb: Optional[callable] = None, engine: str = "auto", svgz_level: Optional[int] = None, profile: str = "full", checkpoint: Optional["Checkpoint"] = None, threads: int = 1):
+    """
+    Generate one rect per visible pixel with batched row writes to reduce I/O overhead.
+
+    If progress_cb is provided, it will be called as progress_cb(rows_done, total_rows)
+    once per row, allowing callers (e.g., GUI) to update a progress indicator.
+
+    engine selects the emitter: "numpy" (vectorized), "python" (PixelAccess loop) or
+    "auto" (numpy when installed). Both produce identical bytes.
+
+    profile "compact" (see PROFILES) hoists shape-rendering to the root, drops per-pixel
+    ids and writes each pixel as <use href xlink:href="#p" x y class>, with one CSS class per
+    distinct color and alpha in a <style> block at the end of the document (so it can be
+    streamed).
+
+    With a checkpoint (see Checkpoint), the image is written in DEFAULT_BAND_ROWS bands and
+    progress is recorded after each, so a rerun continues where an interrupted one stopped.
+
+    threads > 1 formats row bands on that many threads with the numpy engine (see
+    _emit_bands_parallel); the output is unchanged.
+    """
+    bands = [(0, im)] if checkpoint is None else _split_bands(im, DEFAULT_BAND_ROWS, checkpoint.rows)
+    generate_svg_per_pixel_bands(im.size, bands, out_path, svg_id, scale, progress_cb=progress_cb, engine=engine, svgz_level=svgz_level, profile=profile, checkpoint=checkpoint, threads=threads)
+
+
+def open_svg_output(out_path: str, svgz_level: Optional[int] = None):
+    """
+    Open out_path for writing SVG bytes: plain, or (svgz_level 1-9) through a gzip stream so
+    .svgz is written in one pass. Small writes are buffered before reaching the compressor.
+    """
+    if svgz_level is None:
+        return open(out_path, "wb")
+    return io.BufferedWriter(gzip.open(out_path, "wb", compresslevel=max(1, min(9, int(svgz_level)))), 1 << 16)
+
+
+def generate_svg_per_pixel_bands(size: tuple[int, int], bands, out_path: str, svg_id: str, scale: int, progress_cb: Optional[callable] = None, engine: str = "auto", svgz_level: Optional[int] = None, profile: str = "full", checkpoint: Optional["Checkpoint"] = None, threads: int = 1):
+    """
+    generate_svg_per_pixel for an image supplied as (y, RGBA band) pairs in row order (see
+    open_image_bands), so only one band needs to be in memory. Output is identical.
+    svgz_level gzips the output as it is written (see open_svg_output).
+
+    With a checkpoint that has rows done, the output is truncated to its recorded offset and
+    continued from there; rows above it are skipped (bands may also simply start there).
+    The checkpoint is updated as bands are written and removed after the footer.
+    threads is as for generate_svg_per_pixel.
+
+    If writing fails without a checkpoint, the partial output is removed.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'. Expected one of: {', '.join(PROFILES)}")
+    if checkpoint is not None and svgz_level is not None:
+        raise ValueError("Resumable output must be plain SVG, not .svgz")
+    engine = _resolve_engine(engine)
+    fills = CompactFills("p" if svg_id != "p" else "p-") if profile == "compact" else None
+    resumed = checkpoint is not None and checkpoint.rows > 0
+    if resumed:
+        out = open(out_path, "r+b")
+        out.truncate(checkpoint.offset)
+        out.seek(checkpoint.offset)
+        if fills is not None:
+            fills.ids = {c: i for i, c in enumerate(checkpoint.classes)}
+    else:
+        out = open_svg_output(out_path, svgz_level)
+    try:
+        _write_per_pixel_bands(out, bands, size, svg_id, scale, progress_cb, engine, fills, checkpoint, resumed, threads)
+    except BaseException:
+        if checkpoint is None:
+            try:
+                os.remove(out_path)
+            except OSError:
+                pass
+        raise
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+def _write_per_pixel_bands(out, bands, size: tuple[int, int], svg_id: str, scale: int, progress_cb: Optional[callable], engine: str, fills: Optional[CompactFills], checkpoint: Optional["Checkpoint"], resumed: bool, threads: int) -> None:
+    width, height = size
+    with out as raw, io.TextIOWrapper(raw, encoding="utf-8", write_through=True) as f:
+        if resumed:
+            _report_skip(progress_cb, checkpoint.rows, height)
+        elif fills is not None:
+            emit_svg_header(f, svg_id, width, height, scale, root_attrs=fills.ROOT_ATTRS)
+            f.write(fills.defs())
+        else:
+            emit_svg_header(f, svg_id, width, height, scale)
+        if checkpoint is not None:
+            bands = _bands_after(bands, checkpoint.rows)
+
+        def band_done(rows: int) -> None:
+            if checkpoint is not None:
+                f.flush()
+                checkpoint.update(raw, rows, fills)
+        if threads > 1 and engine == "numpy":
+            _emit_bands_parallel(raw.write, bands, threads, progress_cb, height, fills, on_band=band_done)
+        else:
+            for y0, band in bands:
+                if engine == "numpy":
+                    _emit_pixels_numpy(raw.write, band, progress_cb, y_offset=y0, total_rows=height, fills=fills)
+                else:
+                    _emit_pixels_python(f.write, band, progress_cb, y_offset=y0, total_rows=height, fills=fills)
+                band_done(y0 + band.height)
+        if fills is not None:
+            f.write(fills.style())
+        emit_svg_footer(f)
+
+
+def _bands_after(bands, start_row: int) -> Iterator[tuple[int, Image.Image]]:
+    """(y, band) pairs with the rows above start_row dropped."""
+    for y0, band in bands:
+        if y0 < start_row:
+            if y0 + band.height <= start_row:
+                continue
+            band = band.crop((0, start_row - y0, band.width, band.height))
+            y0 = start_row
+        yield y0, band
+
+
+class Checkpoint:
+    """
+    Progress sidecar (<output>.ckpt, JSON) for resumable per-pixel output: rows completed,
+    output byte offset, compact-profile fill classes so far, and a fingerprint of the input
+    and settings. It is saved (after syncing the output) at most every CHECKPOINT_SECONDS,
+    when a band has been written, and removed once the footer is written.
+    """
+
+    def __init__(self, out_path: str, fingerprint: str):
+        self.path = out_path + ".ckpt"
+        self.fingerprint = fingerprint
+        self.rows = 0
+        self.offset = 0
+        self.classes: list[int] = []
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, out_path: str, fingerprint: str) -> "Checkpoint":
+        """
+        A checkpoint for out_path that resumes from its sidecar when the fingerprint matches
+        and the output still holds the recorded bytes; otherwise one that starts over.
+        """
+        ckpt = cls(out_path, fingerprint)
+        try:
+            with open(ckpt.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["fingerprint"] == fingerprint and 0 < int(data["offset"]) <= os.path.getsize(out_path):
+                ckpt.rows, ckpt.offset = int(data["rows"]), int(data["offset"])
+                ckpt.classes = [int(c) for c in data.get("classes", [])]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return ckpt
+
+    def update(self, raw, rows: int, fills: Optional[CompactFills] = None, force: bool = False) -> None:
+        """Record rows as done once CHECKPOINT_SECONDS have passed (or force): sync raw, then save the sidecar."""
+        if not force and time.monotonic() - self._saved_at < CHECKPOINT_SECONDS:
+            return
+        raw.flush()
+        os.fsync(raw.fileno())
+        self.rows, self.offset = rows, raw.tell()
+        if fills is not None:
+            self.classes = list(fills.ids)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "rows": self.rows, "offset": self.offset, "classes": self.classes}, f)
+        os.replace(tmp, self.path)
+        self._saved_at = time.monotonic()
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap content fingerprint of a file: its size and a digest of its first and last MiB."""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode("ascii"), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(1 << 20))
+        if size > 2 << 20:
+            f.seek(-(1 << 20), os.SEEK_END)
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def image_fingerprint(im: Image.Image) -> str:
+    """Digest of a decoded image in its own mode (palette and transparency included), hashed band by band."""
+    h = hashlib.blake2b(f"{im.mode} {im.width}x{im.height} {im.info.get('transparency')!r}".encode(), digest_size=16)
+    if im.mode in ("P", "PA"):
+        h.update(bytes(im.getpalette("RGBA") or []))
+    for _y, band in _split_bands(im, DEFAULT_BAND_ROWS):
+        h.update(band.tobytes())
+    return h.hexdigest()
+
+
+def _checkpoint_fingerprint(source: str, svg_id: str, options: "ConvertOptions", **extra) -> str:
+    """Fingerprint of one resumable output: its source (file or image fingerprint) and the settings that shape its bytes."""
+    settings = {"source": source, "svg_id": svg_id, "scale": options.scale, "profile": options.profile, **extra}
+    if options.quantizes:
+        settings["quantize"] = [options.colors, options.palette, options.alpha_threshold]
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _svg_root_attrs(width: int, height: int, scale: int) -> dict[str, str]:
+    """Root attributes pixel_svg_optimizer keeps from a header written by emit_svg_header."""
+    return {
+        "width": str(width * scale),
+        "height": str(height * scale),
+        "viewBox": f"0 0 {width} {height}",
+        "preserveAspectRatio": "xMidYMid meet",
+        "shape-rendering": "crispEdges",
+    }
+
+
+def _packed_rgba(im: Image.Image):
+    """
+    Return an (H, W) uint32 array of RGBA packed little-endian (R in the low byte), with
+    every fully transparent pixel as 0 so equal values mean equal rendered pixels.
+    """
+    return _pack_rgba_array(np.asarray(im if im.mode == "RGBA" else im.convert("RGBA")))
+
+
+def _pack_rgba_array(arr):
+    """_packed_rgba for an (..., N, 4) uint8 RGBA array."""
+    alpha = arr[..., 3]
+    packed = np.ascontiguousarray(arr).view("<u4")[..., 0]
+    # The optimizer reads opacity "1" as fully opaque, so alpha 1 shares a style with 255.
+    packed = np.where(alpha == 1, packed | np.uint32(0xFF000000), packed)
+    packed[alpha == 0] = 0
+    return packed
+
+
+def _style_raster(packed):
+    """
+    Return (index, styles) for merge_raster_rects from a _packed_rgba array: index is an
+    (H, W) int32 array of positions in styles (-1 where transparent), styles the distinct
+    optimizer style keys.
+    """
+    visible = packed != 0
+    colors, inverse = np.unique(packed[visible], return_inverse=True)
+    index = np.full(packed.shape, -1, dtype=np.int32)
+    index[visible] = inverse.reshape(-1)
+    return index, _style_keys(colors)
+
+
+def _style_keys(colors) -> list[str]:
+    """Optimizer style keys of sorted packed RGBA colors."""
+    from pixel_svg_optimizer import style_key_from_rgba8
+    return [
+        style_key_from_rgba8(c & 0xFF, (c >> 8) & 0xFF, (c >> 16) & 0xFF, c >> 24)
+        for c in colors.tolist()
+    ]
+
+
+def _palette_planes(im: Image.Image):
+    """
+    Split an image in a _PALETTE_MODES mode into (index, rgb_lut, alpha): the (H, W) uint8
+    palette index or gray level of each pixel, the (256, 3) uint8 color of each index and
+    the (H, W) uint8 alpha, all as im.convert("RGBA") would resolve them (palette alpha and
+    "transparency" included).
+    """
+    if im.mode == "1":
+        im = im.convert("L")
+    arr = np.asarray(im)
+    index = arr if arr.ndim == 2 else arr[:, :, 0]
+    if im.mode in ("L", "LA"):
+        lut = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 4, axis=1)
+        lut[:, 3] = 255
+        transparency = im.info.get("transparency") if im.mode == "L" else None
+        if isinstance(transparency, int) and 0 <= transparency < 256:
+            lut[transparency, 3] = 0
+    else:
+        entries = Image.frombytes("P", (256, 1), bytes(range(256)))
+        # As RGBA entries, so an RGBA palette keeps its alpha.
+        entries.putpalette(im.getpalette("RGBA"), "RGBA")
+        if im.mode == "P" and "transparency" in im.info:
+            entries.info["transparency"] = im.info["transparency"]
+        lut = np.asarray(entries.convert("RGBA"))[0]
+    alpha = arr[:, :, 1] if arr.ndim == 3 else lut[:, 3][index]
+    return index, lut[:, :3], alpha
+
+
+def _palette_style_raster(im: Image.Image):
+    """
+    _style_raster for an image in a _PALETTE_MODES mode, without packing every pixel or
+    sorting them: the (index, alpha) pairs present are counted, only those are turned into
+    styles, and each pixel is mapped through a 65536-entry lookup table.
+    """
+    index, rgb_lut, alpha = _palette_planes(im)
+    key = (index.astype(np.uint16) << 8) | alpha
+    present = np.flatnonzero(np.bincount(key.reshape(-1), minlength=1 << 16))
+    entries = np.empty((present.size, 4), dtype=np.uint8)
+    entries[:, :3] = rgb_lut[present >> 8]
+    entries[:, 3] = present & 0xFF
+    packed = _pack_rgba_array(entries)
+    visible = packed != 0
+    colors = np.unique(packed[visible])
+    remap = np.full(1 << 16, -1, dtype=np.int32)
+    remap[present[visible]] = np.searchsorted(colors, packed[visible])
+    return remap[key], _style_keys(colors)
+
+
+def _image_style_raster(im: Image.Image):
+    """(index, styles) for merge_raster_rects / raster_components straight from a decoded image."""
+    if im.mode in _PALETTE_MODES:
+        return _palette_style_raster(im)
+    return _style_raster(_packed_rgba(im))
+
+
+def load_palette(path: str) -> tuple[tuple[int, int, int], ...]:
+    """
+    Colors of a palette file, in file order: a GIMP .gpl palette or text with one color per
+    line ("#rrggbb", "rrggbb" or "r g b"; "#" comments and blank lines skipped). Any other
+    file is opened as an image and its distinct colors are used. At most MAX_PALETTE_COLORS.
+    """
+    colors: list[tuple[int, int, int]] = []
+    if Path(path).suffix.lower() in (".gpl", ".txt", ".hex", ".pal"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if not parts or parts[0] in ("GIMP", "Name:", "Columns:"):
+                    continue
+                value = parts[0].lstrip("#")
+                if len(parts) >= 3 and all(p.isdigit() for p in parts[:3]):
+                    rgb = tuple(int(p) for p in parts[:3])
+                elif len(value) == 6 and all(c in "0123456789abcdefABCDEF" for c in value):
+                    rgb = tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+                elif parts[0].startswith("#"):
+                    continue
+                else:
+                    raise ValueError(f"Unreadable palette line in '{path}': {line.strip()!r}")
+                if not all(0 <= c <= 255 for c in rgb):
+                    raise ValueError(f"Palette color out of range in '{path}': {line.strip()!r}")
+                colors.append(rgb)
+    else:
+        with Image.open(path) as im:
+            found = im.convert("RGB").getcolors(MAX_PALETTE_COLORS)
+        if found is None:
+            raise ValueError(f"Palette image '{path}' has more than {MAX_PALETTE_COLORS} colors")
+        colors = [rgb for _count, rgb in sorted(found, key=lambda c: c[1])]
+    colors = list(dict.fromkeys(colors))
+    if not colors:
+        raise ValueError(f"No colors in palette '{path}'")
+    if len(colors) > MAX_PALETTE_COLORS:
+        raise ValueError(f"Palette '{path}' has {len(colors)} colors; at most {MAX_PALETTE_COLORS} are supported")
+    return tuple(colors)
+
+
+def median_cut_palette(bands, size: tuple[int, int], colors: int, alpha_threshold: int = 0) -> tuple[tuple[int, int, int], ...]:
+    """
+    Median-cut palette of at most colors entries for the pixels with alpha above
+    alpha_threshold in an image given as (y, band) pairs (an image is [(0, im)]), built from
+    every n-th pixel in row-major order so that at most QUANTIZE_SAMPLE_PIXELS are sampled
+    however the image is banded. Empty when none are visible.
+    """
+    _require_numpy_for("Color quantization")
+    width, height = size
+    step = max(1, -(-width * height // QUANTIZE_SAMPLE_PIXELS))
+    samples = []
+    for y0, band in bands:
+        rgba = np.asarray(band if band.mode == "RGBA" else band.convert("RGBA")).reshape(-1, 4)[(-y0 * width) % step::step]
+        samples.append(rgba[rgba[:, 3] > alpha_threshold, :3])
+    sample = np.concatenate(samples) if samples else np.empty((0, 3), dtype=np.uint8)
+    if not sample.size:
+        return ()
+    quantized = Image.frombytes("RGB", (len(sample), 1), sample.tobytes()).quantize(colors, method=Image.Quantize.MEDIANCUT)
+    lut = quantized.getpalette()
+    return tuple(tuple(lut[3 * i:3 * i + 3]) for _count, i in sorted(quantized.getcolors(MAX_PALETTE_COLORS), key=lambda c: c[1]))
+
+
+def _nearest_colors(rgb, palette):
+    """Index into palette ((N, 3) uint8) of the nearest entry to each (U, 3) uint8 color; ties go to the earlier entry."""
+    pal = palette.astype(np.float64)
+    bias = (pal * pal).sum(axis=1)
+    nearest = np.empty(len(rgb), dtype=np.uint8)
+    for start in range(0, len(rgb), NEAREST_CHUNK_COLORS):
+        chunk = rgb[start:start + NEAREST_CHUNK_COLORS].astype(np.float64)
+        # |c - p|^2 minus the per-row constant |c|^2; exact in float64 for 8-bit channels.
+        nearest[start:start + NEAREST_CHUNK_COLORS] = np.argmin(bias - 2.0 * (chunk @ pal.T), axis=1)
+    return nearest
+
+
+def quantize_image(im: Image.Image, palette: Optional[tuple[tuple[int, int, int], ...]] = None, alpha_threshold: int = 0) -> Image.Image:
+    """
+    Snap every pixel of im to the nearest palette color (squared RGB distance) and make
+    pixels with alpha at or below alpha_threshold fully transparent; other alpha is kept.
+    Returns a P image (PA when any pixel is not opaque), so the palette fast paths apply
+    downstream. Without a palette only the alpha threshold is applied (RGBA result).
+    """
+    _require_numpy_for("Color quantization")
+    if palette is None:
+        rgba = np.array(im.convert("RGBA"))
+        rgba[rgba[..., 3] <= alpha_threshold] = 0
+        return Image.frombytes("RGBA", im.size, rgba.tobytes())
+    pal = np.asarray(palette or ((0, 0, 0),), dtype=np.uint8).reshape(-1, 3)
+    if im.mode in _PALETTE_MODES:
+        index, rgb_lut, alpha = _palette_planes(im)
+        index = _nearest_colors(rgb_lut, pal)[index]
+    else:
+        rgba = np.asarray(im.convert("RGBA"))
+        alpha = rgba[..., 3]
+        packed = rgba.view("<u4")[..., 0] & np.uint32(0xFFFFFF)
+        # Each distinct color is matched once: a 2**24 presence map avoids sorting the pixels.
+        present = np.zeros(1 << 24, dtype=bool)
+        present[packed] = True
+        distinct = np.flatnonzero(present).astype(np.uint32)
+        lut = np.zeros(1 << 24, dtype=np.uint8)
+        lut[distinct] = _nearest_colors(distinct.view(np.uint8).reshape(-1, 4)[:, :3], pal)
+        index = lut[packed]
+    alpha = np.where(alpha > alpha_threshold, alpha, 0).astype(np.uint8)
+    if alpha.min(initial=255) == 255:
+        out = Image.frombytes("P", im.size, np.ascontiguousarray(index, dtype=np.uint8).tobytes())
+    else:
+        out = Image.frombytes("PA", im.size, np.dstack((index, alpha)).astype(np.uint8).tobytes())
+    out.putpalette(pal.tobytes())
+    return out
+
+
+def _style_pixels_python(im: Image.Image) -> dict:
+    """Pure-Python style -> pixels mapping, as _collect_final_rgba_pixels would build it."""
+    from pixel_svg_optimizer import style_key_from_rgba8
+    width, height = im.size
+    pixels = im.load()
+    keys: dict = {}
+    style_pixels: dict = defaultdict(set)
+    for y in range(height):
+        for x in range(width):
+            rgba = pixels[x, y]
+            if rgba[3] == 0:
+                continue
+            key = keys.get(rgba)
+            if key is None:
+                key = keys[rgba] = style_key_from_rgba8(*rgba)
+            style_pixels[key].add((x, y))
+    return style_pixels
+
+
+def generate_svg_merged(im: Image.Image, out_path: str, scale: int, vertical_merge: bool = True, minify: bool = False, progress_cb: Optional[callable] = None, engine: str = "auto", svgz_level: Optional[int] = None) -> int:
+    """
+    Write merged rects straight from the decoded pixels, skipping the per-pixel SVG.
+
+    Produces the same document optimize_svg_rects_bytes would for the per-pixel SVG
+    of this image: horizontal runs per style, stacked vertically when vertical_merge.
+    Returns the rect count. progress_cb is called as progress_cb(total_rows, total_rows)
+    once the rects are written. svgz_level gzips the output (see open_svg_output).
+    """
+    from pixel_svg_optimizer import build_rects_svg_bytes, merge_raster_rects, merge_style_pixels
+    engine = _resolve_engine(engine)
+    width, height = im.size
+    if engine == "numpy":
+        index, styles = _image_style_raster(im)
+        rect_list = merge_raster_rects(index, styles, vertical_merge=vertical_merge)
+    else:
+        rgba = im if im.mode == "RGBA" else im.convert("RGBA")
+        rect_list = merge_style_pixels(_style_pixels_python(rgba), vertical_merge=vertical_merge)
+    data = build_rects_svg_bytes(rect_list, _svg_root_attrs(width, height, scale), minify=minify)
+    with open_svg_output(out_path, svgz_level) as f:
+        f.write(data)
+    _report_rows(progress_cb, max(height - 1, 0), height, height)
+    return len(rect_list)
+
+
+def generate_svg_paths(im: Image.Image, out_path: str, scale: int, minify: bool = False, progress_cb: Optional[callable] = None, engine: str = "auto", svgz_level: Optional[int] = None) -> int:
+    """
+    Trace like-colored 4-connected regions straight from the decoded pixels, one <path> each.
+
+    Produces the same document optimize_svg_paths_bytes would for the per-pixel SVG of
+    this image, without writing (or being limited by the size of) that intermediate.
+    Returns the path count. progress_cb is called as for generate_svg_merged.
+    """
+    from pixel_svg_optimizer import build_paths_svg_bytes, raster_components, style_pixel_components
+    engine = _resolve_engine(engine)
+    width, height = im.size
+    if engine == "numpy":
+        components = raster_components(*_image_style_raster(im))
+    else:
+        rgba = im if im.mode == "RGBA" else im.convert("RGBA")
+        components = style_pixel_components(_style_pixels_python(rgba))
+    data, n_paths = build_paths_svg_bytes(components, _svg_root_attrs(width, height, scale), minify=minify)
+    with open_svg_output(out_path, svgz_level) as f:
+        f.write(data)
+    _report_rows(progress_cb, max(height - 1, 0), height, height)
+    return n_paths
+
+
+def _rects_svg_text(rect_list) -> str:
+    """Merged rects as written by build_rects_svg_bytes (fill plus opacity when not opaque)."""
+    from pixel_svg_optimizer import fmt_opacity
+    parts = []
+    for x, y, w, h, (fill, op) in rect_list:
+        opacity = f' opacity="{fmt_opacity(op)}"' if abs(op - 1.0) > 1e-6 else ""
+        parts.append(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{fill}"{opacity}/>')
+    return "".join(parts)
+
+
+def _fmt_seconds(ms: int) -> str:
+    return f"{ms / 1000:.3f}".rstrip("0").rstrip(".") + "s"
+
+
+def _visibility_animation(start_ms: int, end_ms: int, total_ms: int) -> str:
+    """SMIL <animate> showing a frame group from start_ms to end_ms of a total_ms loop."""
+    values, key_times = [], []
+    if start_ms > 0:
+        values.append("hidden")
+        key_times.append(0.0)
+    values.append("visible")
+    key_times.append(start_ms / total_ms)
+    if end_ms < total_ms:
+        values.append("hidden")
+        key_times.append(end_ms / total_ms)
+    key_times_s = ";".join(f"{t:.6f}".rstrip("0").rstrip(".") for t in key_times)
+    return (
+        f'<animate attributeName="visibility" values="{";".join(values)}" keyTimes="{key_times_s}" '
+        f'calcMode="discrete" dur="{_fmt_seconds(total_ms)}" repeatCount="indefinite"/>'
+    )
+
+
+def generate_svg_animated(path: str, out_path: str, svg_id: str, scale: int, progress_cb: Optional[callable] = None, crop: Optional[tuple[int, int, int, int]] = None, svgz_level: Optional[int] = None, reduce: int = 1, max_size: int = 0) -> tuple[int, int]:
+    """
+    Write every frame of a multi-frame input into one SVG animated with SMIL (requires numpy).
+
+    Pixels that never change are written once, as merged rects. Each frame then gets a group
+    holding only its pixels at positions that change somewhere in the animation, shown for
+    the frame's duration (source duration, or DEFAULT_FRAME_MS when absent) by a discrete
+    visibility <animate>. The first frame's group is visible without SMIL support.
+    Frames are decoded twice (once to find changing positions, once to emit them) so only
+    one frame is held in memory at a time. Returns (frame count, rect count).
+    progress_cb is called as progress_cb(frames_done, frame_count) during the second pass.
+    svgz_level gzips the output (see open_svg_output).
+    """
+    from pixel_svg_optimizer import merge_raster_rects
+    _require_numpy_for("Animated SVG output")
+    first = None
+    varying = None
+    durations: list[int] = []
+    for _i, _count, im in iter_frames(path, crop=crop, reduce=reduce, max_size=max_size):
+        packed = _packed_rgba(im)
+        if first is None:
+            first = packed
+            varying = np.zeros(packed.shape, dtype=bool)
+        elif packed.shape == first.shape:
+            varying |= packed != first
+        else:
+            raise RuntimeError(f"Frame {_i} of '{path}' is {im.size[0]}x{im.size[1]}, unlike the first frame")
+        durations.append(int(im.info.get("duration") or 0) or DEFAULT_FRAME_MS)
+    if first is None:
+        raise RuntimeError(f"No frames decoded from '{path}'")
+
+    height, width = first.shape
+    total_ms = sum(durations)
+    frame_count = len(durations)
+    n_rects = 0
+    with io.TextIOWrapper(open_svg_output(out_path, svgz_level), encoding="utf-8") as f:
+        emit_svg_header(f, svg_id, width, height, scale)
+        static = np.where(varying, np.uint32(0), first)
+        rects = merge_raster_rects(*_style_raster(static))
+        n_rects += len(rects)
+        f.write(f'<g shape-rendering="crispEdges">{_rects_svg_text(rects)}</g>')
+        if varying.any():
+            start_ms = 0
+            for i, _count, im in iter_frames(path, crop=crop, reduce=reduce, max_size=max_size):
+                packed = np.where(varying, _packed_rgba(im), np.uint32(0))
+                rects = merge_raster_rects(*_style_raster(packed))
+                n_rects += len(rects)
+                end_ms = start_ms + durations[i]
+                hidden = ' visibility="hidden"' if i else ""
+                f.write(
+                    f'<g shape-rendering="crispEdges"{hidden}>'
+                    f'{_visibility_animation(start_ms, end_ms, total_ms)}{_rects_svg_text(rects)}</g>'
+                )
+                start_ms = end_ms
+                if progress_cb:
+                    try:
+                        progress_cb(i + 1, frame_count)
+                    except Exception:
+                        pass
+        emit_svg_footer(f)
+    return frame_count, n_rects
+
+
+def _detach_output(out_path: str) -> None:
+    """Remove out_path if it is a link left by FrameDeduper, so writing it can't change the file it shares."""
+    try:
+        if os.path.islink(out_path) or os.stat(out_path).st_nlink > 1:
+            os.remove(out_path)
+    except OSError:
+        pass
+
+
+@dataclass
+class ConvertOptions:
+    """Output settings shared by the CLI and GUI for each converted frame."""
+    scale: int = 1
+    merge: Optional[str] = None  # None for per-pixel rects, else one of MERGE_MODES
+    paths: bool = False
+    minify: bool = False
+    engine: str = "auto"
+    svgz_level: Optional[int] = None  # gzip level for .svgz output; None writes plain SVG
+    profile: str = "full"  # per-pixel output profile, one of PROFILES
+    resume: bool = False  # checkpoint per-pixel output so an interrupted run can continue
+    colors: int = 0  # quantize each frame to at most this many colors (median cut); 0 keeps them all
+    palette: Optional[tuple[tuple[int, int, int], ...]] = None  # snap to these colors instead (see load_palette)
+    alpha_threshold: int = 0  # pixels with alpha at or below this become fully transparent
+    threads: int = 1  # format per-pixel row bands on this many threads (numpy engine)
+
+    @property
+    def quantizes(self) -> bool:
+        return bool(self.colors or self.palette or self.alpha_threshold)
+
+    def quantize(self, im: Image.Image) -> Image.Image:
+        """im with this quantization applied (see quantize_image); im itself when there is none."""
+        if not self.quantizes:
+            return im
+        palette = self.palette
+        if palette is None and self.colors:
+            palette = median_cut_palette([(0, im)], im.size, self.colors, self.alpha_threshold)
+        return quantize_image(im, palette, self.alpha_threshold)
+
+    @property
+    def mode_name(self) -> str:
+        if self.paths:
+            return "paths"
+        if self.merge:
+            return f"merge-{self.merge}"
+        return "per-pixel" if self.profile == "full" else f"per-pixel-{self.profile}"
+
+
+def convert_frame(im: Image.Image, out_path: str, svg_id: str, options: ConvertOptions, progress_cb: Optional[callable] = None) -> str:
+    """Write one frame as SVG according to options; returns a short summary such as "mode=merge-hv | rects=12"."""
+    _detach_output(out_path)
+    im = options.quantize(im)
+    if options.paths:
+        n_paths = generate_svg_paths(im, out_path, options.scale, minify=options.minify, progress_cb=progress_cb, engine=options.engine, svgz_level=options.svgz_level)
+        return f"mode=paths | paths={n_paths}"
+    if options.merge:
+        n_rects = generate_svg_merged(im, out_path, options.scale, vertical_merge=(options.merge == "hv"), minify=options.minify, progress_cb=progress_cb, engine=options.engine, svgz_level=options.svgz_level)
+        return f"mode=merge-{options.merge} | rects={n_rects}"
+    checkpoint = Checkpoint.load(out_path, _checkpoint_fingerprint(image_fingerprint(im), svg_id, options)) if options.resume else None
+    start = checkpoint.rows if checkpoint else 0
+    generate_svg_per_pixel(im, out_path, svg_id, options.scale, progress_cb=progress_cb, engine=options.engine, svgz_level=options.svgz_level, profile=options.profile, checkpoint=checkpoint, threads=options.threads)
+    return f"mode={options.mode_name}" + (f" | resumed at row {start}" if start else "")
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    A pool of workers processes started with "spawn", never "fork": forking a process
+    that runs other threads (the GUI's Tk and conversion threads, the prefetch thread) can
+    deadlock the children on locks held at fork time.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def convert_all_frames(
+    path: str,
+    out_for: Callable[[int, int], tuple[str, str]],
+    options: ConvertOptions,
+    jobs: int = 1,
+    deduper: Optional[FrameDeduper] = None,
+    on_done: Optional[Callable[[int, int, str, str, bool], None]] = None,
+    row_progress: Optional[Callable[[int, int], Optional[callable]]] = None,
+    crop: Optional[tuple[int, int, int, int]] = None,
+    reduce: int = 1,
+    max_size: int = 0,
+    frames=None,
+) -> int:
+    """
+    Convert every frame of path, decoding each once (iter_frames) in this process.
+
+    out_for(frame_index, frame_count) returns (out_path, svg_id) for a frame. With jobs > 1,
+    decoded frames are handed to a pool of that many worker processes, keeping at most two
+    frames per worker in flight; otherwise frames are converted here, and row_progress (if
+    given) supplies each frame's per-row progress_cb. on_done(frame_index, frame_count,
+    out_path, summary, deduplicated) is called from this thread as frames finish, in
+    completion order. Repeated frames go through deduper when given. crop, reduce and
+    max_size are passed to iter_frames. frames, when given, replaces iter_frames with
+    already decoded (frame_index, frame_count, image) items (see prefetch). Returns the
+    frame count.
+    """
+    frame_count = 0
+    if frames is None:
+        frames = iter_frames(path, crop=crop, palette=True, reduce=reduce, max_size=max_size)
+    if jobs <= 1:
+        for frame_idx, frame_count, im in frames:
+            out_path, svg_id = out_for(frame_idx, frame_count)
+            original = deduper.match(im, out_path) if deduper else None
+            if original is not None:
+                summary = f"duplicate of {os.path.basename(original)} ({deduper.reuse(original, out_path)})"
+            else:
+                progress_cb = row_progress(frame_idx, frame_count) if row_progress else None
+                summary = convert_frame(im, out_path, svg_id, options, progress_cb=progress_cb)
+            if on_done:
+                on_done(frame_idx, frame_count, out_path, summary, original is not None)
+        return frame_count
+
+    pending: dict = {}
+    by_out: dict[str, object] = {}
+
+    def _collect(done) -> None:
+        for fut in done:
+            frame_idx, count, out_path = pending.pop(fut)
+            summary = fut.result()
+            if on_done:
+                on_done(frame_idx, count, out_path, summary, False)
+
+    pool = _process_pool(jobs)
+    try:
+        for frame_idx, frame_count, im in frames:
+            out_path, svg_id = out_for(frame_idx, frame_count)
+            original = deduper.match(im, out_path) if deduper else None
+            if original is not None:
+                fut = by_out.get(original)
+                if fut in pending:
+                    _collect(wait([fut]).done)
+                how = deduper.reuse(original, out_path)
+                if on_done:
+                    on_done(frame_idx, frame_count, out_path, f"duplicate of {os.path.basename(original)} ({how})", True)
+                continue
+            if len(pending) >= 2 * jobs:
+                _collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            fut = pool.submit(convert_frame, im, out_path, svg_id, options)
+            pending[fut] = (frame_idx, frame_count, out_path)
+            by_out[out_path] = fut
+        while pending:
+            _collect(wait(pending, return_when=FIRST_COMPLETED).done)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return frame_count
+
+
+@dataclass
+class FileJob:
+    """One input file for convert_file: where it goes and which frames to convert."""
+    input_path: str
+    output_path: str
+    svg_id: str
+    frame: Optional[int] = None  # None converts every frame
+    animate: bool = False
+    jobs: int = 1
+    dedupe: Optional[str] = None
+    crop: Optional[tuple[int, int, int, int]] = None  # (x, y, w, h) region of interest
+    band_rows: int = DEFAULT_BAND_ROWS  # rows per band for single-frame per-pixel output; 0 decodes whole
+    crop_to_content: bool = False  # shrink the output to the visible pixels (inside crop, if given)
+    reduce: int = 1  # downscale by this integer factor at decode time (nearest neighbor, but see _reduce_pillow)
+    max_size: int = 0  # or by enough that neither side exceeds this many pixels (0 = no limit)
+    grid: Optional[tuple[int, int]] = None  # slice the frame into cells of this (w, h), one output each
+    tiles: Optional[list[Tile]] = None  # or into these named tiles
+
+    @property
+    def sliced(self) -> bool:
+        return self.grid is not None or self.tiles is not None
+
+
+def convert_file(job: FileJob, options: ConvertOptions, on_done: Optional[Callable[[int, int, str, str, bool], None]] = None, image: Optional[Image.Image] = None, row_progress: Optional[Callable[[int, int], Optional[callable]]] = None) -> str:
+    """
+    Convert one input per job; on_done and row_progress are as for convert_all_frames.
+    Returns a one-line summary. image is the job's frame (its only frame when job.frame is
+    None) already decoded by decode_job, which also applies crop_to_content.
+    """
+    if job.sliced:
+        return convert_tiles(job, options, on_done, image)
+    job = _single_frame_job(job, options)
+    if job.crop_to_content:
+        frame = None if job.animate else job.frame
+        job = replace(job, crop=content_crop(job.input_path, frame, job.crop, job.band_rows) or job.crop, crop_to_content=False)
+
+    if job.animate:
+        frame_count, n_rects = generate_svg_animated(job.input_path, job.output_path, job.svg_id, options.scale, crop=job.crop, svgz_level=options.svgz_level, reduce=job.reduce, max_size=job.max_size)
+        return f"mode=animated | frames={frame_count} | rects={n_rects}"
+
+    if job.frame is not None:
+        if _streams_bands(job, options):
+            _detach_output(job.output_path)
+            checkpoint = None
+            if options.resume:
+                fingerprint = _checkpoint_fingerprint(file_fingerprint(job.input_path), job.svg_id, options, frame=job.frame, crop=job.crop, reduce=job.reduce, max_size=job.max_size)
+                checkpoint = Checkpoint.load(job.output_path, fingerprint)
+            start = checkpoint.rows if checkpoint else 0
+            band_rows = job.band_rows or DEFAULT_BAND_ROWS
+            if image is not None:
+                size, bands = image.size, _split_bands(image, band_rows, start)
+            else:
+                size, bands = open_image_bands(job.input_path, frame_index=job.frame, crop=job.crop, band_rows=band_rows, palette=True, start_row=start, reduce=job.reduce, max_size=job.max_size)
+            if options.quantizes:
+                palette = options.palette
+                if palette is None and options.colors:
+                    # The palette must come from the whole image, so it is sampled in a first pass.
+                    if image is not None:
+                        sample_bands = [(0, image)]
+                    else:
+                        _size, sample_bands = open_image_bands(job.input_path, frame_index=job.frame, crop=job.crop, band_rows=band_rows, palette=True, reduce=job.reduce, max_size=job.max_size)
+                    palette = median_cut_palette(sample_bands, size, options.colors, options.alpha_threshold)
+                bands = ((y0, quantize_image(band, palette, options.alpha_threshold)) for y0, band in bands)
+            progress_cb = row_progress(job.frame, 1) if row_progress else None
+            generate_svg_per_pixel_bands(size, bands, job.output_path, job.svg_id, options.scale, progress_cb=progress_cb, engine=options.engine, svgz_level=options.svgz_level, profile=options.profile, checkpoint=checkpoint, threads=options.threads)
+            summary = f"mode={options.mode_name}" + (f" | resumed at row {start}" if start else "")
+        else:
+            im = image if image is not None else open_image(job.input_path, frame_index=job.frame, crop=job.crop, palette=True, reduce=job.reduce, max_size=job.max_size)
+            summary = convert_frame(im, job.output_path, job.svg_id, options, progress_cb=row_progress(job.frame, 1) if row_progress else None)
+        if on_done:
+            on_done(job.frame, 1, job.output_path, summary, False)
+        return summary
+
+    deduper = FrameDeduper(job.dedupe) if job.dedupe else None
+
+    def out_for(frame_idx: int, frame_count: int) -> tuple[str, str]:
+        return frame_output_path(job.output_path, frame_idx, frame_count), job.svg_id + (f"_frame_{frame_idx:05d}" if frame_count > 1 else "")
+
+    frames = [(0, 1, image)] if image is not None else None
+    frame_count = convert_all_frames(job.input_path, out_for, options, jobs=job.jobs, deduper=deduper, on_done=on_done, row_progress=row_progress, crop=job.crop, reduce=job.reduce, max_size=job.max_size, frames=frames)
+    summary = f"mode={options.mode_name} | frames={frame_count}"
+    if deduper:
+        if deduper.mode == "manifest":
+            deduper.write_manifest(manifest_path_for(job.output_path))
+        summary += f" | deduplicated={deduper.skipped}"
+    return summary
+
+
+def convert_tiles(job: FileJob, options: ConvertOptions, on_done: Optional[Callable[[int, int, str, str, bool], None]] = None, image: Optional[Image.Image] = None) -> str:
+    """
+    Convert a sprite sheet tile by tile (job.grid or job.tiles), each tile to its own output
+    (tile_output_path) with id <svg_id>_<tile name>. Frame job.frame (default 0) is decoded
+    once, or image is used, and tiles are cut from it in memory after crop and reduction;
+    fully transparent tiles are skipped, and crop_to_content trims each tile instead of the
+    sheet. Every tile is checked against the sheet before any is written. Tiles go through convert_all_frames, so job.jobs worker processes and job.dedupe
+    apply as they do to frames; on_done is called with tile indices. Returns a one-line summary.
+    """
+    sheet = image if image is not None else open_image(job.input_path, frame_index=job.frame or 0, crop=job.crop, palette=True, reduce=job.reduce, max_size=job.max_size)
+    tiles = job.tiles if job.tiles is not None else grid_tiles(sheet.width, sheet.height, job.grid)
+    check_tiles(tiles, sheet.width, sheet.height)
+    deduper = FrameDeduper(job.dedupe) if job.dedupe else None
+    visible = 0
+
+    def out_for(tile_idx: int, tile_count: int) -> tuple[str, str]:
+        name = tiles[tile_idx][0]
+        return tile_output_path(job.output_path, name), f"{job.svg_id}_{name}"
+
+    def counted():
+        nonlocal visible
+        for item in iter_tiles(sheet, tiles, trim=job.crop_to_content):
+            visible += 1
+            yield item
+
+    convert_all_frames(job.input_path, out_for, options, jobs=job.jobs, deduper=deduper, on_done=on_done, frames=counted())
+    summary = f"mode={options.mode_name} | tiles={visible} | empty={len(tiles) - visible}"
+    if deduper:
+        if deduper.mode == "manifest":
+            deduper.write_manifest(manifest_path_for(job.output_path))
+        summary += f" | deduplicated={deduper.skipped}"
+    return summary
+
+
+def _streams_bands(job: FileJob, options: ConvertOptions) -> bool:
+    """Whether convert_file writes job band by band: per-pixel output streams, while merging and tracing need the whole raster."""
+    return not (job.sliced or job.animate) and job.frame is not None and (job.band_rows > 0 or options.resume) and not (options.merge or options.paths)
+
+
+def _single_frame_job(job: FileJob, options: ConvertOptions) -> FileJob:
+    """
+    job with frame 0 for frame None when its input has only one frame and that frame would
+    be streamed band by band, so all-frames jobs (the batch default) stream too. The output
+    path and id are the same either way. Jobs with dedupe keep going through
+    convert_all_frames, which writes their manifest.
+    """
+    if job.frame is None and not job.dedupe and _streams_bands(replace(job, frame=0), options) and count_frames(job.input_path) == 1:
+        return replace(job, frame=0)
+    return job
+
+
+def decode_job(job: FileJob, options: Optional[ConvertOptions] = None, max_bytes: int = 0) -> tuple[FileJob, Optional[Image.Image]]:
+    """
+    (job, image) for convert_file: crop_to_content resolved into job.crop, and the frame
+    decoded when decode_single_frame can (None for animated output and multi-frame files).
+    A sliced job keeps crop_to_content, which then trims each tile. The frame is also left
+    to convert_file when, with options, it will be streamed band by band (a single-frame
+    input as frame 0, see _single_frame_job), and when it would take more than max_bytes
+    (> 0) decoded.
+    """
+    if options is not None and not job.sliced:
+        job = _single_frame_job(job, options)
+    if job.crop_to_content and not job.sliced:
+        frame = None if job.animate else job.frame
+        job = replace(job, crop=content_crop(job.input_path, frame, job.crop, job.band_rows) or job.crop, crop_to_content=False)
+    if job.animate or (options is not None and _streams_bands(job, options)):
+        return job, None
+    return job, decode_single_frame(job.input_path, job.frame, job.crop, job.reduce, job.max_size, max_bytes)
+
+
+def _run_file_job(job: FileJob, options: ConvertOptions, image: Optional[Image.Image] = None) -> tuple[bool, str]:
+    try:
+        return True, convert_file(job, options, image=image)
+    except Exception as e:
+        return False, str(e)
+
+
+def run_batch(jobs: list[FileJob], options: ConvertOptions, workers: int = 1, on_result: Optional[Callable[[FileJob, bool, str], None]] = None, prefetch_depth: int = PREFETCH_DEPTH, prefetch_bytes: int = PREFETCH_MAX_BYTES) -> list[tuple[FileJob, bool, str]]:
+    """
+    Convert many files, in this process or across a pool of workers processes (one file per
+    task). Failures are reported per file rather than stopping the batch. on_result is called
+    as each file finishes; returns (job, ok, summary or error) in completion order.
+
+    In this process, the next prefetch_depth files are decoded on a background thread while
+    one is written, holding at most about prefetch_bytes of decoded images (see prefetch).
+    Files larger than that decoded, and per-pixel output written band by band, are not
+    decoded ahead; with prefetch_depth 0 each file is converted exactly as on its own.
+    """
+    results: list[tuple[FileJob, bool, str]] = []
+
+    def _record(job: FileJob, ok: bool, msg: str) -> None:
+        results.append((job, ok, msg))
+        if on_result:
+            on_result(job, ok, msg)
+
+    if workers <= 1 or len(jobs) <= 1:
+        if len(jobs) <= 1 or prefetch_depth <= 0:
+            for job in jobs:
+                _record(job, *_run_file_job(job, options))
+            return results
+        decode = partial(decode_job, options=options, max_bytes=prefetch_bytes)
+        for job, decoded, image, error in prefetch(jobs, decode, prefetch_depth, prefetch_bytes):
+            if error is not None:
+                _record(job, False, str(error))
+            else:
+                _record(job, *_run_file_job(decoded, options, image))
+        return results
+
+    with _process_pool(workers) as pool:
+        futures = {pool.submit(_run_file_job, job, options): job for job in jobs}
+        for fut in as_completed(futures):
+            try:
+                ok, msg = fut.result()
+            except Exception as e:
+                ok, msg = False, str(e)
+            _record(futures[fut], ok, msg)
+    return results
+
+
+def batch_output_path(inp: Path, output_dir: Optional[Path], common_root: Optional[Path], suffix: str = ".svg") -> Path:
+    """Output SVG for inp: next to it, in output_dir, or under output_dir mirroring inp's folder below common_root."""
+    if output_dir is None:
+        return inp.with_suffix(suffix)
+    out = output_dir / (inp.stem + suffix)
+    if common_root is not None:
+        try:
+            out = output_dir / inp.parent.relative_to(common_root) / out.name
+        except ValueError:
+            pass
+    return out
+
+
+def output_collisions(jobs: list[FileJob]) -> list[tuple[str, list[str]]]:
+    """(output path, input paths) for every output that more than one distinct input of jobs would write."""
+    by_output: dict[str, list[FileJob]] = defaultdict(list)
+    for job in jobs:
+        by_output[os.path.normcase(os.path.abspath(job.output_path))].append(job)
+    collisions = []
+    for same in by_output.values():
+        inputs = list(dict.fromkeys(os.path.normcase(os.path.abspath(job.input_path)) for job in same))
+        if len(inputs) > 1:
+            collisions.append((same[0].output_path, [job.input_path for job in same]))
+    return collisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert bitmaps to pixel-accurate SVG (per-pixel <rect>, merged rects or paths).")
+    parser.add_argument("input", nargs="*", help="Input image(s) and/or folders of images")
+    parser.add_argument("-o", "--output", help="Path to output SVG (single input file only; default: input name with .svg, or .svgz with --svgz)")
+    parser.add_argument("--output-dir", default=None, help="Folder for output SVGs (default: next to each input)")
+    parser.add_argument("--recursive", action="store_true", help="Scan input folders recursively")
+    parser.add_argument("--preserve-tree", action="store_true", help="With --output-dir, mirror the input folder structure below the inputs' common folder")
+    parser.add_argument("--workers", type=int, default=1, help="Convert this many files at once in worker processes (default: 1)")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_DEPTH, help=f"With --workers 1, decode this many files ahead on a background thread while the current one is written (default: {PREFETCH_DEPTH}; 0 = off)")
+    parser.add_argument("--prefetch-mb", type=int, default=PREFETCH_MAX_BYTES >> 20, help=f"Memory cap in MiB for decoded images waiting in the prefetch queue; larger files are not decoded ahead (default: {PREFETCH_MAX_BYTES >> 20})")
+    parser.add_argument("--frame", type=int, default=None, help="Frame index to convert for multi-frame formats (default: 0 for a single input, every frame in batch mode)")
+    parser.add_argument("--all-frames", action="store_true", help="Convert every frame (each decoded once) to <output>_frame_00000.svg, ...")
+    parser.add_argument("--jobs", type=int, default=1, help="With --all-frames, --grid or --tiles, convert frames or tiles in this many worker processes (default: 1)")
+    parser.add_argument("--animate", action="store_true", help="Write all frames into one SMIL-animated SVG: unchanging pixels once, then per-frame groups of the changing ones (requires numpy)")
+    parser.add_argument("--grid", default=None, help="Slice the frame (a sprite sheet) into cells of WxH pixels and write each to <output>_r000_c000.svg, ...; fully transparent cells are skipped")
+    parser.add_argument("--tiles", default=None, help="Like --grid, with named x,y,w,h tiles from a JSON file (a list of {name,x,y,w,h}, an object of name: [x,y,w,h], or a TexturePacker/Aseprite export), written to <output>_<name>.svg")
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, default=None, help="With --all-frames, --grid or --tiles, reuse the first output for repeated identical frames: link = hard link (else symlink, else copy), symlink, or manifest = only record them in <output>_frames.json. A linked or copied duplicate keeps the root id of the output it reuses")
+    parser.add_argument("--crop", default=None, help="Convert only this region of interest, given as x,y,w,h (output coordinates start at its corner)")
+    parser.add_argument("--crop-to-content", action="store_true", help="Shrink the output (and its viewBox) to the bounding box of the pixels that are not fully transparent, across all converted frames; combines with --crop")
+    parser.add_argument("--reduce", type=int, default=1, help="Downscale by this integer factor while decoding (nearest neighbor; JPEG and camera RAW decode at reduced size directly, which averages pixels)")
+    parser.add_argument("--max-size", type=int, default=0, help="Downscale by the smallest integer factor that keeps both sides at or below this many pixels (combines with --reduce; 0 = off)")
+    parser.add_argument("--band-rows", type=int, default=DEFAULT_BAND_ROWS, help=f"Rows decoded and written at a time for single-frame per-pixel output, bounding memory (default: {DEFAULT_BAND_ROWS}; 0 = whole image)")
+    parser.add_argument("--id", default=None, help='SVG root id (single input only; default: stem of input, e.g., "clocktower")')
+    parser.add_argument("--scale", type=int, default=1, help="Output size multiplier (default: 1). Rects remain 1x1 in viewBox; width/height scaled.")
+    parser.add_argument("--engine", choices=ENGINES, default="auto", help="Emission engine (default: auto = numpy when installed, else python). Output is identical.")
+    parser.add_argument("--merge", choices=MERGE_MODES, default=None, help="Write merged rects instead of one per pixel: h = horizontal runs, hv = runs stacked vertically (same output as pixel_svg_optimizer)")
+    parser.add_argument("--paths", action="store_true", help="Write one <path> per connected like-colored region instead of rects (same output as pixel_svg_optimizer --paths)")
+    parser.add_argument("--minify", action="store_true", help="With --merge or --paths, minify the output SVG")
+    parser.add_argument("--threads", type=int, default=1, help="Format per-pixel output on this many threads, a band of rows per task; the output is byte-identical (numpy engine; default: 1)")
+    parser.add_argument("--profile", choices=PROFILES, default="full", help="Per-pixel output profile: full = one self-contained <rect> per pixel (default); compact = shape-rendering on the root, no per-pixel ids, <use> of one unit rect per pixel filled through CSS classes (one per color and alpha)")
+    parser.add_argument("--colors", type=int, default=0, help=f"Quantize to at most this many colors (median cut, 2-{MAX_PALETTE_COLORS}) before emitting; fewer distinct colors means fewer rects, paths and styles")
+    parser.add_argument("--palette", default=None, help="Snap every pixel to the nearest color of this palette file: GIMP .gpl, text with one #rrggbb or \"r g b\" per line, or an image whose colors form the palette")
+    parser.add_argument("--alpha-threshold", type=int, default=0, help="Make pixels with alpha at or below this (0-255) fully transparent")
+    parser.add_argument("--resume", action="store_true", help=f"Make per-pixel output resumable: progress is checkpointed to <output>.ckpt (every {CHECKPOINT_SECONDS:g}s) and a rerun with the same input and settings continues from it (not with --svgz)")
+    parser.add_argument("--svgz", action="store_true", help="Write gzipped .svgz directly, compressing as the SVG is generated (implied by -o ending in .svgz)")
+    parser.add_argument("--svgz-level", type=int, default=DEFAULT_SVGZ_LEVEL, help=f"GZip level for --svgz (1-9, default {DEFAULT_SVGZ_LEVEL})")
+    parser.add_argument("--profile-startup", action="store_true", help="Print the import cost of each optional backend (after converting any inputs)")
+    args = parser.parse_args()
+
+    if not args.input:
+        if args.profile_startup:
+            print_backend_profile()
+            return
+        parser.error("the following arguments are required: input")
+
+    svgz = args.svgz or (args.output or "").lower().endswith(".svgz")
+    suffix = ".svgz" if svgz else ".svg"
+    options = ConvertOptions(
+        scale=args.scale, merge=args.merge, paths=args.paths, minify=args.minify, engine=args.engine,
+        svgz_level=args.svgz_level if svgz else None, profile=args.profile, resume=args.resume, threads=max(1, args.threads),
+    )
+    if args.resume and svgz:
+        parser.error("--resume needs plain SVG output; drop --svgz")
+    if args.reduce < 1 or args.max_size < 0:
+        parser.error("--reduce must be at least 1 and --max-size at least 0")
+    if args.colors and not 2 <= args.colors <= MAX_PALETTE_COLORS:
+        parser.error(f"--colors must be between 2 and {MAX_PALETTE_COLORS}")
+    if not 0 <= args.alpha_threshold <= 255:
+        parser.error("--alpha-threshold must be between 0 and 255")
+    if args.colors and args.palette:
+        parser.error("use either --colors or --palette, not both")
+    options.colors, options.alpha_threshold = args.colors, args.alpha_threshold
+    if args.palette:
+        try:
+            options.palette = load_palette(args.palette)
+        except (OSError, ValueError, UnidentifiedImageError) as e:
+            parser.error(f"--palette: {e}")
+    if options.quantizes and args.animate:
+        parser.error("--colors, --palette and --alpha-threshold are not supported with --animate")
+    try:
+        crop = parse_crop(args.crop) if args.crop else None
+    except ValueError as e:
+        parser.error(str(e))
+    grid = tiles = None
+    if args.grid and args.tiles:
+        parser.error("use either --grid or --tiles, not both")
+    if (args.grid or args.tiles) and (args.animate or args.all_frames):
+        parser.error("--grid and --tiles slice one frame; drop --animate/--all-frames (use --frame to pick it)")
+    try:
+        if args.grid:
+            grid = parse_grid(args.grid)
+        if args.tiles:
+            tiles = load_tiles(args.tiles)
+    except (OSError, ValueError) as e:
+        parser.error(f"--{'grid' if args.grid else 'tiles'}: {e}")
+    batch = len(args.input) > 1 or os.path.isdir(args.input[0]) or args.output_dir is not None
+
+    if not batch:
+        in_path = args.input[0]
+        out_path = args.output or (os.path.splitext(in_path)[0] + suffix)
+        svg_id = args.id or os.path.splitext(os.path.basename(in_path))[0]
+        frame = None if args.all_frames else (args.frame or 0)
+        job = FileJob(in_path, out_path, svg_id, frame=frame, animate=args.animate, jobs=args.jobs, dedupe=args.dedupe, crop=crop, band_rows=args.band_rows, crop_to_content=args.crop_to_content, reduce=args.reduce, max_size=args.max_size, grid=grid, tiles=tiles)
+
+        def on_done(frame_idx: int, frame_count: int, frame_out: str, summary: str, duplicate: bool) -> None:
+            print(f"{'Duplicate frame' if duplicate else 'SVG written to'}: {frame_out} ({summary})")
+
+        try:
+            summary = convert_file(job, options, on_done=on_done)
+        except ValueError as e:
+            if not job.sliced:
+                raise
+            # Tiles are checked against the decoded sheet, before any output is written.
+            parser.error(f"--{'grid' if args.grid else 'tiles'}: {e}")
+        if args.animate:
+            print(f"SVG written to: {out_path} ({summary})")
+        elif frame is None or job.sliced:
+            print(f"Done: {summary}")
+        if args.profile_startup:
+            print_backend_profile()
+        return
+
+    if args.output or args.id:
+        parser.error("-o/--output and --id only apply to a single input file; use --output-dir for batches")
+    inputs = collect_bitmap_inputs(args.input, args.recursive)
+    if not inputs:
+        parser.error("No bitmap files found in the given inputs")
+    output_dir = Path(args.output_dir).expanduser() if args.output_dir else None
+    common_root = None
+    if args.preserve_tree and output_dir is not None:
+        try:
+            common_root = Path(os.path.commonpath([str(p.resolve().parent) for p in inputs]))
+        except ValueError:
+            common_root = None
 
-    im = open_image(in_path, frame_index=args.frame)
+    frame = None if args.all_frames else args.frame
+    jobs: list[FileJob] = []
+    for inp in inputs:
+        out_svg = batch_output_path(inp.resolve() if common_root else inp, output_dir, common_root, suffix)
+        jobs.append(FileJob(
+            str(inp), str(out_svg), out_svg.stem, frame=frame, animate=args.animate,
+            jobs=args.jobs if args.workers <= 1 else 1, dedupe=args.dedupe, crop=crop, band_rows=args.band_rows,
+            crop_to_content=args.crop_to_content, reduce=args.reduce, max_size=args.max_size, grid=grid, tiles=tiles,
+        ))
+    collisions = output_collisions(jobs)
+    if collisions:
+        listed = "; ".join(f"{out} <- {', '.join(srcs)}" for out, srcs in collisions[:5])
+        more = f" (and {len(collisions) - 5} more)" if len(collisions) > 5 else ""
+        parser.error(f"several inputs would write the same output: {listed}{more}. Use --preserve-tree, or rename or convert them separately")
+    for job in jobs:
+        Path(job.output_path).parent.mkdir(parents=True, exist_ok=True)
 
-    generate_svg_per_pixel(im, out_path, svg_id, args.scale, progress_cb=None)
+    def on_result(job: FileJob, ok: bool, msg: str) -> None:
+        print(f"{'OK  ' if ok else 'FAIL'} | {job.input_path} -> {job.output_path} | {msg}")
 
-    print(f"SVG written to: {out_path}")
+    results = run_batch(jobs, options, workers=args.workers, on_result=on_result, prefetch_depth=args.prefetch, prefetch_bytes=max(0, args.prefetch_mb) << 20)
+    failed = sum(1 for _job, ok, _msg in results if not ok)
+    print(f"Done. OK: {len(results) - failed}, Failed: {failed}")
+    if args.profile_startup:
+        print_backend_profile()
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
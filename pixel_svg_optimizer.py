@@ -8,6 +8,7 @@ from __future__ import annotations
 import argparse
 import gzip
 from collections import defaultdict, deque
+from itertools import product
 from pathlib import Path
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Set, Tuple, Optional, Callable
@@ -20,12 +21,28 @@ except Exception:
     import xml.etree.ElementTree as LET  # type: ignore
     HAVE_LXML = False
 
+# Optional: NumPy for merging decoded pixel rasters (used by bitmap_svg_converter)
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None  # type: ignore
+
 SVG_NS = "http://www.w3.org/2000/svg"
 NS = {"svg": SVG_NS}
 
 # Large-file threshold (bytes)
 LARGE_BYTES = 200 * 1024 * 1024  # 200 MB
 
+# RasterCompositor: buffered rects are composited this many at a time; only rects of up to this many
+# pixels are buffered, and larger ones are composited as one slice each.
+DENSE_BATCH_RECTS = 1 << 16
+DENSE_SLICE_PIXELS = 1 << 12
+# RasterCompositor canvases (32 bytes per pixel) above this many pixels are not allocated from the
+# viewBox up front, and one that would need more than DENSE_SPARSE_RATIO times the area painted so
+# far falls back to a PixelCompositor.
+DENSE_MAX_PIXELS = 1 << 24
+DENSE_SPARSE_RATIO = 4
+
 
 def parse_style(style: str | None) -> dict[str, str]:
     d: dict[str, str] = {}
@@ -116,6 +133,10 @@ def _rgb_to_hex(rgb: Tuple[float, float, float]) -> str:
     r = max(0, min(255, int(round(rgb[0] * 255))))
     g = max(0, min(255, int(round(rgb[1] * 255))))
     b = max(0, min(255, int(round(rgb[2] * 255))))
+    return _rgb8_to_hex(r, g, b)
+
+
+def _rgb8_to_hex(r: int, g: int, b: int) -> str:
     rr, gg, bb = f"{r:02x}", f"{g:02x}", f"{b:02x}"
     if rr[0] == rr[1] and gg[0] == gg[1] and bb[0] == bb[1]:
         return f"#{rr[0]}{gg[0]}{bb[0]}"
@@ -136,6 +157,15 @@ RGBA = Tuple[float, float, float, float]
 StyleKey = Tuple[str, float]
 
 
+def style_key_from_rgba8(r: int, g: int, b: int, a: int) -> StyleKey:
+    """
+    Return the style key the compositor assigns to a lone 8-bit pixel written as
+    fill:#rrggbb;opacity:a (the bitmap converter's per-pixel form).
+    """
+    op = norm_opacity(str(a))
+    return _rgb_to_hex((r / 255.0, g / 255.0, b / 255.0)).lower(), round(op, 6)
+
+
 def _sorted_attribs(attrs: dict[str, str], prefer_order: List[str] | None = None) -> dict[str, str]:
     if not attrs:
         return {}
@@ -153,9 +183,288 @@ def _sorted_attribs(attrs: dict[str, str], prefer_order: List[str] | None = None
     return ordered
 
 
-def _collect_final_rgba_pixels(svg_in: Path) -> tuple[Dict[StyleKey, Set[Point]], dict[str, str]]:
+def _source_over(dst, rgb, a):
+    """
+    Vectorized PixelCompositor.paint arithmetic: dst (..., 4) float RGBA under source color
+    rgb (..., 3) with alpha a (...), both broadcast against dst. Same float64 operations in
+    the same order, so results are bit-identical.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    da = dst[..., 3]
+    inv = 1.0 - a
+    out_a = a + da * inv
+    out = np.empty(np.broadcast_shapes(dst.shape, out_a.shape + (4,)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[..., :3] = (rgb * a[..., None] + dst[..., :3] * da[..., None] * inv[..., None]) / out_a[..., None]
+    out[..., 3] = out_a
+    out[out_a <= 1e-12] = 0.0
+    return out
+
+
+class PixelCompositor:
+    """
+    Pure-Python compositor: a dict of (x, y) -> float (r, g, b, a), painted pixel by pixel.
+    Opaque paints overwrite, which is what the blend gives for them exactly; others blend
+    source-over.
+    """
+
+    def __init__(self) -> None:
+        self.pixels: Dict[Point, RGBA] = {}
+
+    def paint(self, x0: int, y0: int, w0: int, h0: int, rgb_src: Tuple[float, float, float], a_src: float) -> None:
+        """Composite a w0 x h0 rect of color rgb_src and alpha a_src source-over at (x0, y0)."""
+        if a_src <= 0.0:
+            return
+        pix_rgba = self.pixels
+        if a_src == 1.0:
+            paint = (float(rgb_src[0]), float(rgb_src[1]), float(rgb_src[2]), 1.0)
+            pix_rgba.update(dict.fromkeys(product(range(x0, x0 + w0), range(y0, y0 + h0)), paint))
+            return
+        for yy in range(y0, y0 + h0):
+            for xx in range(x0, x0 + w0):
+                dr, dg, db, da = pix_rgba.get((xx, yy), (0.0, 0.0, 0.0, 0.0))
+                out_a = a_src + da * (1.0 - a_src)
+                if out_a <= 1e-12:
+                    pix_rgba[(xx, yy)] = (0.0, 0.0, 0.0, 0.0)
+                    continue
+                out_r = (rgb_src[0] * a_src + dr * da * (1.0 - a_src)) / out_a
+                out_g = (rgb_src[1] * a_src + dg * da * (1.0 - a_src)) / out_a
+                out_b = (rgb_src[2] * a_src + db * da * (1.0 - a_src)) / out_a
+                pix_rgba[(xx, yy)] = (out_r, out_g, out_b, out_a)
+
+    def style_pixels(self) -> Dict[StyleKey, Set[Point]]:
+        """Visible pixels grouped by style key (hex color, alpha rounded to 6 places)."""
+        style_pixels: Dict[StyleKey, Set[Point]] = defaultdict(set)
+        for pt, (r, g, b, a) in self.pixels.items():
+            if a <= 0.0:
+                continue
+            hex_rgb = _rgb_to_hex((r, g, b)).lower()
+            style_pixels[(hex_rgb, round(a, 6))].add(pt)
+        return style_pixels
+
+
+class RasterCompositor:
+    """
+    Dense compositor (requires numpy): a float64 RGBA canvas, 32 bytes per pixel, covering
+    the viewBox (up to DENSE_MAX_PIXELS) and grown to take in rects outside it. A canvas
+    that would exceed DENSE_MAX_PIXELS and DENSE_SPARSE_RATIO times the painted area is not
+    allocated; the pixels move to a PixelCompositor, which takes all further paints (see
+    settled). Results are identical to PixelCompositor. Rects of up to DENSE_SLICE_PIXELS
+    pixels are buffered and composited DENSE_BATCH_RECTS at a time, expanded to pixels: per
+    pixel, paints under its last opaque one are dropped, that one is assigned, and the rest
+    blend in layers (each layer touches a pixel once, in document order). Larger rects are
+    composited as one slice each, assigned when opaque. raster() gives the color-index
+    raster that merge_raster_rects and raster_components take.
+    """
+
+    def __init__(self, box: tuple[int, int, int, int] = (0, 0, 0, 0)) -> None:
+        left, top, width, height = box
+        if max(0, width) * max(0, height) > DENSE_MAX_PIXELS:
+            width = height = 0
+        self._left, self._top = left, top
+        self._rgba = np.zeros((max(0, height), max(0, width), 4))
+        self._pending: list[tuple[int, int, int, int, float, float, float, float]] = []
+        self._painted = 0
+        self._sparse: Optional[PixelCompositor] = None
+
+    def paint(self, x0: int, y0: int, w0: int, h0: int, rgb_src: Tuple[float, float, float], a_src: float) -> None:
+        """Composite a w0 x h0 rect of color rgb_src and alpha a_src source-over at (x0, y0)."""
+        if a_src <= 0.0:
+            return
+        if self._sparse is not None:
+            self._sparse.paint(x0, y0, w0, h0, rgb_src, a_src)
+            return
+        self._painted += w0 * h0
+        if w0 * h0 <= DENSE_SLICE_PIXELS:
+            self._pending.append((x0, y0, w0, h0, rgb_src[0], rgb_src[1], rgb_src[2], a_src))
+            if len(self._pending) >= DENSE_BATCH_RECTS:
+                self._flush()
+            return
+        self._flush()
+        if not self._grow(x0, y0, x0 + w0, y0 + h0):
+            self._sparse.paint(x0, y0, w0, h0, rgb_src, a_src)
+            return
+        top, left = y0 - self._top, x0 - self._left
+        region = self._rgba[top:top + h0, left:left + w0]
+        if a_src == 1.0:
+            region[...] = (rgb_src[0], rgb_src[1], rgb_src[2], 1.0)
+        else:
+            region[...] = _source_over(region, np.asarray(rgb_src, dtype=np.float64), a_src)
+
+    def _grow(self, left: int, top: int, right: int, bottom: int) -> bool:
+        """
+        Enlarge the canvas (keeping its pixels) to cover the box left, top, right, bottom.
+        Returns False, having moved the pixels to a PixelCompositor, when the canvas would be
+        too sparse (see DENSE_MAX_PIXELS).
+        """
+        height, width = self._rgba.shape[:2]
+        if height and width:
+            if left >= self._left and top >= self._top and right <= self._left + width and bottom <= self._top + height:
+                return True
+            left, top = min(left, self._left), min(top, self._top)
+            right, bottom = max(right, self._left + width), max(bottom, self._top + height)
+        area = (bottom - top) * (right - left)
+        if area > DENSE_MAX_PIXELS and area > DENSE_SPARSE_RATIO * self._painted:
+            self._to_sparse()
+            return False
+        canvas = np.zeros((bottom - top, right - left, 4))
+        if height and width:
+            canvas[self._top - top:self._top - top + height, self._left - left:self._left - left + width] = self._rgba
+        self._rgba, self._left, self._top = canvas, left, top
+        return True
+
+    def _to_sparse(self) -> None:
+        """Move the canvas pixels into a PixelCompositor, which takes all later paints."""
+        sparse = PixelCompositor()
+        ys, xs = np.nonzero(self._rgba[..., 3])
+        sparse.pixels = dict(zip(
+            zip((xs + self._left).tolist(), (ys + self._top).tolist()),
+            map(tuple, self._rgba[ys, xs].tolist()),
+        ))
+        self._sparse = sparse
+        self._rgba = np.zeros((0, 0, 4))
+
+    def settled(self):
+        """Flush buffered paints; returns self, or the PixelCompositor it fell back to."""
+        self._flush()
+        return self if self._sparse is None else self._sparse
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        rects = np.array(self._pending, dtype=np.float64)
+        pending, self._pending = self._pending, []
+        xs, ys, ws, hs = (rects[:, i].astype(np.int64) for i in range(4))
+        if not self._grow(int(xs.min()), int(ys.min()), int((xs + ws).max()), int((ys + hs).max())):
+            for x0, y0, w0, h0, r, g, b, a in pending:
+                self._sparse.paint(x0, y0, w0, h0, (r, g, b), a)
+            return
+
+        # One entry per covered pixel, in document order, then grouped by pixel.
+        area = ws * hs
+        seq = np.repeat(np.arange(area.size), area)
+        offset = np.arange(seq.size) - np.repeat(np.cumsum(area) - area, area)
+        rw = ws[seq]
+        pos = (ys[seq] + offset // rw - self._top) * self._rgba.shape[1] + (xs[seq] + offset % rw - self._left)
+        order = np.argsort(pos, kind="stable")
+        pos, seq = pos[order], seq[order]
+        first = np.ones(pos.size, dtype=bool)
+        first[1:] = pos[1:] != pos[:-1]
+        steps = np.arange(pos.size)
+        group_end = np.append(np.flatnonzero(first)[1:], pos.size)[np.cumsum(first) - 1]
+
+        # Paints below a later opaque paint of the same pixel cannot show.
+        opaque = rects[seq, 7] == 1.0
+        next_opaque = np.minimum.accumulate(np.where(opaque, steps, pos.size)[::-1])[::-1]
+        live = np.append(next_opaque[1:], pos.size) >= group_end
+        flat = self._rgba.reshape(-1, 4)
+        assign = live & opaque
+        flat[pos[assign], :3] = rects[seq[assign], 4:7]
+        flat[pos[assign], 3] = 1.0
+
+        # The rest blend in layers; layer k holds each pixel's k-th remaining paint.
+        blend = live & ~opaque
+        pos, seq = pos[blend], seq[blend]
+        if not pos.size:
+            return
+        first = np.ones(pos.size, dtype=bool)
+        first[1:] = pos[1:] != pos[:-1]
+        steps = np.arange(pos.size)
+        layer = steps - np.maximum.accumulate(np.where(first, steps, 0))
+        for k in range(int(layer.max()) + 1):
+            sel = first if k == 0 else layer == k
+            p, s = pos[sel], seq[sel]
+            flat[p] = _source_over(flat[p], rects[s, 4:7], rects[s, 7])
+
+    def raster(self):
+        """
+        (index, styles, (left, top)): index is an (H, W) array naming each pixel's entry in
+        styles, or -1 where nothing visible was painted, and (left, top) is the user-space
+        position of index[0, 0]. Style keys are those of PixelCompositor.style_pixels, distinct.
+        Only for a compositor that has not fallen back (settled() is self).
+        """
+        self._flush()
+        alpha = self._rgba[..., 3]
+        visible = alpha > 0.0
+        index = np.full(alpha.shape, -1, dtype=np.int64)
+        styles: List[StyleKey] = []
+        if visible.any():
+            rgb8 = np.clip(np.rint(self._rgba[visible, :3] * 255), 0, 255).astype(np.int64)
+            # round(a, 6) is applied per distinct alpha, exactly as the pure-Python path does.
+            values, alpha_of = np.unique(alpha[visible], return_inverse=True)
+            rounded = [round(v, 6) for v in values.tolist()]
+            levels = sorted(set(rounded))
+            level_of = {v: i for i, v in enumerate(levels)}
+            alpha_id = np.asarray([level_of[v] for v in rounded], dtype=np.int64)[alpha_of.reshape(-1)]
+            code = ((rgb8[:, 0] << 16) | (rgb8[:, 1] << 8) | rgb8[:, 2]) * len(levels) + alpha_id
+            codes, index[visible] = np.unique(code, return_inverse=True)
+            for c in codes.tolist():
+                rgb, level = divmod(c, len(levels))
+                styles.append((_rgb8_to_hex(rgb >> 16, (rgb >> 8) & 0xFF, rgb & 0xFF), levels[level]))
+        return index, styles, (self._left, self._top)
+
+    def style_pixels(self) -> Dict[StyleKey, Set[Point]]:
+        """The raster as PixelCompositor.style_pixels would give it."""
+        if self.settled() is not self:
+            return self._sparse.style_pixels()
+        index, styles, (left, top) = self.raster()
+        style_pixels: Dict[StyleKey, Set[Point]] = defaultdict(set)
+        ys, xs = np.nonzero(index >= 0)
+        for k, x, y in zip(index[ys, xs].tolist(), (xs + left).tolist(), (ys + top).tolist()):
+            style_pixels[styles[k]].add((x, y))
+        return style_pixels
+
+
+def _canvas_box(root_attrs) -> tuple[int, int, int, int]:
+    """(left, top, width, height) of the pixel grid the root's viewBox (else width/height) covers."""
+    parts = str(root_attrs.get("viewBox") or "").replace(",", " ").split()
+    if len(parts) == 4:
+        try:
+            x, y, w, h = (float(v) for v in parts)
+            left, top = int(x // 1), int(y // 1)
+            return left, top, max(0, -int(-(x + w) // 1) - left), max(0, -int(-(y + h) // 1) - top)
+        except ValueError:
+            pass
+    return 0, 0, max(0, _as_int(root_attrs.get("width"), 0)), max(0, _as_int(root_attrs.get("height"), 0))
+
+
+def new_compositor(root_attrs=None):
+    """A RasterCompositor sized to the root's viewBox when numpy is available, else a PixelCompositor."""
+    if np is None:
+        return PixelCompositor()
+    return RasterCompositor(_canvas_box(root_attrs or {}))
+
+
+def composited_rects(compositor, vertical_merge: bool = True) -> list[tuple[int, int, int, int, StyleKey]]:
+    """Merged rects of a compositor's pixels, as merge_style_pixels returns them."""
+    if isinstance(compositor, RasterCompositor):
+        compositor = compositor.settled()
+    if isinstance(compositor, RasterCompositor):
+        index, styles, (left, top) = compositor.raster()
+        rects = merge_raster_rects(index, styles, vertical_merge=vertical_merge)
+        if left or top:
+            rects = [(x + left, y + top, w, h, st) for x, y, w, h, st in rects]
+        return rects
+    return merge_style_pixels(compositor.style_pixels(), vertical_merge=vertical_merge)
+
+
+def composited_components(compositor) -> list[tuple[StyleKey, Set[Edge]]]:
+    """Traced components of a compositor's pixels, as style_pixel_components yields them."""
+    if isinstance(compositor, RasterCompositor):
+        compositor = compositor.settled()
+    if isinstance(compositor, RasterCompositor):
+        index, styles, (left, top) = compositor.raster()
+        components = raster_components(index, styles)
+        if left or top:
+            components = [(st, {((x0 + left, y0 + top), (x1 + left, y1 + top)) for (x0, y0), (x1, y1) in edges}) for st, edges in components]
+        return components
+    return list(style_pixel_components(compositor.style_pixels()))
+
+
+def _composite_svg(svg_in: Path):
     """
-    Non-streaming collector. Uses lxml tolerant parse (recover=True) when available.
+    Non-streaming compositor. Uses lxml tolerant parse (recover=True) when available.
+    Returns (compositor, out_attrs), the compositor from new_compositor holding the final pixels.
     """
     if HAVE_LXML:
         parser = LET.XMLParser(recover=True, huge_tree=True)
@@ -170,7 +479,7 @@ def _collect_final_rgba_pixels(svg_in: Path) -> tuple[Dict[StyleKey, Set[Point]]
     if not rects:
         raise ValueError("No <rect> elements found. This script expects pixel-rect SVGs.")
 
-    pix_rgba: Dict[Point, RGBA] = {}
+    compositor = new_compositor(root.attrib)
 
     for r in rects:
         st = parse_style(r.get("style"))
@@ -194,24 +503,7 @@ def _collect_final_rgba_pixels(svg_in: Path) -> tuple[Dict[StyleKey, Set[Point]]
         if h0 <= 0:
             h0 = 1
 
-        for yy in range(y0, y0 + h0):
-            for xx in range(x0, x0 + w0):
-                dr, dg, db, da = pix_rgba.get((xx, yy), (0.0, 0.0, 0.0, 0.0))
-                out_a = a_src + da * (1.0 - a_src)
-                if out_a <= 1e-12:
-                    pix_rgba[(xx, yy)] = (0.0, 0.0, 0.0, 0.0)
-                    continue
-                out_r = (rgb_src[0] * a_src + dr * da * (1.0 - a_src)) / out_a
-                out_g = (rgb_src[1] * a_src + dg * da * (1.0 - a_src)) / out_a
-                out_b = (rgb_src[2] * a_src + db * da * (1.0 - a_src)) / out_a
-                pix_rgba[(xx, yy)] = (out_r, out_g, out_b, out_a)
-
-    style_pixels: Dict[StyleKey, Set[Point]] = defaultdict(set)
-    for pt, (r, g, b, a) in pix_rgba.items():
-        if a <= 0.0:
-            continue
-        hex_rgb = _rgb_to_hex((r, g, b)).lower()
-        style_pixels[(hex_rgb, round(a, 6))].add(pt)
+        compositor.paint(x0, y0, w0, h0, rgb_src, a_src)
 
     out_attrs: dict[str, str] = {}
     for k in ("width", "height", "viewBox", "preserveAspectRatio"):
@@ -219,10 +511,11 @@ def _collect_final_rgba_pixels(svg_in: Path) -> tuple[Dict[StyleKey, Set[Point]]
         if v:
             out_attrs[k] = v
     out_attrs["shape-rendering"] = "crispEdges"
-    return style_pixels, out_attrs
+    return compositor, out_attrs
 
 
-def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callable[[float], None]] = None, report_every_bytes: int = 4 * 1024 * 1024) -> tuple[Dict[StyleKey, Set[Point]], dict[str, str]]:
+def _composite_svg_stream(svg_in: Path, progress_cb: Optional[Callable[[float], None]] = None, report_every_bytes: int = 4 * 1024 * 1024):
+    """Streaming (iterparse) form of _composite_svg; progress_cb is bytes-based on input reads."""
     ns_svg = SVG_NS
     rect_tag = f"{{{ns_svg}}}rect"
     svg_tag = f"{{{ns_svg}}}svg"
@@ -270,7 +563,6 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
             context = LET.iterparse(fileobj, events=("start", "end"))
 
         root_attrs: dict[str, str] = {}
-        pix_rgba: Dict[Point, RGBA] = {}
 
         for event, elem in context:
             if event == "start" and elem.tag == svg_tag:
@@ -279,6 +571,7 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
                     if v:
                         root_attrs[k] = v
                 break
+        compositor = new_compositor(root_attrs)
 
         for event, elem in context:
             if event == "end" and elem.tag == rect_tag:
@@ -335,17 +628,7 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
                 if h0 <= 0:
                     h0 = 1
 
-                for yy in range(y0, y0 + h0):
-                    for xx in range(x0, x0 + w0):
-                        dr, dg, db, da = pix_rgba.get((xx, yy), (0.0, 0.0, 0.0, 0.0))
-                        out_a = a_src + da * (1.0 - a_src)
-                        if out_a <= 1e-12:
-                            pix_rgba[(xx, yy)] = (0.0, 0.0, 0.0, 0.0)
-                            continue
-                        out_r = (rgb_src[0] * a_src + dr * da * (1.0 - a_src)) / out_a
-                        out_g = (rgb_src[1] * a_src + dg * da * (1.0 - a_src)) / out_a
-                        out_b = (rgb_src[2] * a_src + db * da * (1.0 - a_src)) / out_a
-                        pix_rgba[(xx, yy)] = (out_r, out_g, out_b, out_a)
+                compositor.paint(x0, y0, w0, h0, rgb_src, a_src)
 
                 if HAVE_LXML:
                     try:
@@ -355,13 +638,6 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
                     except Exception:
                         pass
 
-        style_pixels: Dict[StyleKey, Set[Point]] = defaultdict(set)
-        for pt, (r, g, b, a) in pix_rgba.items():
-            if a <= 0.0:
-                continue
-            hex_rgb = _rgb_to_hex((r, g, b)).lower()
-            style_pixels[(hex_rgb, round(a, 6))].add(pt)
-
         out_attrs: dict[str, str] = {}
         for k in ("width", "height", "viewBox", "preserveAspectRatio"):
             v = root_attrs.get(k)
@@ -373,7 +649,7 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
                 progress_cb(100.0)
             except Exception:
                 pass
-        return style_pixels, out_attrs
+        return compositor, out_attrs
     finally:
         try:
             if fileobj is not None:
@@ -382,9 +658,24 @@ def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callab
             pass
 
 
-def _build_rect_list(svg_in: Path, vertical_merge: bool = True) -> tuple[list[tuple[int, int, int, int, tuple[str, float]]], dict[str, str]]:
-    style_pixels, out_attrs = _collect_final_rgba_pixels(svg_in)
+def _collect_final_rgba_pixels(svg_in: Path) -> tuple[Dict[StyleKey, Set[Point]], dict[str, str]]:
+    """Final style -> pixels mapping of an SVG (see _composite_svg)."""
+    compositor, out_attrs = _composite_svg(svg_in)
+    return compositor.style_pixels(), out_attrs
 
+
+def _collect_final_rgba_pixels_stream(svg_in: Path, progress_cb: Optional[Callable[[float], None]] = None, report_every_bytes: int = 4 * 1024 * 1024) -> tuple[Dict[StyleKey, Set[Point]], dict[str, str]]:
+    """Final style -> pixels mapping of an SVG, parsed with iterparse (see _composite_svg_stream)."""
+    compositor, out_attrs = _composite_svg_stream(svg_in, progress_cb=progress_cb, report_every_bytes=report_every_bytes)
+    return compositor.style_pixels(), out_attrs
+
+
+def merge_style_pixels(style_pixels: Dict[StyleKey, Set[Point]], vertical_merge: bool = True) -> list[tuple[int, int, int, int, StyleKey]]:
+    """
+    Merge pixels into rects: contiguous runs per row per style, then (optionally)
+    identical (x, w, style) runs stacked across successive rows.
+    Returns rects as (x, y, w, h, style) sorted by (y, x, w, h).
+    """
     rows: dict[int, dict[tuple[str, float], list[int]]] = defaultdict(lambda: defaultdict(list))
     for stylekey, pts in style_pixels.items():
         for (x, y) in pts:
@@ -424,53 +715,60 @@ def _build_rect_list(svg_in: Path, vertical_merge: bool = True) -> tuple[list[tu
     else:
         rect_list = merged_h
 
-    rect_list_sorted = sorted(rect_list, key=lambda t: (t[1], t[0], t[2], t[3]))
-    return rect_list_sorted, out_attrs
+    return sorted(rect_list, key=lambda t: (t[1], t[0], t[2], t[3]))
 
 
-def _build_rect_list_progress(svg_in: Path, vertical_merge: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[list[tuple[int, int, int, int, tuple[str, float]]], dict[str, str]]:
-    style_pixels, out_attrs = _collect_final_rgba_pixels_stream(svg_in, progress_cb=progress_cb)
+def merge_raster_rects(index, styles: List[StyleKey], vertical_merge: bool = True) -> list[tuple[int, int, int, int, StyleKey]]:
+    """
+    Vectorized merge_style_pixels for a decoded raster (requires numpy).
 
-    rows: dict[int, dict[tuple[str, float], list[int]]] = defaultdict(lambda: defaultdict(list))
-    for stylekey, pts in style_pixels.items():
-        for (x, y) in pts:
-            rows[y][stylekey].append(x)
+    index is an (H, W) integer array naming each pixel's entry in styles, or -1 for
+    transparent pixels. Entries of styles must be distinct so equal indices mean equal
+    style keys. Produces the same rects, in the same order, as merge_style_pixels on
+    the equivalent style->pixels mapping.
+    """
+    if np is None:
+        raise RuntimeError("Raster merging requires numpy. Please install: pip install numpy")
+    h, w = index.shape
+    flat = np.ascontiguousarray(index).reshape(-1)
+    if flat.size == 0:
+        return []
+    change = np.empty(flat.size, dtype=bool)
+    change[0] = True
+    np.not_equal(flat[1:], flat[:-1], out=change[1:])
+    change[::w] = True
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, flat.size))
+    keys = flat[starts]
+    keep = keys >= 0
+    starts, lengths, keys = starts[keep], lengths[keep], keys[keep]
+    ys, xs = np.divmod(starts, w)
+    hs = np.ones_like(lengths)
+
+    if vertical_merge and keys.size:
+        order = np.lexsort((ys, keys, lengths, xs))
+        xs, lengths, keys, ys = xs[order], lengths[order], keys[order], ys[order]
+        new = np.ones(keys.size, dtype=bool)
+        new[1:] = (xs[1:] != xs[:-1]) | (lengths[1:] != lengths[:-1]) | (keys[1:] != keys[:-1]) | (ys[1:] != ys[:-1] + 1)
+        first = np.flatnonzero(new)
+        hs = np.diff(np.append(first, keys.size))
+        xs, ys, lengths, keys = xs[first], ys[first], lengths[first], keys[first]
+
+    order = np.lexsort((hs, lengths, xs, ys))
+    return [
+        (x, y, rw, rh, styles[k])
+        for x, y, rw, rh, k in zip(xs[order].tolist(), ys[order].tolist(), lengths[order].tolist(), hs[order].tolist(), keys[order].tolist())
+    ]
 
-    merged_h: list[tuple[int, int, int, int, tuple[str, float]]] = []
-    for y, style_map in rows.items():
-        for stylekey, xs in style_map.items():
-            if not xs:
-                continue
-            xs = sorted(xs)
-            start = prev = xs[0]
-            for x in xs[1:]:
-                if x == prev + 1:
-                    prev = x
-                else:
-                    merged_h.append((start, y, prev - start + 1, 1, stylekey))
-                    start = prev = x
-            merged_h.append((start, y, prev - start + 1, 1, stylekey))
 
-    if vertical_merge:
-        cols: dict[tuple[int, int, tuple[str, float]], list[int]] = defaultdict(list)
-        for x, y, w, _h, stylekey in merged_h:
-            cols[(x, w, stylekey)].append(y)
+def _build_rect_list(svg_in: Path, vertical_merge: bool = True) -> tuple[list[tuple[int, int, int, int, tuple[str, float]]], dict[str, str]]:
+    compositor, out_attrs = _composite_svg(svg_in)
+    return composited_rects(compositor, vertical_merge=vertical_merge), out_attrs
 
-        rect_list: list[tuple[int, int, int, int, tuple[str, float]]] = []
-        for (x, w, stylekey), ys in cols.items():
-            ys = sorted(ys)
-            start = prev = ys[0]
-            for y in ys[1:]:
-                if y == prev + 1:
-                    prev = y
-                else:
-                    rect_list.append((x, start, w, prev - start + 1, stylekey))
-                    start = prev = y
-            rect_list.append((x, start, w, prev - start + 1, stylekey))
-    else:
-        rect_list = merged_h
 
-    rect_list_sorted = sorted(rect_list, key=lambda t: (t[1], t[0], t[2], t[3]))
+def _build_rect_list_progress(svg_in: Path, vertical_merge: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[list[tuple[int, int, int, int, tuple[str, float]]], dict[str, str]]:
+    compositor, out_attrs = _composite_svg_stream(svg_in, progress_cb=progress_cb)
+    rect_list_sorted = composited_rects(compositor, vertical_merge=vertical_merge)
     if progress_cb:
         try:
             progress_cb(100.0)
@@ -479,12 +777,9 @@ def _build_rect_list_progress(svg_in: Path, vertical_merge: bool = True, progres
     return rect_list_sorted, out_attrs
 
 
-def optimize_svg_rects_bytes(svg_in: Path, vertical_merge: bool = True, minify: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[bytes, int]:
-    if progress_cb:
-        rect_list_sorted, out_attrs = _build_rect_list_progress(svg_in, vertical_merge=vertical_merge, progress_cb=progress_cb)
-    else:
-        rect_list_sorted, out_attrs = _build_rect_list(svg_in, vertical_merge=vertical_merge)
-
+def build_rects_svg_bytes(rect_list_sorted: list[tuple[int, int, int, int, StyleKey]], out_attrs: dict[str, str], minify: bool = True) -> bytes:
+    """Serialize merged rects (as returned by merge_style_pixels) under an <svg> root built from out_attrs."""
+    out_attrs = dict(out_attrs)
     if minify and out_attrs.get("preserveAspectRatio", "").strip() == "xMidYMid meet":
         out_attrs.pop("preserveAspectRatio", None)
 
@@ -502,7 +797,16 @@ def optimize_svg_rects_bytes(svg_in: Path, vertical_merge: bool = True, minify:
     if minify:
         _postprocess_minify(new_root, mode="rects", have_holes=False)
 
-    data = ET.tostring(new_root, encoding="utf-8", xml_declaration=not minify)
+    return ET.tostring(new_root, encoding="utf-8", xml_declaration=not minify)
+
+
+def optimize_svg_rects_bytes(svg_in: Path, vertical_merge: bool = True, minify: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[bytes, int]:
+    if progress_cb:
+        rect_list_sorted, out_attrs = _build_rect_list_progress(svg_in, vertical_merge=vertical_merge, progress_cb=progress_cb)
+    else:
+        rect_list_sorted, out_attrs = _build_rect_list(svg_in, vertical_merge=vertical_merge)
+
+    data = build_rects_svg_bytes(rect_list_sorted, out_attrs, minify=minify)
     if progress_cb:
         try:
             progress_cb(100.0)
@@ -685,12 +989,111 @@ def _component_path_parts_from_cycles(cycles: List[List[PointT]]) -> tuple[Point
     return first_start, last_start, " ".join(body_parts).strip()
 
 
-def optimize_svg_paths_bytes(svg_in: Path, minify: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[bytes, int]:
-    if progress_cb:
-        style_pixels, out_attrs = _collect_final_rgba_pixels_stream(svg_in, progress_cb=progress_cb)
-    else:
-        style_pixels, out_attrs = _collect_final_rgba_pixels(svg_in)
+def style_pixel_components(style_pixels: Dict[StyleKey, Set[PointT]]):
+    """
+    Yield (style, boundary edges) for each 4-connected component of like-styled pixels,
+    styles in (fill, opacity) order and components by their first pixel in row-major order.
+    """
+    for stylekey in sorted(style_pixels.keys(), key=lambda k: (k[0], k[1])):
+        pixels = style_pixels[stylekey]
+        if not pixels:
+            continue
+        for comp in _connected_components(pixels):
+            yield stylekey, _component_edges(comp)
 
+
+def raster_components(index, styles: List[StyleKey]) -> list[tuple[StyleKey, Set[Edge]]]:
+    """
+    Vectorized style_pixel_components for a decoded raster (requires numpy).
+
+    index and styles are as for merge_raster_rects. Components are labelled by joining
+    same-style row runs that touch vertically; boundary edges come from comparing each
+    pixel with its four neighbours. Same components and order as style_pixel_components.
+    """
+    if np is None:
+        raise RuntimeError("Raster path tracing requires numpy. Please install: pip install numpy")
+    h, w = index.shape
+    if h == 0 or w == 0:
+        return []
+    idx = np.ascontiguousarray(index, dtype=np.int64)
+    flat = idx.reshape(-1)
+    change = np.empty(flat.size, dtype=bool)
+    change[0] = True
+    np.not_equal(flat[1:], flat[:-1], out=change[1:])
+    change[::w] = True
+    run_of = (np.cumsum(change) - 1).reshape(h, w)
+    n_runs = int(run_of[-1, -1]) + 1
+
+    # Union runs of the same style that touch across consecutive rows; the root is the
+    # lowest run id, i.e. the run holding the component's first row-major pixel.
+    touch = (idx[:-1] == idx[1:]) & (idx[:-1] >= 0)
+    pairs = np.unique(run_of[:-1][touch] * n_runs + run_of[1:][touch])
+    parent = list(range(n_runs))
+    for a, b in zip((pairs // n_runs).tolist(), (pairs % n_runs).tolist()):
+        while parent[a] != a:
+            parent[a] = a = parent[parent[a]]
+        while parent[b] != b:
+            parent[b] = b = parent[parent[b]]
+        if a != b:
+            if a < b:
+                parent[b] = a
+            else:
+                parent[a] = b
+    root = np.asarray(parent, dtype=np.int64)
+    while True:
+        nxt = root[root]
+        if np.array_equal(nxt, root):
+            break
+        root = nxt
+
+    # Boundary unit edges, each already in _norm_edge order: (x0, y0) <= (x1, y1).
+    pad = np.full((h + 2, w + 2), -1, dtype=np.int64)
+    pad[1:-1, 1:-1] = idx
+    visible = idx >= 0
+    x0s, y0s, x1s, y1s, owners = [], [], [], [], []
+    for (dy, dx), (ax, ay, bx, by) in (
+        ((-1, 0), (0, 0, 1, 0)),
+        ((0, 1), (1, 0, 1, 1)),
+        ((1, 0), (0, 1, 1, 1)),
+        ((0, -1), (0, 0, 0, 1)),
+    ):
+        mask = visible & (pad[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx] != idx)
+        ys, xs = np.nonzero(mask)
+        x0s.append(xs + ax)
+        y0s.append(ys + ay)
+        x1s.append(xs + bx)
+        y1s.append(ys + by)
+        owners.append(root[run_of[ys, xs]])
+    owner = np.concatenate(owners)
+
+    comp_roots = np.unique(owner)
+    style_rank = np.empty(len(styles), dtype=np.int64)
+    style_rank[sorted(range(len(styles)), key=lambda i: (styles[i][0], styles[i][1]))] = np.arange(len(styles))
+    comp_keys = flat[np.flatnonzero(change)[comp_roots]]
+    comp_order = np.lexsort((comp_roots, style_rank[comp_keys]))
+    rank_of_root = np.empty(n_runs, dtype=np.int64)
+    rank_of_root[comp_roots[comp_order]] = np.arange(comp_roots.size)
+
+    order = np.argsort(rank_of_root[owner], kind="stable")
+    bounds = np.searchsorted(rank_of_root[owner][order], np.arange(comp_roots.size + 1)).tolist()
+    x0 = np.concatenate(x0s)[order].tolist()
+    y0 = np.concatenate(y0s)[order].tolist()
+    x1 = np.concatenate(x1s)[order].tolist()
+    y1 = np.concatenate(y1s)[order].tolist()
+
+    out: list[tuple[StyleKey, Set[Edge]]] = []
+    for i, k in enumerate(comp_keys[comp_order].tolist()):
+        lo, hi = bounds[i], bounds[i + 1]
+        out.append((styles[k], set(zip(zip(x0[lo:hi], y0[lo:hi]), zip(x1[lo:hi], y1[lo:hi])))))
+    return out
+
+
+def build_paths_svg_bytes(components, out_attrs: dict[str, str], minify: bool = True) -> tuple[bytes, int]:
+    """
+    Serialize traced components, as (style, boundary edges) pairs in output order, as one
+    <path> each under an <svg> root built from out_attrs. Returns (bytes, path count).
+    """
+    out_attrs = dict(out_attrs)
     if minify and out_attrs.get("preserveAspectRatio", "").strip() == "xMidYMid meet":
         out_attrs.pop("preserveAspectRatio", None)
 
@@ -701,43 +1104,45 @@ def optimize_svg_paths_bytes(svg_in: Path, minify: bool = True, progress_cb: Opt
     path_count = 0
     have_holes_global = False
 
-    for (fill_hex, op) in sorted(style_pixels.keys(), key=lambda k: (k[0], k[1])):
-        pixels = style_pixels[(fill_hex, op)]
-        if not pixels:
-            continue
+    for (fill_hex, op), edges in components:
+        cycles = _edges_to_cycles(edges)
+        has_holes = len(cycles) > 1
+        have_holes_global = have_holes_global or has_holes
 
-        comps = _connected_components(pixels)
-        for comp in comps:
-            edges = _component_edges(comp)
-            cycles = _edges_to_cycles(edges)
-            has_holes = len(cycles) > 1
-            have_holes_global = have_holes_global or has_holes
-
-            first_start, last_start, body = _component_path_parts_from_cycles(cycles)
-            if first_start == (0, 0) and not body:
-                continue
+        first_start, last_start, body = _component_path_parts_from_cycles(cycles)
+        if first_start == (0, 0) and not body:
+            continue
 
-            d_full = f"M {first_start[0]} {first_start[1]}{(' ' + body) if body else ''}"
+        d_full = f"M {first_start[0]} {first_start[1]}{(' ' + body) if body else ''}"
 
-            attrs = {"d": d_full, "fill": fill_hex}
-            if not minify and has_holes:
-                attrs["fill-rule"] = "evenodd"
-            if abs(op - 1.0) > 1e-6:
-                attrs["opacity"] = fmt_opacity(op)
+        attrs = {"d": d_full, "fill": fill_hex}
+        if not minify and has_holes:
+            attrs["fill-rule"] = "evenodd"
+        if abs(op - 1.0) > 1e-6:
+            attrs["opacity"] = fmt_opacity(op)
 
-            if minify:
-                attrs["data-first"] = f"{first_start[0]},{first_start[1]}"
-                attrs["data-last"] = f"{last_start[0]},{last_start[1]}"
-                attrs["data-body"] = body
-                attrs["data-hole"] = "1" if has_holes else "0"
+        if minify:
+            attrs["data-first"] = f"{first_start[0]},{first_start[1]}"
+            attrs["data-last"] = f"{last_start[0]},{last_start[1]}"
+            attrs["data-body"] = body
+            attrs["data-hole"] = "1" if has_holes else "0"
 
-            ET.SubElement(g, f"{{{SVG_NS}}}path", _sorted_attribs(attrs, prefer_order=["d", "fill", "opacity", "fill-rule"]))
-            path_count += 1
+        ET.SubElement(g, f"{{{SVG_NS}}}path", _sorted_attribs(attrs, prefer_order=["d", "fill", "opacity", "fill-rule"]))
+        path_count += 1
 
     if minify:
         _postprocess_minify(new_root, mode="paths", have_holes=have_holes_global)
 
-    data = ET.tostring(new_root, encoding="utf-8", xml_declaration=not minify)
+    return ET.tostring(new_root, encoding="utf-8", xml_declaration=not minify), path_count
+
+
+def optimize_svg_paths_bytes(svg_in: Path, minify: bool = True, progress_cb: Optional[Callable[[float], None]] = None) -> tuple[bytes, int]:
+    if progress_cb:
+        compositor, out_attrs = _composite_svg_stream(svg_in, progress_cb=progress_cb)
+    else:
+        compositor, out_attrs = _composite_svg(svg_in)
+
+    data, path_count = build_paths_svg_bytes(composited_components(compositor), out_attrs, minify=minify)
     if progress_cb:
         try:
             progress_cb(100.0)
@@ -0,0 +1,117 @@
+"""Per-pixel output written band by band must match whole-image output, resumed or not."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+WIDTH, HEIGHT = 23, 61
+
+
+@pytest.fixture
+def png(tmp_path) -> Path:
+    rng = np.random.default_rng(9)
+    rgba = rng.integers(0, 8, size=(HEIGHT, WIDTH, 4), dtype=np.uint8) * 36
+    rgba[:5, :, 3] = 0
+    path = tmp_path / "in.png"
+    Image.fromarray(rgba, "RGBA").save(path)
+    return path
+
+
+def _whole(png: Path, out: Path, options: bsc.ConvertOptions) -> bytes:
+    bsc.convert_frame(bsc.open_image(str(png), palette=True), str(out), "in", options)
+    return out.read_bytes()
+
+
+@pytest.mark.parametrize("profile", ["full", "compact"])
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+@pytest.mark.parametrize("band_rows", [1, 8, HEIGHT, 500])
+def test_banded_matches_whole(tmp_path, png, profile, engine, band_rows):
+    options = bsc.ConvertOptions(profile=profile, engine=engine)
+    expected = _whole(png, tmp_path / "whole.svg", options)
+    out = tmp_path / "banded.svg"
+    bsc.convert_file(bsc.FileJob(str(png), str(out), "in", frame=0, band_rows=band_rows), options)
+    assert out.read_bytes() == expected
+
+
+def test_batch_job_streams_single_frame_inputs(tmp_path, png, monkeypatch):
+    """A batch job (frame None) of a one-frame input is decoded band by band, never whole."""
+    expected = _whole(png, tmp_path / "whole.svg", bsc.ConvertOptions())
+    heights = []
+    write_bands = bsc.generate_svg_per_pixel_bands
+
+    def counting(size, bands, *args, **kwargs):
+        def counted():
+            for y0, band in bands:
+                heights.append(band.height)
+                yield y0, band
+        return write_bands(size, counted(), *args, **kwargs)
+
+    def whole_decode(*args, **kwargs):
+        raise AssertionError("decoded whole")
+
+    monkeypatch.setattr(bsc, "generate_svg_per_pixel_bands", counting)
+    monkeypatch.setattr(bsc, "open_image", whole_decode)
+    monkeypatch.setattr(bsc, "iter_frames", whole_decode)
+    monkeypatch.setattr(bsc, "decode_single_frame", whole_decode)
+    for depth in (0, 2):
+        heights.clear()
+        out = tmp_path / f"batch{depth}.svg"
+        job = bsc.FileJob(str(png), str(out), "in", band_rows=8)
+        results = bsc.run_batch([job, job], bsc.ConvertOptions(), prefetch_depth=depth)
+        assert all(ok for _job, ok, _msg in results), results
+        assert out.read_bytes() == expected
+        assert max(heights) == 8 and len(heights) == 2 * -(-HEIGHT // 8)
+
+
+def _interrupted(png: Path, out: Path, options: bsc.ConvertOptions, svg_id: str = "in", at_row: int = 20) -> None:
+    def row_progress(frame_idx, frames):
+        def stop(rows_done, total_rows):
+            if rows_done >= at_row:
+                raise KeyboardInterrupt
+        return stop
+
+    with pytest.raises(KeyboardInterrupt):
+        bsc.convert_file(bsc.FileJob(str(png), str(out), svg_id, frame=0, band_rows=8), options, row_progress=row_progress)
+
+
+@pytest.mark.parametrize("profile", ["full", "compact"])
+def test_resume_after_interruption(tmp_path, png, monkeypatch, profile):
+    monkeypatch.setattr(bsc, "CHECKPOINT_SECONDS", 0)
+    options = bsc.ConvertOptions(profile=profile, resume=True)
+    expected = _whole(png, tmp_path / "whole.svg", bsc.ConvertOptions(profile=profile))
+    out = tmp_path / "out.svg"
+    _interrupted(png, out, options)
+    assert Path(str(out) + ".ckpt").exists()
+
+    summary = bsc.convert_file(bsc.FileJob(str(png), str(out), "in", frame=0, band_rows=8), options)
+    assert "resumed at row 16" in summary
+    assert out.read_bytes() == expected
+    assert not Path(str(out) + ".ckpt").exists()
+
+
+@pytest.mark.parametrize("damage", ["corrupt", "other id", "truncated output"])
+def test_unusable_checkpoint_starts_over(tmp_path, png, monkeypatch, damage):
+    monkeypatch.setattr(bsc, "CHECKPOINT_SECONDS", 0)
+    options = bsc.ConvertOptions(resume=True)
+    out = tmp_path / "out.svg"
+    _interrupted(png, out, options)
+    svg_id = "in"
+    if damage == "corrupt":
+        Path(str(out) + ".ckpt").write_text('{"fingerprint": ', encoding="utf-8")
+    elif damage == "other id":
+        svg_id = "renamed"
+    else:
+        out.write_bytes(out.read_bytes()[:100])
+
+    summary = bsc.convert_file(bsc.FileJob(str(png), str(out), svg_id, frame=0, band_rows=8), options)
+    assert "resumed" not in summary
+    expected = tmp_path / "whole.svg"
+    bsc.convert_frame(bsc.open_image(str(png), palette=True), str(expected), svg_id, bsc.ConvertOptions())
+    assert out.read_bytes() == expected.read_bytes()
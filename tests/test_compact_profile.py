@@ -0,0 +1,75 @@
+"""Compact per-pixel output: engine and thread parity, and fills that resolve to the input pixels."""
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK = "{http://www.w3.org/1999/xlink}"
+
+
+@pytest.fixture(scope="module")
+def image() -> Image.Image:
+    """150 rows (several 64-row thread bands) of 37 colors, some translucent, some invisible."""
+    rng = np.random.default_rng(16)
+    colors = rng.integers(0, 256, size=(37, 4), dtype=np.uint8)
+    colors[:3, 3] = 0
+    colors[3:12, 3] = rng.integers(1, 255, size=9)
+    colors[12:, 3] = 255
+    return Image.fromarray(colors[rng.integers(0, 37, size=(150, 41))], "RGBA")
+
+
+def _render(im: Image.Image, out: Path, engine: str, threads: int = 1) -> bytes:
+    bsc.generate_svg_per_pixel(im, str(out), "img", 1, engine=engine, profile="compact", threads=threads)
+    return out.read_bytes()
+
+
+def test_engines_and_threads_match(tmp_path, image):
+    python = _render(image, tmp_path / "python.svg", "python")
+    assert _render(image, tmp_path / "numpy.svg", "numpy") == python
+    for threads in (2, 3, 8):
+        assert _render(image, tmp_path / f"threads{threads}.svg", "numpy", threads) == python
+
+
+def test_banded_batch_output_matches(tmp_path, image):
+    png = tmp_path / "in.png"
+    image.save(png)
+    expected = _render(image, tmp_path / "whole.svg", "numpy")
+    out = tmp_path / "img.svg"
+    options = bsc.ConvertOptions(profile="compact", threads=3)
+    bsc.convert_file(bsc.FileJob(str(png), str(out), "img", band_rows=17), options)
+    assert out.read_bytes() == expected
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_fills_resolve_to_pixels(tmp_path, image, engine):
+    root = ET.fromstring(_render(image, tmp_path / "out.svg", engine))
+    unit = root.find(f"{SVG}defs/{SVG}rect")
+    assert unit.get("width") == unit.get("height") == "1"
+    rules = {
+        name: (fill, float(opacity) if opacity else 1.0)
+        for name, fill, opacity in re.findall(r"\.([\w-]+)\{fill:(#[0-9a-f]{6})(?:;opacity:([\d.]+))?\}", root.find(f"{SVG}style").text)
+    }
+    # One class per color, named in order of first use.
+    assert len(set(rules.values())) == len(rules)
+    uses = root.findall(f"{SVG}use")
+    first_use = list(dict.fromkeys(use.get("class") for use in uses))
+    assert first_use == [bsc.CompactFills.name(i) for i in range(len(rules))]
+
+    pixels = np.asarray(image)
+    assert len(uses) == np.count_nonzero(pixels[..., 3])
+    for use in uses:
+        assert use.get("href") == use.get(f"{XLINK}href") == "#" + unit.get("id")
+        r, g, b, a = pixels[int(use.get("y")), int(use.get("x"))].tolist()
+        fill, opacity = rules[use.get("class")]
+        assert fill == f"#{r:02x}{g:02x}{b:02x}"
+        assert opacity == pytest.approx(a / 255, abs=5e-3)
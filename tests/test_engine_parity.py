@@ -0,0 +1,43 @@
+"""The numpy and Python engines of bitmap_svg_converter must write identical SVGs."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+
+def _rgba_palette_image() -> Image.Image:
+    """A P image whose palette is RGBA: translucent and fully transparent entries included."""
+    rng = np.random.default_rng(14)
+    rgba = rng.integers(0, 256, size=(24, 32, 4), dtype=np.uint8)
+    rgba[:6, :, 3] = 0
+    rgba[6:12, :, 3] = 128
+    im = Image.fromarray(rgba, "RGBA").quantize(8)
+    assert im.mode == "P" and im.palette.mode == "RGBA"
+    return im
+
+
+def _render(mode: str, im: Image.Image, out: Path, engine: str) -> bytes:
+    if mode == "per-pixel":
+        bsc.generate_svg_per_pixel(im, str(out), "img", 1, engine=engine)
+    elif mode == "merged":
+        bsc.generate_svg_merged(im, str(out), 1, engine=engine)
+    else:
+        bsc.generate_svg_paths(im, str(out), 1, engine=engine)
+    return out.read_bytes()
+
+
+@pytest.mark.parametrize("mode", ["per-pixel", "merged", "paths"])
+def test_rgba_palette_engines_match(tmp_path, mode):
+    im = _rgba_palette_image()
+    python = _render(mode, im, tmp_path / "python.svg", "python")
+    numpy = _render(mode, im, tmp_path / "numpy.svg", "numpy")
+    assert numpy == python
+    # and both match the image converted up front
+    assert _render(mode, im.convert("RGBA"), tmp_path / "rgba.svg", "python") == python
@@ -0,0 +1,98 @@
+"""FrameDeduper: repeated frames reuse the first output by link, symlink or manifest entry."""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+# Frame pattern of the test input: frames 2 and 4 repeat frame 0, frame 3 repeats frame 1.
+PATTERN = "ABAAB"
+
+
+def _frame(kind: str) -> Image.Image:
+    im = Image.new("RGBA", (6, 4), (0, 0, 0, 0))
+    im.putpixel((1, 1) if kind == "A" else (4, 2), (200, 30, 30, 255))
+    return im
+
+
+@pytest.fixture
+def tiff(tmp_path) -> Path:
+    frames = [_frame(kind) for kind in PATTERN]
+    path = tmp_path / "anim.tif"
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    return path
+
+
+def _convert(tiff: Path, mode: str, jobs: int = 1, name: str = "out.svg") -> tuple[str, list[Path]]:
+    out = tiff.with_name(name)
+    summary = bsc.convert_file(bsc.FileJob(str(tiff), str(out), "anim", jobs=jobs, dedupe=mode), bsc.ConvertOptions())
+    return summary, [Path(bsc.frame_output_path(str(out), i, len(PATTERN))) for i in range(len(PATTERN))]
+
+
+def _original(i: int) -> int:
+    return PATTERN.index(PATTERN[i])
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_link_mode_hardlinks_duplicates(tiff, jobs):
+    summary, outs = _convert(tiff, "link", jobs)
+    assert "deduplicated=3" in summary
+    for i, out in enumerate(outs):
+        assert os.path.samefile(out, outs[_original(i)])
+        assert not out.is_symlink()
+    assert not os.path.samefile(outs[0], outs[1])
+
+
+def test_jobs_write_the_same_outputs(tiff):
+    """Duplicates found while the pool converts their original still link to the finished file."""
+    _summary, serial = _convert(tiff, "link", 1, "serial.svg")
+    _summary, pooled = _convert(tiff, "link", 2, "pooled.svg")
+    for a, b in zip(serial, pooled):
+        assert a.read_bytes() == b.read_bytes()
+
+
+def test_symlink_mode(tiff):
+    summary, outs = _convert(tiff, "symlink")
+    assert "deduplicated=3" in summary
+    for i, out in enumerate(outs):
+        if _original(i) != i:
+            assert out.is_symlink()
+            assert os.readlink(out) == outs[_original(i)].name
+        assert out.read_bytes() == outs[_original(i)].read_bytes()
+
+
+def test_manifest_mode_writes_only_originals(tiff):
+    summary, outs = _convert(tiff, "manifest")
+    assert "deduplicated=3" in summary
+    assert [out.exists() for out in outs] == [i == _original(i) for i in range(len(PATTERN))]
+    manifest = json.loads(Path(bsc.manifest_path_for(str(tiff.with_name("out.svg")))).read_text(encoding="utf-8"))
+    assert manifest["deduplicated"] == 3
+    assert [(e["frame"], e["output"], e["svg"]) for e in manifest["frames"]] == [
+        (i, outs[i].name, outs[_original(i)].name) for i in range(len(PATTERN))
+    ]
+
+
+def test_linked_outputs_keep_the_root_id_of_their_original(tiff):
+    _summary, outs = _convert(tiff, "link")
+    assert 'id="anim_frame_00000"' in outs[2].read_text(encoding="utf-8")
+    assert 'id="anim_frame_00002"' not in outs[2].read_text(encoding="utf-8")
+
+
+def test_same_pixels_at_another_size_are_not_duplicates(tmp_path):
+    data = bytes(range(96))
+    wide = Image.frombytes("RGBA", (6, 4), data)
+    tall = Image.frombytes("RGBA", (4, 6), data)
+    assert wide.tobytes() == tall.tobytes()
+    assert bsc.frame_digest(wide) != bsc.frame_digest(tall)
+    deduper = bsc.FrameDeduper("manifest")
+    assert deduper.match(wide, str(tmp_path / "a.svg")) is None
+    assert deduper.match(tall, str(tmp_path / "b.svg")) is None
+    assert deduper.match(wide.copy(), str(tmp_path / "c.svg")) == str(tmp_path / "a.svg")
+    assert deduper.skipped == 1
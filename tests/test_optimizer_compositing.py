@@ -0,0 +1,83 @@
+"""pixel_svg_optimizer's compositors must reproduce the plain float source-over blend."""
+import random
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pixel_svg_optimizer as pso
+
+
+def _float_style_pixels(rects):
+    """Reference: per-pixel float source-over in document order, then style keys."""
+    pixels = {}
+    for x0, y0, w0, h0, fill, opacity in rects:
+        a_src = pso.norm_opacity(opacity)
+        if a_src <= 0.0:
+            continue
+        rgb = pso._parse_rgb(fill)
+        for yy in range(y0, y0 + h0):
+            for xx in range(x0, x0 + w0):
+                dr, dg, db, da = pixels.get((xx, yy), (0.0, 0.0, 0.0, 0.0))
+                out_a = a_src + da * (1.0 - a_src)
+                if out_a <= 1e-12:
+                    pixels[(xx, yy)] = (0.0, 0.0, 0.0, 0.0)
+                    continue
+                pixels[(xx, yy)] = (
+                    (rgb[0] * a_src + dr * da * (1.0 - a_src)) / out_a,
+                    (rgb[1] * a_src + dg * da * (1.0 - a_src)) / out_a,
+                    (rgb[2] * a_src + db * da * (1.0 - a_src)) / out_a,
+                    out_a,
+                )
+    style_pixels = defaultdict(set)
+    for pt, (r, g, b, a) in pixels.items():
+        if a > 0.0:
+            style_pixels[(pso._rgb_to_hex((r, g, b)).lower(), round(a, 6))].add(pt)
+    return dict(style_pixels)
+
+
+def _write_svg(path: Path, rects) -> Path:
+    body = "".join(
+        f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="fill:{fill};opacity:{op};"/>'
+        for x, y, w, h, fill, op in rects
+    )
+    path.write_text(f'<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 16 16">{body}</svg>')
+    return path
+
+
+def _random_rects(rng: random.Random):
+    rects = []
+    for _ in range(rng.randint(2, 12)):
+        op = rng.choice(["1", "0.5", "0.001", str(rng.randint(1, 255)), f"{rng.random():.4f}"])
+        rects.append((rng.randint(0, 8), rng.randint(0, 8), rng.randint(1, 6), rng.randint(1, 6), "#%06x" % rng.randrange(1 << 24), op))
+    return rects
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(pso, "np", None)
+    elif pso.np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+def test_low_alpha_blend_is_not_rounded_up(tmp_path, engine):
+    # Exact G is 254.4997, so it must round down to fe.
+    rects = [(0, 0, 1, 1, "#00ff00", "0.001"), (0, 0, 1, 1, "#fefefe", "0.001")]
+    style_pixels, _ = pso._collect_final_rgba_pixels(_write_svg(tmp_path / "low.svg", rects))
+    assert [hex_rgb for hex_rgb, _ in style_pixels] == ["#7ffe7f"]
+
+
+def test_random_overlaps_match_float_blend(tmp_path, engine):
+    rng = random.Random(25)
+    for i in range(200):
+        rects = _random_rects(rng)
+        svg = _write_svg(tmp_path / f"r{i}.svg", rects)
+        expected = _float_style_pixels(rects)
+        for collect in (pso._collect_final_rgba_pixels, pso._collect_final_rgba_pixels_stream):
+            style_pixels, _ = collect(svg)
+            assert {k: set(v) for k, v in style_pixels.items()} == expected, (collect.__name__, rects)
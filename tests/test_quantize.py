@@ -0,0 +1,126 @@
+"""Color quantization: palette files, median cut, and output that matches across engines and bands."""
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+GPL = """GIMP Palette
+Name: Test
+Columns: 4
+# a comment
+255   0   0\tRed
+  0 128 255\tBlue
+#00ff00
+ffffff
+
+0 0 0 Black
+255 0 0 Red again
+"""
+
+
+@pytest.fixture
+def noisy(tmp_path) -> Path:
+    """Four base colors with +-3 noise, a transparent border and some faint pixels."""
+    rng = np.random.default_rng(18)
+    base = np.array([[250, 5, 5], [5, 125, 250], [5, 250, 5], [250, 250, 250]], dtype=np.int16)
+    rgb = base[rng.integers(0, 4, size=(70, 30))] + rng.integers(-3, 4, size=(70, 30, 3))
+    alpha = np.full((70, 30, 1), 255, dtype=np.int16)
+    alpha[:, :2] = 0
+    alpha[10:14] = 20
+    path = tmp_path / "noisy.png"
+    Image.fromarray(np.concatenate([rgb, alpha], axis=2).clip(0, 255).astype(np.uint8), "RGBA").save(path)
+    return path
+
+
+def test_gpl_palette_is_parsed_in_order(tmp_path):
+    path = tmp_path / "test.gpl"
+    path.write_text(GPL, encoding="utf-8")
+    assert bsc.load_palette(str(path)) == ((255, 0, 0), (0, 128, 255), (0, 255, 0), (255, 255, 255), (0, 0, 0))
+
+
+@pytest.mark.parametrize("line", ["red", "256 0 0", "12345"])
+def test_bad_palette_lines_raise(tmp_path, line):
+    path = tmp_path / "bad.gpl"
+    path.write_text(f"GIMP Palette\n{line}\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        bsc.load_palette(str(path))
+
+
+def test_median_cut_finds_distinct_colors():
+    rng = np.random.default_rng(18)
+    bases = np.array([[250, 5, 5], [5, 125, 250], [5, 250, 5], [250, 250, 250]], dtype=np.uint8)
+    rgba = np.dstack([bases[rng.integers(0, 4, size=(40, 30))], np.full((40, 30), 255, dtype=np.uint8)])
+    rgba[:5, :, :] = (0, 0, 0, 10)
+    im = Image.fromarray(rgba, "RGBA")
+    palette = bsc.median_cut_palette([(0, im)], im.size, 4, alpha_threshold=10)
+    assert sorted(palette) == sorted(map(tuple, bases.tolist()))
+    assert len(bsc.median_cut_palette([(0, im)], im.size, 2, alpha_threshold=10)) == 2
+
+
+def test_median_cut_is_the_same_for_any_banding(noisy):
+    im = Image.open(noisy).convert("RGBA")
+    palette = bsc.median_cut_palette([(0, im)], im.size, 4, alpha_threshold=20)
+    assert len(palette) == 4
+    for rows in (1, 7, 16):
+        bands = [(y0, im.crop((0, y0, im.width, min(im.height, y0 + rows)))) for y0 in range(0, im.height, rows)]
+        assert bsc.median_cut_palette(bands, im.size, 4, alpha_threshold=20) == palette
+
+
+def test_quantize_snaps_colors_and_drops_faint_pixels():
+    im = Image.frombytes("RGBA", (4, 1), bytes([250, 10, 0, 255, 0, 120, 250, 128, 9, 9, 9, 10, 240, 240, 240, 11]))
+    out = bsc.quantize_image(im, ((255, 0, 0), (0, 128, 255), (255, 255, 255)), alpha_threshold=10)
+    assert out.mode == "PA"
+    rgba = np.asarray(out.convert("RGBA"))[0].tolist()
+    assert rgba[0] == [255, 0, 0, 255] and rgba[1] == [0, 128, 255, 128] and rgba[3] == [255, 255, 255, 11]
+    assert rgba[2][3] == 0
+
+
+def _fills(svg: bytes) -> set[str]:
+    """Fill colors of per-pixel (style) and merged or path (attribute) output, as #rrggbb."""
+    found = set()
+    for color in re.findall(rb'fill[:=]"?#([0-9a-f]{3,6})', svg):
+        color = color.decode()
+        found.add("#" + ("".join(c * 2 for c in color) if len(color) == 3 else color))
+    return found
+
+
+def _convert(png: Path, out: Path, options: bsc.ConvertOptions, band_rows: int) -> bytes:
+    bsc.convert_file(bsc.FileJob(str(png), str(out), "noisy", frame=0, band_rows=band_rows), options)
+    return out.read_bytes()
+
+
+@pytest.mark.parametrize("merge", [None, "hv"])
+@pytest.mark.parametrize("quantize", [{"colors": 4}, {"colors": 3, "alpha_threshold": 20}, {"palette": ((255, 0, 0), (0, 0, 255))}])
+def test_quantized_output_matches_across_engines_and_bands(tmp_path, noisy, merge, quantize):
+    outputs = set()
+    for engine in ("numpy", "python"):
+        for band_rows in (0, 16):
+            options = bsc.ConvertOptions(merge=merge, engine=engine, **quantize)
+            outputs.add(_convert(noisy, tmp_path / f"{engine}{band_rows}.svg", options, band_rows))
+    assert len(outputs) == 1
+    fills = _fills(outputs.pop())
+    assert 2 <= len(fills) <= quantize.get("colors", 2)
+
+
+def test_cli_palette_file(tmp_path, noisy, monkeypatch):
+    gpl = tmp_path / "two.gpl"
+    gpl.write_text("GIMP Palette\n255 0 0\n255 255 255\n", encoding="utf-8")
+    out = tmp_path / "out.svg"
+    monkeypatch.setattr(sys, "argv", ["bitmap_svg_converter.py", str(noisy), "--palette", str(gpl), "--merge", "hv", "-o", str(out)])
+    bsc.main()
+    assert _fills(out.read_bytes()) == {"#ff0000", "#ffffff"}
+
+
+def test_cli_colors(tmp_path, noisy, monkeypatch):
+    out = tmp_path / "out.svg"
+    monkeypatch.setattr(sys, "argv", ["bitmap_svg_converter.py", str(noisy), "--colors", "2", "-o", str(out)])
+    bsc.main()
+    assert len(_fills(out.read_bytes())) == 2
@@ -0,0 +1,79 @@
+"""--reduce / --max-size: nearest-neighbor sampling at decode time, the same on every path."""
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+bsc._numpy()  # the module loads numpy lazily; _nearest_indices and _reduced_plane use it directly
+
+
+@pytest.fixture(scope="module")
+def source() -> Image.Image:
+    rng = np.random.default_rng(19)
+    return Image.fromarray(rng.integers(0, 256, size=(53, 71, 4), dtype=np.uint8), "RGBA")
+
+
+@pytest.fixture
+def png(tmp_path, source) -> Path:
+    path = tmp_path / "in.png"
+    source.save(path)
+    return path
+
+
+@pytest.mark.parametrize("args, factor", [((71, 53), 1), ((71, 53, 3), 3), ((71, 53, 1, 30), 3), ((71, 53, 2, 10), 8), ((71, 53, 4, 100), 4)])
+def test_reduction_factor(args, factor):
+    assert bsc.reduction_factor(*args) == factor
+
+
+@pytest.mark.parametrize("reduce, max_size", [(2, 0), (3, 0), (1, 16), (5, 16)])
+def test_reduced_pixels_are_centered_samples(png, source, reduce, max_size):
+    im = bsc.open_image(str(png), reduce=reduce, max_size=max_size)
+    factor = bsc.reduction_factor(*source.size, reduce, max_size)
+    assert im.size == (-(-71 // factor), -(-53 // factor))
+    assert max(im.size) <= max_size or not max_size
+    full = np.asarray(source)
+    rows, cols = bsc._nearest_indices(0, 53, factor), bsc._nearest_indices(0, 71, factor)
+    assert np.array_equal(np.asarray(im), full[rows][:, cols])
+    # Each sample lies within its factor x factor box.
+    assert all(i * factor <= r < (i + 1) * factor for i, r in enumerate(rows.tolist()))
+
+
+def test_crop_is_in_source_coordinates_and_applied_first(png, source):
+    im = bsc.open_image(str(png), crop=(10, 5, 40, 30), reduce=4)
+    assert im.size == (10, 8)
+    full = np.asarray(source)
+    expected = full[bsc._nearest_indices(5, 35, 4)][:, bsc._nearest_indices(10, 50, 4)]
+    assert np.array_equal(np.asarray(im), expected)
+
+
+def test_bands_frames_and_volume_planes_sample_alike(png, source):
+    whole = np.asarray(bsc.open_image(str(png), reduce=3))
+    size, bands = bsc.open_image_bands(str(png), band_rows=4, reduce=3)
+    assert size == whole.shape[1::-1]
+    assert np.array_equal(np.concatenate([np.asarray(band) for _y0, band in bands]), whole)
+    (_i, _count, frame), = bsc.iter_frames(str(png), reduce=3)
+    assert np.array_equal(np.asarray(frame), whole)
+    box = (0, 0) + source.size
+    assert np.array_equal(bsc._reduced_plane(np.asarray(source), box, 3), whole)
+
+
+def test_jpeg_reduces_to_the_requested_size(tmp_path, source):
+    path = tmp_path / "in.jpg"
+    source.convert("RGB").resize((710, 530)).save(path, quality=90)
+    for factor in (2, 3, 8, 9):
+        assert bsc.open_image(str(path), reduce=factor).size == (-(-710 // factor), -(-530 // factor))
+
+
+def test_cli_max_size(tmp_path, png, monkeypatch):
+    out = tmp_path / "out.svg"
+    monkeypatch.setattr(sys, "argv", ["bitmap_svg_converter.py", str(png), "--max-size", "20", "-o", str(out)])
+    bsc.main()
+    assert re.search(r'viewBox="0 0 18 14"', out.read_text(encoding="utf-8"))
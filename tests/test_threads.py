@@ -0,0 +1,50 @@
+"""--threads: per-pixel output formatted on a thread pool is byte-identical to one thread."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+# Rows enough for several PARALLEL_BAND_ROWS tasks, and not a multiple of them.
+HEIGHT = 3 * bsc.PARALLEL_BAND_ROWS + 11
+
+
+@pytest.fixture(scope="module")
+def png(tmp_path_factory) -> Path:
+    rng = np.random.default_rng(21)
+    rgba = rng.integers(0, 6, size=(HEIGHT, 29, 4), dtype=np.uint8) * 51
+    rgba[40:50] = 0
+    path = tmp_path_factory.mktemp("threads") / "in.png"
+    Image.fromarray(rgba, "RGBA").save(path)
+    return path
+
+
+def _convert(png: Path, out: Path, band_rows: int, **options) -> bytes:
+    bsc.convert_file(bsc.FileJob(str(png), str(out), "in", frame=0, band_rows=band_rows), bsc.ConvertOptions(**options))
+    return out.read_bytes()
+
+
+@pytest.mark.parametrize("profile", ["full", "compact"])
+@pytest.mark.parametrize("band_rows", [0, 7, 100])
+@pytest.mark.parametrize("threads", [2, 5])
+def test_threads_match_one_thread(tmp_path, png, profile, band_rows, threads):
+    expected = _convert(png, tmp_path / "one.svg", 0, profile=profile, engine="python")
+    assert _convert(png, tmp_path / "many.svg", band_rows, profile=profile, engine="numpy", threads=threads) == expected
+
+
+def test_threads_with_quantization(tmp_path, png):
+    expected = _convert(png, tmp_path / "one.svg", 0, colors=5)
+    assert _convert(png, tmp_path / "many.svg", 16, colors=5, threads=4) == expected
+
+
+def test_threads_report_every_row_in_order(png, tmp_path):
+    rows = []
+    bsc.generate_svg_per_pixel(bsc.open_image(str(png), palette=True), str(tmp_path / "out.svg"), "in", 1, progress_cb=lambda done, total: rows.append((done, total)), engine="numpy", threads=3)
+    assert [done for done, _total in rows] == sorted(done for done, _total in rows)
+    assert rows[-1] == (HEIGHT, HEIGHT)
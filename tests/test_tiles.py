@@ -0,0 +1,68 @@
+"""Sprite-sheet slicing: rotated atlas sprites come out upright, and bad tile specs are CLI errors."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image
+
+import bitmap_svg_converter as bsc
+
+
+def _sprite() -> Image.Image:
+    """A 3x5 sprite with no symmetry, so any wrong turn shows."""
+    im = Image.new("RGBA", (3, 5), (0, 0, 0, 0))
+    for i, xy in enumerate([(0, 0), (2, 0), (1, 2), (0, 4), (2, 3)]):
+        im.putpixel(xy, (40 * i, 255 - 40 * i, 90, 255))
+    return im
+
+
+@pytest.fixture
+def atlas(tmp_path) -> tuple[Path, Path]:
+    """A TexturePacker sheet holding the sprite upright at (1, 1) and rotated at (6, 2)."""
+    sprite = _sprite()
+    sheet = Image.new("RGBA", (12, 8), (0, 0, 0, 0))
+    sheet.paste(sprite, (1, 1))
+    sheet.paste(sprite.transpose(Image.Transpose.ROTATE_270), (6, 2))
+    sheet_path = tmp_path / "sheet.png"
+    sheet.save(sheet_path)
+    spec = {"frames": {
+        "upright.png": {"frame": {"x": 1, "y": 1, "w": 3, "h": 5}, "rotated": False},
+        "turned.png": {"frame": {"x": 6, "y": 2, "w": 3, "h": 5}, "rotated": True},
+    }}
+    spec_path = tmp_path / "sheet.json"
+    spec_path.write_text(json.dumps(spec), encoding="utf-8")
+    return sheet_path, spec_path
+
+
+def test_rotated_sprite_is_cut_upright(tmp_path, atlas):
+    sheet_path, spec_path = atlas
+    tiles = bsc.load_tiles(str(spec_path))
+    assert dict((name, (box, rotated)) for name, box, rotated in tiles) == {
+        "upright": ((1, 1, 3, 5), False),
+        "turned": ((6, 2, 5, 3), True),
+    }
+    out = tmp_path / "sheet.svg"
+    summary = bsc.convert_file(bsc.FileJob(str(sheet_path), str(out), "sheet", tiles=tiles), bsc.ConvertOptions())
+    assert "tiles=2" in summary
+    upright = Path(bsc.tile_output_path(str(out), "upright")).read_text(encoding="utf-8")
+    turned = Path(bsc.tile_output_path(str(out), "turned")).read_text(encoding="utf-8")
+    assert 'viewBox="0 0 3 5"' in turned
+    assert turned.replace('id="sheet_turned"', 'id="sheet_upright"') == upright
+
+
+@pytest.mark.parametrize("spec", [{"a": [4, 4, 8, 8]}, {"frames": 3}, {"a": [1, 1, 0, 2]}])
+def test_bad_tiles_are_reported_by_the_parser(tmp_path, monkeypatch, capsys, spec):
+    sheet_path = tmp_path / "sheet.png"
+    Image.new("RGBA", (8, 8), (1, 2, 3, 255)).save(sheet_path)
+    spec_path = tmp_path / "tiles.json"
+    spec_path.write_text(json.dumps(spec), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["bitmap_svg_converter.py", str(sheet_path), "--tiles", str(spec_path), "-o", str(tmp_path / "out.svg")])
+    with pytest.raises(SystemExit) as exc:
+        bsc.main()
+    assert exc.value.code == 2
+    assert "error: --tiles:" in capsys.readouterr().err
+    assert not list(tmp_path.glob("out*.svg"))
@@ -0,0 +1,134 @@
+"""FITS cubes and multi-frame DICOM as memmapped volumes, one frame per plane.
+
+astropy and pydicom are optional, so their readers are stood in for by fakes that hand the
+loaders numpy memmaps of a test file, as the real ones do for uncompressed data.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+
+import bitmap_svg_converter as bsc
+
+bsc._numpy()  # the module loads numpy lazily; the Volume helpers use it directly
+
+PLANES, HEIGHT, WIDTH = 3, 20, 13
+HEADER = 2880
+
+
+def _cube() -> "np.ndarray":
+    """uint16 planes with different ranges, so a per-plane window would differ from the shared one."""
+    rng = np.random.default_rng(23)
+    return np.stack([rng.integers(0, 1000, size=(HEIGHT, WIDTH)) + 3000 * i for i in range(PLANES)]).astype(">u2")
+
+
+class _HDUList(list):
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fits_file(tmp_path, monkeypatch) -> Path:
+    path = tmp_path / "cube.fits"
+    path.write_bytes(b"SIMPLE  =                    T".ljust(HEADER, b" ") + _cube().tobytes())
+
+    def open_fits(name, memmap=False):
+        assert memmap
+        data = np.memmap(name, dtype=">u2", mode="r", offset=HEADER, shape=(PLANES, HEIGHT, WIDTH))
+        return _HDUList([SimpleNamespace(data=data)])
+
+    monkeypatch.setitem(bsc._backends, "astropy", SimpleNamespace(open=open_fits))
+    return path
+
+
+def test_volume_planes_share_one_window(fits_file):
+    volume = bsc.open_volume(str(fits_file), "fits")
+    with volume:
+        assert isinstance(volume.planes, np.memmap)
+        assert volume.count == PLANES
+        box = volume.box((2, 3, 100, 5))
+        assert box == (2, 3, WIDTH, 8)
+        assert np.array_equal(volume.region(1, box), _cube()[1, 3:8, 2:])
+        assert np.array_equal(volume.region(PLANES, box), volume.region(0, box))
+        window = volume.window(volume.box())
+        assert window == bsc._normalization_window(_cube())
+
+
+def test_every_plane_is_a_frame(fits_file):
+    assert bsc.count_frames(str(fits_file)) == PLANES
+    window = bsc._normalization_window(_cube())
+    frames = list(bsc.iter_frames(str(fits_file)))
+    assert [(i, count) for i, count, _im in frames] == [(i, PLANES) for i in range(PLANES)]
+    for i, _count, im in frames:
+        assert np.array_equal(np.asarray(im), np.asarray(bsc._numpy_to_pil_rgba(_cube()[i], window)))
+        assert np.array_equal(np.asarray(bsc.open_image(str(fits_file), i)), np.asarray(im))
+
+
+def test_plane_bands_and_reduction_match_the_frame(fits_file):
+    whole = np.asarray(bsc.open_image(str(fits_file), 2, crop=(1, 2, 11, 17), reduce=2))
+    size, bands = bsc.open_image_bands(str(fits_file), 2, crop=(1, 2, 11, 17), band_rows=3, reduce=2)
+    assert size == whole.shape[1::-1] == (6, 9)
+    assert np.array_equal(np.concatenate([np.asarray(band) for _y0, band in bands]), whole)
+
+
+def test_cube_converts_one_output_per_plane(tmp_path, fits_file):
+    out = tmp_path / "cube.svg"
+    summary = bsc.convert_file(bsc.FileJob(str(fits_file), str(out), "cube"), bsc.ConvertOptions())
+    assert f"frames={PLANES}" in summary
+    for i in range(PLANES):
+        assert f'id="cube_frame_{i:05d}"' in Path(bsc.frame_output_path(str(out), i, PLANES)).read_text(encoding="utf-8")
+
+
+class _Syntax(str):
+    is_little_endian = True
+    is_compressed = False
+    is_deflated = False
+
+
+class _Dataset(dict):
+    """The few pydicom Dataset features _dicom_volume reads."""
+
+    def __init__(self, offset, **elements):
+        super().__init__(PixelData=True, **elements)
+        self.__dict__.update(elements)
+        self.file_meta = SimpleNamespace(TransferSyntaxUID=_Syntax("1.2.840.10008.1.2.1"))
+        self._offset = offset
+
+    def get_item(self, tag):
+        assert tag == 0x7FE00010
+        return SimpleNamespace(value_tell=self._offset)
+
+    @property
+    def pixel_array(self):
+        raise AssertionError("uncompressed pixel data must be memmapped, not decoded")
+
+
+@pytest.mark.parametrize("planar", [False, True])
+def test_dicom_rgb_slices_are_memmapped(tmp_path, monkeypatch, planar):
+    rng = np.random.default_rng(230)
+    rgb = rng.integers(0, 256, size=(PLANES, HEIGHT, WIDTH, 3), dtype=np.uint8)
+    stored = rgb.transpose(0, 3, 1, 2) if planar else rgb
+    offset = 300
+    path = tmp_path / "stack.dcm"
+    path.write_bytes(b"\0" * 128 + b"DICM" + b"\0" * (offset - 132) + np.ascontiguousarray(stored).tobytes())
+    ds = _Dataset(
+        offset, NumberOfFrames=str(PLANES), Rows=HEIGHT, Columns=WIDTH, SamplesPerPixel=3, BitsAllocated=8,
+        BitsStored=8, PixelRepresentation=0, PhotometricInterpretation="RGB", PlanarConfiguration=int(planar),
+    )
+    monkeypatch.setitem(bsc._backends, "pydicom", SimpleNamespace(dcmread=lambda name, defer_size=None: ds))
+
+    assert bsc.sniff_loader(str(path)) == "dicom"
+    volume = bsc.open_volume(str(path), "dicom")
+    with volume:
+        assert volume.count == PLANES
+        assert isinstance(volume.planes, np.memmap)
+    frames = list(bsc.iter_frames(str(path)))
+    assert len(frames) == PLANES
+    for i, count, im in frames:
+        assert count == PLANES
+        assert np.array_equal(np.asarray(im)[..., :3], rgb[i])
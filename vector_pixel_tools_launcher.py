@@ -20,6 +20,7 @@ Single-instance behavior:
 - The GUIs also send 'RAISE' before attempting to start a new launcher.
 """
 
+import multiprocessing
 import os
 import subprocess
 import sys
@@ -255,4 +256,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Frozen builds re-run this executable for worker processes (converter --jobs).
+    multiprocessing.freeze_support()
     main()